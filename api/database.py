@@ -1,15 +1,284 @@
 from supabase import create_client, Client
+from supabase.lib.client_options import SyncClientOptions
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, TypeVar
+import asyncio
+import functools
 import os
+import threading
+import time
+
+import httpx
+
+from api.services import metricas, consultas
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 
+# Pool HTTP compartilhado com o PostgREST (por worker)
+DB_POOL_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", "20"))
+DB_POOL_MAX_KEEPALIVE = int(os.getenv("DB_POOL_MAX_KEEPALIVE", "10"))
+DB_POOL_KEEPALIVE_EXPIRY = float(os.getenv("DB_POOL_KEEPALIVE_EXPIRY", "30"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_HTTP_TIMEOUT = float(os.getenv("DB_HTTP_TIMEOUT", "30"))
+DB_HTTP2 = os.getenv("DB_HTTP2", "true").lower() in ("1", "true", "yes")
+
+# Threads que executam as chamadas síncronas do supabase-py fora do event loop
+DB_MAX_CONCURRENCY = int(os.getenv("DB_MAX_CONCURRENCY", str(DB_POOL_MAX_CONNECTIONS)))
+
+T = TypeVar("T")
+
 print(f"[DEBUG] SUPABASE_URL: {SUPABASE_URL}")
 print(f"[DEBUG] SUPABASE_SERVICE_KEY: {'set' if SUPABASE_SERVICE_KEY else 'None'}")
 
 
+class PoolMetrics:
+    """Contadores do pool HTTP usado pelo cliente Supabase."""
+
+    def __init__(self, max_connections: int):
+        self.max_connections = max_connections
+        self.in_use = 0
+        self.requests_total = 0
+        self.wait_timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self._lock = threading.Lock()
+
+    def acquired(self, wait: float) -> None:
+        with self._lock:
+            self.in_use += 1
+            self.requests_total += 1
+            self.wait_time_total += wait
+            if wait > self.wait_time_max:
+                self.wait_time_max = wait
+
+    def released(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def timed_out(self) -> None:
+        with self._lock:
+            self.wait_timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.requests_total
+            return {
+                "max_connections": self.max_connections,
+                "in_use": self.in_use,
+                "requests_total": total,
+                "wait_timeouts": self.wait_timeouts,
+                "wait_time_avg_ms": round(self.wait_time_total / total * 1000, 3) if total else 0.0,
+                "wait_time_max_ms": round(self.wait_time_max * 1000, 3),
+            }
+
+
+class _MeteredStream(httpx.SyncByteStream):
+    """Libera o slot do pool somente quando o corpo da resposta é fechado."""
+
+    def __init__(self, stream: httpx.SyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        for chunk in self._stream:
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._release()
+
+
+class PooledTransport(httpx.HTTPTransport):
+    """
+    Transporte HTTP com limite de requisições simultâneas e medição do
+    tempo de espera por um slot livre.
+    """
+
+    def __init__(self, metrics: PoolMetrics, pool_timeout: float, **kwargs):
+        super().__init__(**kwargs)
+        self.metrics = metrics
+        self.pool_timeout = pool_timeout
+        self._slots = threading.BoundedSemaphore(metrics.max_connections)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        inicio = time.perf_counter()
+        if not self._slots.acquire(timeout=self.pool_timeout):
+            self.metrics.timed_out()
+            raise httpx.PoolTimeout("Nenhuma conexão livre no pool do banco", request=request)
+        self.metrics.acquired(time.perf_counter() - inicio)
+
+        liberado = False
+
+        def release() -> None:
+            nonlocal liberado
+            if not liberado:
+                liberado = True
+                self._slots.release()
+                self.metrics.released()
+
+        try:
+            response = super().handle_request(request)
+        except BaseException:
+            release()
+            raise
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_MeteredStream(response.stream, release),
+            extensions=response.extensions,
+        )
+
+    def connection_stats(self) -> Dict[str, int]:
+        pool = getattr(self, "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        return {
+            "open": len(connections),
+            "idle": sum(1 for c in connections if c.is_idle()),
+        }
+
+
+_client: Optional[Client] = None
+_http_client: Optional[httpx.Client] = None
+_transport: Optional[PooledTransport] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_client_lock = threading.Lock()
+
+
+def _create_pool() -> Client:
+    global _client, _http_client, _transport
+
+    metrics = PoolMetrics(DB_POOL_MAX_CONNECTIONS)
+    _transport = PooledTransport(
+        metrics,
+        pool_timeout=DB_POOL_TIMEOUT,
+        http2=DB_HTTP2,
+        limits=httpx.Limits(
+            max_connections=DB_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=DB_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=DB_POOL_KEEPALIVE_EXPIRY,
+        ),
+    )
+    _http_client = httpx.Client(
+        transport=_transport,
+        timeout=httpx.Timeout(DB_HTTP_TIMEOUT, pool=DB_POOL_TIMEOUT),
+        follow_redirects=True,
+    )
+    _client = create_client(
+        SUPABASE_URL,
+        SUPABASE_SERVICE_KEY,
+        options=SyncClientOptions(httpx_client=_http_client),
+    )
+    return _client
+
+
+def init_db() -> Optional[Client]:
+    """Cria o cliente compartilhado do worker (chamado no lifespan da API)."""
+    if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
+        print("[WARN] Supabase não configurado; cliente será criado sob demanda")
+        return None
+    return get_db()
+
+
+def close_db() -> None:
+    """Fecha as conexões do pool no shutdown do worker."""
+    global _client, _http_client, _transport, _executor
+
+    with _client_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+        if _http_client is not None:
+            _http_client.close()
+        _client = None
+        _http_client = None
+        _transport = None
+        _executor = None
+
+
 def get_db() -> Client:
-    """Retorna o cliente Supabase"""
+    """Retorna o cliente Supabase compartilhado do worker"""
     if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
         raise Exception(f"Missing config: URL={SUPABASE_URL}, KEY={'set' if SUPABASE_SERVICE_KEY else 'None'}")
-    return create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+
+    client = _client
+    if client is not None:
+        return client
+
+    with _client_lock:
+        if _client is None:
+            return _create_pool()
+        return _client
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    executor = _executor
+    if executor is not None:
+        return executor
+
+    with _client_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DB_MAX_CONCURRENCY, thread_name_prefix="db")
+        return _executor
+
+
+async def run_sync(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Executa uma chamada bloqueante do cliente Supabase numa thread do pool do banco."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def _operacao(query: Any) -> tuple:
+    try:
+        request = query.request
+        metodo = getattr(request.http_method, "value", request.http_method)
+        return metricas.operacao(metodo, request.path.path, request.headers.get("prefer"))
+    except AttributeError:
+        return "desconhecida", "desconhecida"
+
+
+async def execute(query: Any) -> Any:
+    """
+    Executa uma query do PostgREST sem bloquear o event loop e registra a
+    duração por tabela e operação (db_query_duration_seconds em /metrics) e
+    na contagem de consultas da requisição.
+    """
+    inicio = time.perf_counter()
+    status = "erro"
+    try:
+        result = await run_sync(query.execute)
+        status = "ok"
+        return result
+    finally:
+        duracao = time.perf_counter() - inicio
+        tabela, operacao = _operacao(query)
+        if metricas.METRICAS:
+            metricas.db_duracao.observar(duracao, tabela, operacao, status)
+        consultas.registrar(tabela, operacao, duracao)
+
+
+metricas.Medidor(
+    "db_pool_in_use", "Conexões do pool do banco em uso",
+    lambda: {(): _transport.metrics.in_use if _transport is not None else 0}
+)
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Métricas do pool HTTP do banco (em uso, ociosas, tempo de espera)."""
+    transport = _transport
+    if transport is None:
+        return {"initialized": False}
+
+    return {
+        "initialized": True,
+        "http2": DB_HTTP2,
+        "keepalive_expiry": DB_POOL_KEEPALIVE_EXPIRY,
+        "max_keepalive_connections": DB_POOL_MAX_KEEPALIVE,
+        "max_concurrency": DB_MAX_CONCURRENCY,
+        "connections": transport.connection_stats(),
+        **transport.metrics.snapshot(),
+    }
@@ -1,15 +1,40 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import os
 
+from api import database
 from api.routes import health, system
-from api.routes import projetos, tarefas, grupos, sprints, tags, usuarios, contratos, transacoes, search, chat
+from api.services import embeddings, cache, stream, llm, metricas
+from api.middleware.metricas import MetricasMiddleware
+from api.middleware.consultas import ConsultasMiddleware
+from api.routes import projetos, tarefas, grupos, sprints, tags, usuarios, contratos, transacoes, search, chat, conversas
+from api.routes import stream as stream_routes
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    database.init_db()
+    embeddings.fila.start()
+    await cache.iniciar()
+    embeddings.iniciar_backfill()
+    await stream.iniciar()
+    yield
+    stream.encerrar()
+    await cache.encerrar()
+    await embeddings.encerrar_backfill()
+    await embeddings.fila.stop()
+    await embeddings.close_provider()
+    await llm.close_client()
+    database.close_db()
 
 
 app = FastAPI(
     title="EdiculaWorks API",
     description="API para gestão de tarefas, contratos e análises",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -25,7 +50,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Chat-Cache"],
 )
+app.add_middleware(MetricasMiddleware)
+app.add_middleware(ConsultasMiddleware)
 
 app.include_router(health.router, prefix="/api", tags=["Health"])
 app.include_router(system.router, prefix="/api", tags=["System"])
@@ -39,6 +67,8 @@ app.include_router(contratos.router, prefix="/api/contratos", tags=["Contratos"]
 app.include_router(transacoes.router, prefix="/api/transacoes", tags=["Transacoes"])
 app.include_router(search.router, prefix="/api/search", tags=["Search"])
 app.include_router(chat.router, prefix="/api", tags=["Chat"])
+app.include_router(conversas.router, prefix="/api/conversas", tags=["Chat"])
+app.include_router(stream_routes.router, prefix="/api/stream", tags=["Stream"])
 
 
 @app.get("/")
@@ -50,6 +80,14 @@ async def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas no formato texto do Prometheus (rotas, banco e LLM)."""
+    if not metricas.METRICAS:
+        return PlainTextResponse("", status_code=404)
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/api/health")
 async def health_check():
     return {"status": "healthy"}
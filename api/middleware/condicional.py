@@ -0,0 +1,61 @@
+from typing import Optional
+from datetime import datetime, timezone
+from email.utils import format_datetime
+import hashlib
+
+from fastapi import Request, Response
+
+from api.services import versoes
+
+
+def _etag(request: Request, tabela: str, versao: dict) -> str:
+    # Mesma versão dos dados + mesma URL (rota e filtros) = mesmo corpo
+    base = "|".join([
+        tabela,
+        str(versao.get("versao")),
+        request.url.path,
+        "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items())),
+    ])
+    return f'W/"{hashlib.sha1(base.encode()).hexdigest()[:20]}"'
+
+
+def _confere(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Comparação fraca: W/"x" e "x" são equivalentes
+    valor = etag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == valor for t in if_none_match.split(","))
+
+
+async def nao_modificado(request: Request, response: Response, tabela: str, empresa_id: int = 1) -> Optional[Response]:
+    """
+    Consulta só a versão da tabela para a empresa (o contador de escritas)
+    e devolve um 304 se o If-None-Match bater com o ETag; senão grava
+    ETag/Last-Modified em response e retorna None para a rota seguir com a
+    consulta completa.
+    """
+    versao = await versoes.versao_dados(tabela, empresa_id)
+    etag = _etag(request, tabela, versao)
+    request.state.versao_dados = versao.get("versao")
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    atualizado_em = versao.get("atualizado_em")
+    if atualizado_em:
+        headers["Last-Modified"] = format_datetime(datetime.fromisoformat(atualizado_em).astimezone(timezone.utc), usegmt=True)
+
+    if _confere(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
+
+
+def versao(request: Request) -> Optional[int]:
+    """
+    Versão conferida por nao_modificado nesta requisição, para rotas com
+    corpo vindo do cache (cache.lembrar(..., versao=...)): o corpo tem de
+    ser o da versão que gerou o ETag.
+    """
+    return getattr(request.state, "versao_dados", None)
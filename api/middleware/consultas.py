@@ -0,0 +1,26 @@
+from api.middleware.metricas import _rota
+from api.services import consultas
+
+
+class ConsultasMiddleware:
+    """
+    Conta as chamadas ao banco de cada requisição (ASGI puro, como o de
+    métricas). Ao fim, avisa no log se passou de DB_CONSULTAS_MAX ou se a
+    mesma tabela/operação se repetiu a ponto de parecer um N+1.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with consultas.contar() as contagem:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                rota = _rota(scope)
+                contagem.rotulo = f"{scope['method']} {rota}"
+                consultas.encerrar(contagem, rota)
@@ -0,0 +1,60 @@
+import time
+
+from api.services import metricas
+
+
+# Requisições que não casaram com nenhuma rota (404) entram todas nesta
+# série, para a cardinalidade não crescer com URLs arbitrárias
+ROTA_DESCONHECIDA = "desconhecida"
+
+
+def _rota(scope) -> str:
+    """
+    Template da rota com o prefixo do router ("/api/tarefas/{tarefa_id}").
+    Conforme a versão do FastAPI, scope["route"].path já vem com o prefixo
+    ou só com o caminho dentro do router; nesse caso o prefixo é a parte do
+    caminho real antes do trecho que casa com a rota.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    regex = getattr(route, "path_regex", None)
+    if template is None or regex is None:
+        return ROTA_DESCONHECIDA
+    caminho = scope["path"]
+    if regex.match(caminho):
+        return template
+    for i in range(1, len(caminho)):
+        if caminho[i] == "/" and regex.match(caminho[i:]):
+            return caminho[:i] + template
+    return template
+
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI puro (sem BaseHTTPMiddleware, que bufferiza o corpo e
+    atrapalharia os streams): duração e status por método e rota. A rota é o
+    template ("/api/tarefas/{tarefa_id}"), lido do scope depois do roteamento.
+    Em streams (SSE) a duração vai até o fim da resposta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metricas.METRICAS:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            metricas.http_duracao.observar(time.perf_counter() - inicio, scope["method"], _rota(scope), str(status))
@@ -0,0 +1,176 @@
+-- Migration 002: Full-text + trigram search
+-- Portuguese-stemmed tsvector columns, GIN indexes and ranking functions
+-- used by /api/search (api/services/search.py)
+-- Run this in Supabase SQL Editor
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- ============================================
+-- TEXT SEARCH CONFIGURATION
+-- ============================================
+
+-- Português com remoção de acentos ("manutencao" encontra "manutenção")
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_ts_config WHERE cfgname = 'portuguese_unaccent'
+    ) THEN
+        CREATE TEXT SEARCH CONFIGURATION portuguese_unaccent (COPY = portuguese);
+        ALTER TEXT SEARCH CONFIGURATION portuguese_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+    END IF;
+END $$;
+
+-- ============================================
+-- SEARCH VECTORS
+-- ============================================
+
+-- Tarefas: titulo (peso A) + descricao (peso B)
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'tarefas' AND column_name = 'search_vector'
+    ) THEN
+        ALTER TABLE tarefas ADD COLUMN search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('portuguese_unaccent', coalesce(titulo, '')), 'A') ||
+                setweight(to_tsvector('portuguese_unaccent', coalesce(descricao, '')), 'B')
+            ) STORED;
+    END IF;
+END $$;
+
+-- Contratos: titulo (peso A) + contraparte (peso B) + descricao (peso C)
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'contratos' AND column_name = 'search_vector'
+    ) THEN
+        ALTER TABLE contratos ADD COLUMN search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('portuguese_unaccent', coalesce(titulo, '')), 'A') ||
+                setweight(to_tsvector('portuguese_unaccent', coalesce(contraparte_nome, '')), 'B') ||
+                setweight(to_tsvector('portuguese_unaccent', coalesce(descricao, '')), 'C')
+            ) STORED;
+    END IF;
+END $$;
+
+-- ============================================
+-- CREATE INDEXES
+-- ============================================
+
+CREATE INDEX IF NOT EXISTS idx_tarefas_search ON tarefas USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_tarefas_titulo_trgm ON tarefas USING GIN (titulo gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_contratos_search ON contratos USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_contratos_titulo_trgm ON contratos USING GIN (titulo gin_trgm_ops);
+
+-- ============================================
+-- SEARCH FUNCTIONS
+-- ============================================
+
+-- Tarefas: relevância textual (FTS ou trigram, o que for maior) com os
+-- mesmos pesos de services/search.py: 60% texto, 20% projeto, 20% prioridade.
+-- Os termos da consulta são combinados com OR; ts_rank_cd favorece quem casa mais termos.
+CREATE OR REPLACE FUNCTION buscar_tarefas_texto(
+    query_text TEXT,
+    empresa_id_int INTEGER,
+    limite INTEGER DEFAULT 10,
+    projeto_filtro TEXT DEFAULT NULL,
+    coluna_filtro TEXT DEFAULT NULL,
+    relevancia_minima FLOAT DEFAULT 0
+)
+RETURNS TABLE (
+    id INTEGER,
+    titulo TEXT,
+    descricao TEXT,
+    coluna TEXT,
+    prioridade TEXT,
+    projeto_id INTEGER,
+    relevancia FLOAT,
+    similaridade FLOAT
+) AS $$
+    WITH q AS (
+        SELECT NULLIF(replace(plainto_tsquery('portuguese_unaccent', query_text)::TEXT, ' & ', ' | '), '')::tsquery AS tsq
+    ),
+    candidatos AS (
+        SELECT
+            t.*,
+            GREATEST(
+                ts_rank_cd(t.search_vector, q.tsq, 32),
+                word_similarity(query_text, t.titulo)
+            )::FLOAT AS relevancia
+        FROM tarefas t, q
+        WHERE t.empresa_id = empresa_id_int
+        AND (t.search_vector @@ q.tsq OR query_text <% t.titulo)
+        AND (coluna_filtro IS NULL OR t.coluna = coluna_filtro)
+    )
+    SELECT
+        c.id,
+        c.titulo::TEXT,
+        c.descricao,
+        c.coluna::TEXT,
+        c.prioridade::TEXT,
+        c.projeto_id,
+        c.relevancia,
+        (
+            c.relevancia * 0.60 +
+            CASE WHEN projeto_filtro IS NOT NULL AND (
+                c.projeto_id::TEXT = projeto_filtro
+                OR EXISTS (SELECT 1 FROM projetos p WHERE p.id = c.projeto_id AND p.nome = projeto_filtro)
+            ) THEN 0.20 * 0.20 ELSE 0.0 END +
+            CASE c.prioridade
+                WHEN 'urgente' THEN 0.20
+                WHEN 'alta' THEN 0.15
+                WHEN 'media' THEN 0.10
+                WHEN 'baixa' THEN 0.05
+                ELSE 0.0
+            END * 0.20
+        )::FLOAT AS similaridade
+    FROM candidatos c
+    WHERE c.relevancia >= relevancia_minima
+    ORDER BY similaridade DESC, c.id DESC
+    LIMIT limite;
+$$ LANGUAGE sql STABLE;
+
+-- Contratos: mesma relevância textual, sem boosts
+CREATE OR REPLACE FUNCTION buscar_contratos_texto(
+    query_text TEXT,
+    empresa_id_int INTEGER,
+    limite INTEGER DEFAULT 10,
+    relevancia_minima FLOAT DEFAULT 0
+)
+RETURNS TABLE (
+    id INTEGER,
+    titulo TEXT,
+    tipo TEXT,
+    contraparte_nome TEXT,
+    status TEXT,
+    similaridade FLOAT
+) AS $$
+    WITH q AS (
+        SELECT NULLIF(replace(plainto_tsquery('portuguese_unaccent', query_text)::TEXT, ' & ', ' | '), '')::tsquery AS tsq
+    )
+    SELECT * FROM (
+        SELECT
+            c.id,
+            c.titulo::TEXT,
+            c.tipo::TEXT,
+            c.contraparte_nome::TEXT,
+            c.status::TEXT,
+            GREATEST(
+                ts_rank_cd(c.search_vector, q.tsq, 32),
+                word_similarity(query_text, c.titulo)
+            )::FLOAT AS similaridade
+        FROM contratos c, q
+        WHERE c.empresa_id = empresa_id_int
+        AND (c.search_vector @@ q.tsq OR query_text <% c.titulo)
+    ) r
+    WHERE r.similaridade >= relevancia_minima
+    ORDER BY r.similaridade DESC, r.id DESC
+    LIMIT limite;
+$$ LANGUAGE sql STABLE;
+
+SELECT 'Migration 002 completed successfully!' as result;
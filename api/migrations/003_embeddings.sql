@@ -0,0 +1,167 @@
+-- Migration 003: Embedding pipeline
+-- embeddings_cache (dedupe por hash do texto), índices ANN (pgvector, cosseno)
+-- e funções usadas por api/services/embeddings.py e api/services/search.py
+-- Run this in Supabase SQL Editor
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- ============================================
+-- EMBEDDINGS_CACHE TABLE
+-- ============================================
+CREATE TABLE IF NOT EXISTS embeddings_cache (
+    id SERIAL PRIMARY KEY,
+    empresa_id INTEGER,
+    entidade_tipo VARCHAR(50) NOT NULL,
+    entidade_id INTEGER NOT NULL,
+    embedding vector(1536) NOT NULL,
+    texto_hash VARCHAR(64),
+    texto_preview VARCHAR(200),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    UNIQUE(entidade_tipo, entidade_id)
+);
+
+-- ============================================
+-- CREATE INDEXES
+-- ============================================
+
+CREATE INDEX IF NOT EXISTS idx_embeddings_cache_hash ON embeddings_cache(texto_hash);
+
+-- HNSW no lugar de ivfflat: não depende de dados existentes no momento da
+-- criação e mantém o recall com inserções incrementais
+CREATE INDEX IF NOT EXISTS idx_tarefas_embedding_hnsw ON tarefas USING hnsw (embedding vector_cosine_ops);
+CREATE INDEX IF NOT EXISTS idx_contratos_embedding_hnsw ON contratos USING hnsw (embedding vector_cosine_ops);
+CREATE INDEX IF NOT EXISTS idx_transacoes_embedding_hnsw ON transacoes USING hnsw (embedding vector_cosine_ops);
+
+-- ============================================
+-- FUNCTIONS
+-- ============================================
+
+-- Grava um lote de embeddings no cache e nas tabelas de origem (1 round-trip)
+-- itens: [{entidade_tipo, entidade_id, empresa_id, texto_hash, texto_preview, embedding}]
+CREATE OR REPLACE FUNCTION aplicar_embeddings(itens JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    total INTEGER;
+BEGIN
+    CREATE TEMP TABLE _lote ON COMMIT DROP AS
+    SELECT
+        item->>'entidade_tipo' AS entidade_tipo,
+        (item->>'entidade_id')::INTEGER AS entidade_id,
+        (item->>'empresa_id')::INTEGER AS empresa_id,
+        item->>'texto_hash' AS texto_hash,
+        item->>'texto_preview' AS texto_preview,
+        (item->>'embedding')::vector(1536) AS embedding
+    FROM jsonb_array_elements(itens) AS item;
+
+    INSERT INTO embeddings_cache (empresa_id, entidade_tipo, entidade_id, embedding, texto_hash, texto_preview)
+    SELECT empresa_id, entidade_tipo, entidade_id, embedding, texto_hash, texto_preview FROM _lote
+    ON CONFLICT (entidade_tipo, entidade_id) DO UPDATE SET
+        embedding = EXCLUDED.embedding,
+        texto_hash = EXCLUDED.texto_hash,
+        texto_preview = EXCLUDED.texto_preview,
+        created_at = NOW();
+
+    UPDATE tarefas t SET embedding = l.embedding
+    FROM _lote l WHERE l.entidade_tipo = 'tarefa' AND t.id = l.entidade_id;
+
+    UPDATE contratos c SET embedding = l.embedding
+    FROM _lote l WHERE l.entidade_tipo = 'contrato' AND c.id = l.entidade_id;
+
+    UPDATE transacoes tr SET embedding = l.embedding
+    FROM _lote l WHERE l.entidade_tipo = 'transacao' AND tr.id = l.entidade_id;
+
+    SELECT count(*) INTO total FROM _lote;
+    DROP TABLE _lote;
+    RETURN total;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Tarefas por similaridade de cosseno (ANN), mesmos pesos de buscar_tarefas_texto
+CREATE OR REPLACE FUNCTION buscar_tarefas_vetorial(
+    query_embedding vector(1536),
+    empresa_id_int INTEGER,
+    limite INTEGER DEFAULT 10,
+    projeto_filtro TEXT DEFAULT NULL,
+    coluna_filtro TEXT DEFAULT NULL,
+    relevancia_minima FLOAT DEFAULT 0
+)
+RETURNS TABLE (
+    id INTEGER,
+    titulo TEXT,
+    descricao TEXT,
+    coluna TEXT,
+    prioridade TEXT,
+    projeto_id INTEGER,
+    relevancia FLOAT,
+    similaridade FLOAT
+) AS $$
+    WITH candidatos AS (
+        SELECT t.*, (1 - (t.embedding <=> query_embedding))::FLOAT AS relevancia
+        FROM tarefas t
+        WHERE t.empresa_id = empresa_id_int
+        AND t.embedding IS NOT NULL
+        AND (coluna_filtro IS NULL OR t.coluna = coluna_filtro)
+        ORDER BY t.embedding <=> query_embedding
+        LIMIT GREATEST(limite * 4, 40)
+    )
+    SELECT
+        c.id,
+        c.titulo::TEXT,
+        c.descricao,
+        c.coluna::TEXT,
+        c.prioridade::TEXT,
+        c.projeto_id,
+        c.relevancia,
+        (
+            c.relevancia * 0.60 +
+            CASE WHEN projeto_filtro IS NOT NULL AND (
+                c.projeto_id::TEXT = projeto_filtro
+                OR EXISTS (SELECT 1 FROM projetos p WHERE p.id = c.projeto_id AND p.nome = projeto_filtro)
+            ) THEN 0.20 * 0.20 ELSE 0.0 END +
+            CASE c.prioridade
+                WHEN 'urgente' THEN 0.20
+                WHEN 'alta' THEN 0.15
+                WHEN 'media' THEN 0.10
+                WHEN 'baixa' THEN 0.05
+                ELSE 0.0
+            END * 0.20
+        )::FLOAT AS similaridade
+    FROM candidatos c
+    WHERE c.relevancia >= relevancia_minima
+    ORDER BY similaridade DESC, c.id DESC
+    LIMIT limite;
+$$ LANGUAGE sql STABLE;
+
+-- Contratos por similaridade de cosseno (ANN)
+CREATE OR REPLACE FUNCTION buscar_contratos_vetorial(
+    query_embedding vector(1536),
+    empresa_id_int INTEGER,
+    limite INTEGER DEFAULT 10,
+    relevancia_minima FLOAT DEFAULT 0
+)
+RETURNS TABLE (
+    id INTEGER,
+    titulo TEXT,
+    tipo TEXT,
+    contraparte_nome TEXT,
+    status TEXT,
+    similaridade FLOAT
+) AS $$
+    SELECT * FROM (
+        SELECT
+            c.id,
+            c.titulo::TEXT,
+            c.tipo::TEXT,
+            c.contraparte_nome::TEXT,
+            c.status::TEXT,
+            (1 - (c.embedding <=> query_embedding))::FLOAT AS similaridade
+        FROM contratos c
+        WHERE c.empresa_id = empresa_id_int
+        AND c.embedding IS NOT NULL
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT limite
+    ) r
+    WHERE r.similaridade >= relevancia_minima;
+$$ LANGUAGE sql STABLE;
+
+SELECT 'Migration 003 completed successfully!' as result;
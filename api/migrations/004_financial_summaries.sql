@@ -0,0 +1,83 @@
+-- Migration 004: Financial summaries
+-- Aggregations used by /api/transacoes/resumo/* (api/services/transacoes.py),
+-- one round-trip each, backed by a covering index
+-- Run this in Supabase SQL Editor
+
+-- ============================================
+-- CREATE INDEXES
+-- ============================================
+
+-- Cobre os filtros (empresa, status, período) e as colunas somadas/agrupadas,
+-- permitindo index-only scan nos resumos
+CREATE INDEX IF NOT EXISTS idx_transacoes_resumo
+    ON transacoes(empresa_id, status, data_transacao)
+    INCLUDE (tipo, valor, projeto_id, categoria_id);
+
+-- ============================================
+-- FUNCTIONS
+-- ============================================
+
+-- Receitas e despesas pagas no período [data_inicio, data_fim)
+CREATE OR REPLACE FUNCTION resumo_transacoes_mensal(
+    empresa_id_int INTEGER,
+    data_inicio DATE,
+    data_fim DATE
+)
+RETURNS TABLE (
+    receitas FLOAT,
+    despesas FLOAT
+) AS $$
+    SELECT
+        COALESCE(SUM(t.valor) FILTER (WHERE t.tipo = 'receita'), 0)::FLOAT AS receitas,
+        COALESCE(SUM(t.valor) FILTER (WHERE t.tipo = 'despesa'), 0)::FLOAT AS despesas
+    FROM transacoes t
+    WHERE t.empresa_id = empresa_id_int
+    AND t.status = 'pago'
+    AND t.data_transacao >= data_inicio
+    AND t.data_transacao < data_fim;
+$$ LANGUAGE sql STABLE;
+
+-- Totais por projeto (todas as transações; sem projeto = 0)
+CREATE OR REPLACE FUNCTION resumo_transacoes_por_projeto(
+    empresa_id_int INTEGER
+)
+RETURNS TABLE (
+    projeto_id INTEGER,
+    receitas FLOAT,
+    despesas FLOAT
+) AS $$
+    SELECT
+        COALESCE(t.projeto_id, 0) AS projeto_id,
+        COALESCE(SUM(t.valor) FILTER (WHERE t.tipo = 'receita'), 0)::FLOAT AS receitas,
+        COALESCE(SUM(t.valor) FILTER (WHERE t.tipo <> 'receita'), 0)::FLOAT AS despesas
+    FROM transacoes t
+    WHERE t.empresa_id = empresa_id_int
+    GROUP BY COALESCE(t.projeto_id, 0)
+    ORDER BY 1;
+$$ LANGUAGE sql STABLE;
+
+-- Totais pagos por categoria no período [data_inicio, data_fim) (sem categoria = 0)
+CREATE OR REPLACE FUNCTION resumo_transacoes_por_categoria(
+    empresa_id_int INTEGER,
+    data_inicio DATE,
+    data_fim DATE
+)
+RETURNS TABLE (
+    categoria_id INTEGER,
+    receitas FLOAT,
+    despesas FLOAT
+) AS $$
+    SELECT
+        COALESCE(t.categoria_id, 0) AS categoria_id,
+        COALESCE(SUM(t.valor) FILTER (WHERE t.tipo = 'receita'), 0)::FLOAT AS receitas,
+        COALESCE(SUM(t.valor) FILTER (WHERE t.tipo <> 'receita'), 0)::FLOAT AS despesas
+    FROM transacoes t
+    WHERE t.empresa_id = empresa_id_int
+    AND t.status = 'pago'
+    AND t.data_transacao >= data_inicio
+    AND t.data_transacao < data_fim
+    GROUP BY COALESCE(t.categoria_id, 0)
+    ORDER BY 1;
+$$ LANGUAGE sql STABLE;
+
+SELECT 'Migration 004 completed successfully!' as result;
@@ -0,0 +1,197 @@
+-- Migration 005: Financial rollups
+-- Daily and monthly totals per (empresa, projeto, categoria, tipo, status),
+-- kept up to date by triggers on transacoes. The resumo_transacoes_* functions
+-- from migration 004 now read the rollups instead of scanning transacoes.
+-- Requires PostgreSQL 15+ (UNIQUE NULLS NOT DISTINCT)
+-- Run this in Supabase SQL Editor
+
+-- ============================================
+-- ROLLUP TABLES
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS transacoes_rollup_diario (
+    id BIGSERIAL PRIMARY KEY,
+    empresa_id INTEGER NOT NULL,
+    dia DATE,
+    projeto_id INTEGER,
+    categoria_id INTEGER,
+    tipo TEXT NOT NULL,
+    status TEXT,
+    total NUMERIC(15,2) NOT NULL DEFAULT 0,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    UNIQUE NULLS NOT DISTINCT (empresa_id, dia, projeto_id, categoria_id, tipo, status)
+);
+
+CREATE TABLE IF NOT EXISTS transacoes_rollup_mensal (
+    id BIGSERIAL PRIMARY KEY,
+    empresa_id INTEGER NOT NULL,
+    mes DATE,
+    projeto_id INTEGER,
+    categoria_id INTEGER,
+    tipo TEXT NOT NULL,
+    status TEXT,
+    total NUMERIC(15,2) NOT NULL DEFAULT 0,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    UNIQUE NULLS NOT DISTINCT (empresa_id, mes, projeto_id, categoria_id, tipo, status)
+);
+
+-- Somas exatas: em DOUBLE PRECISION os +/- de cada escrita acumulam erro de
+-- arredondamento e o total deixa de bater com os centavos. Cada valor entra
+-- arredondado a centavos, igual no trigger e na reconstrução
+ALTER TABLE transacoes_rollup_diario ALTER COLUMN total TYPE NUMERIC(15,2);
+ALTER TABLE transacoes_rollup_mensal ALTER COLUMN total TYPE NUMERIC(15,2);
+
+ALTER TABLE transacoes_rollup_diario DISABLE ROW LEVEL SECURITY;
+ALTER TABLE transacoes_rollup_mensal DISABLE ROW LEVEL SECURITY;
+
+-- ============================================
+-- CREATE INDEXES
+-- ============================================
+
+CREATE INDEX IF NOT EXISTS idx_rollup_diario_periodo ON transacoes_rollup_diario(empresa_id, status, dia);
+CREATE INDEX IF NOT EXISTS idx_rollup_mensal_periodo ON transacoes_rollup_mensal(empresa_id, status, mes);
+
+-- ============================================
+-- INCREMENTAL MAINTENANCE
+-- ============================================
+
+-- Soma (sinal = 1) ou remove (sinal = -1) uma transação dos dois rollups
+CREATE OR REPLACE FUNCTION aplicar_transacao_rollup(t transacoes, sinal INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO transacoes_rollup_diario AS r (empresa_id, dia, projeto_id, categoria_id, tipo, status, total, quantidade)
+    VALUES (t.empresa_id, t.data_transacao, t.projeto_id, t.categoria_id, t.tipo, t.status, sinal * COALESCE(t.valor, 0)::NUMERIC(15,2), sinal)
+    ON CONFLICT (empresa_id, dia, projeto_id, categoria_id, tipo, status) DO UPDATE SET
+        total = r.total + EXCLUDED.total,
+        quantidade = r.quantidade + EXCLUDED.quantidade;
+
+    INSERT INTO transacoes_rollup_mensal AS r (empresa_id, mes, projeto_id, categoria_id, tipo, status, total, quantidade)
+    VALUES (t.empresa_id, date_trunc('month', t.data_transacao)::DATE, t.projeto_id, t.categoria_id, t.tipo, t.status, sinal * COALESCE(t.valor, 0)::NUMERIC(15,2), sinal)
+    ON CONFLICT (empresa_id, mes, projeto_id, categoria_id, tipo, status) DO UPDATE SET
+        total = r.total + EXCLUDED.total,
+        quantidade = r.quantidade + EXCLUDED.quantidade;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION transacoes_rollup_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM aplicar_transacao_rollup(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM aplicar_transacao_rollup(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_transacoes_rollup ON transacoes;
+CREATE TRIGGER trg_transacoes_rollup
+    AFTER INSERT OR DELETE OR UPDATE OF empresa_id, data_transacao, projeto_id, categoria_id, tipo, status, valor
+    ON transacoes
+    FOR EACH ROW EXECUTE FUNCTION transacoes_rollup_trigger();
+
+-- ============================================
+-- REBUILD / BACKFILL
+-- ============================================
+
+-- Recalcula os rollups a partir de transacoes (uma empresa ou todas).
+-- Bloqueia escritas em transacoes durante a reconstrução.
+CREATE OR REPLACE FUNCTION reconstruir_transacoes_rollup(empresa_id_int INTEGER DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    buckets INTEGER;
+BEGIN
+    LOCK TABLE transacoes IN SHARE MODE;
+
+    DELETE FROM transacoes_rollup_diario WHERE empresa_id_int IS NULL OR empresa_id = empresa_id_int;
+    DELETE FROM transacoes_rollup_mensal WHERE empresa_id_int IS NULL OR empresa_id = empresa_id_int;
+
+    INSERT INTO transacoes_rollup_diario (empresa_id, dia, projeto_id, categoria_id, tipo, status, total, quantidade)
+    SELECT empresa_id, data_transacao, projeto_id, categoria_id, tipo, status, SUM(COALESCE(valor, 0)::NUMERIC(15,2)), COUNT(*)
+    FROM transacoes
+    WHERE empresa_id_int IS NULL OR empresa_id = empresa_id_int
+    GROUP BY empresa_id, data_transacao, projeto_id, categoria_id, tipo, status;
+
+    INSERT INTO transacoes_rollup_mensal (empresa_id, mes, projeto_id, categoria_id, tipo, status, total, quantidade)
+    SELECT empresa_id, date_trunc('month', dia)::DATE, projeto_id, categoria_id, tipo, status, SUM(total), SUM(quantidade)
+    FROM transacoes_rollup_diario
+    WHERE empresa_id_int IS NULL OR empresa_id = empresa_id_int
+    GROUP BY empresa_id, date_trunc('month', dia)::DATE, projeto_id, categoria_id, tipo, status;
+
+    SELECT count(*) INTO buckets FROM transacoes_rollup_diario
+    WHERE empresa_id_int IS NULL OR empresa_id = empresa_id_int;
+    RETURN buckets;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT reconstruir_transacoes_rollup();
+
+-- ============================================
+-- SUMMARY FUNCTIONS (read from rollups)
+-- ============================================
+
+CREATE OR REPLACE FUNCTION resumo_transacoes_mensal(
+    empresa_id_int INTEGER,
+    data_inicio DATE,
+    data_fim DATE
+)
+RETURNS TABLE (
+    receitas FLOAT,
+    despesas FLOAT
+) AS $$
+    SELECT
+        COALESCE(SUM(r.total) FILTER (WHERE r.tipo = 'receita'), 0)::FLOAT AS receitas,
+        COALESCE(SUM(r.total) FILTER (WHERE r.tipo = 'despesa'), 0)::FLOAT AS despesas
+    FROM transacoes_rollup_diario r
+    WHERE r.empresa_id = empresa_id_int
+    AND r.status = 'pago'
+    AND r.dia >= data_inicio
+    AND r.dia < data_fim;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION resumo_transacoes_por_projeto(
+    empresa_id_int INTEGER
+)
+RETURNS TABLE (
+    projeto_id INTEGER,
+    receitas FLOAT,
+    despesas FLOAT
+) AS $$
+    SELECT
+        COALESCE(r.projeto_id, 0) AS projeto_id,
+        COALESCE(SUM(r.total) FILTER (WHERE r.tipo = 'receita'), 0)::FLOAT AS receitas,
+        COALESCE(SUM(r.total) FILTER (WHERE r.tipo <> 'receita'), 0)::FLOAT AS despesas
+    FROM transacoes_rollup_mensal r
+    WHERE r.empresa_id = empresa_id_int
+    AND r.quantidade > 0
+    GROUP BY COALESCE(r.projeto_id, 0)
+    ORDER BY 1;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION resumo_transacoes_por_categoria(
+    empresa_id_int INTEGER,
+    data_inicio DATE,
+    data_fim DATE
+)
+RETURNS TABLE (
+    categoria_id INTEGER,
+    receitas FLOAT,
+    despesas FLOAT
+) AS $$
+    SELECT
+        COALESCE(r.categoria_id, 0) AS categoria_id,
+        COALESCE(SUM(r.total) FILTER (WHERE r.tipo = 'receita'), 0)::FLOAT AS receitas,
+        COALESCE(SUM(r.total) FILTER (WHERE r.tipo <> 'receita'), 0)::FLOAT AS despesas
+    FROM transacoes_rollup_diario r
+    WHERE r.empresa_id = empresa_id_int
+    AND r.status = 'pago'
+    AND r.dia >= data_inicio
+    AND r.dia < data_fim
+    AND r.quantidade > 0
+    GROUP BY COALESCE(r.categoria_id, 0)
+    ORDER BY 1;
+$$ LANGUAGE sql STABLE;
+
+SELECT 'Migration 005 completed successfully!' as result;
@@ -0,0 +1,70 @@
+-- Migration 006: Sprint rollover
+-- Set-based functions used by SprintService (api/services/sprints.py)
+-- when a sprint is closed
+-- Run this in Supabase SQL Editor
+
+-- ============================================
+-- CREATE INDEXES
+-- ============================================
+
+-- Próxima sprint planejada: empresa + status, em ordem
+CREATE INDEX IF NOT EXISTS idx_sprints_proxima ON sprints(empresa_id, status, ordem);
+
+-- ============================================
+-- FUNCTIONS
+-- ============================================
+
+-- Recalcula pontos_concluidos (soma das estimativas das tarefas em "done")
+CREATE OR REPLACE FUNCTION atualizar_pontos_sprint(sprint_id_int INTEGER)
+RETURNS INTEGER AS $$
+    UPDATE sprints s SET pontos_concluidos = COALESCE((
+        SELECT SUM(t.estimativa_pontos)
+        FROM tarefas t
+        WHERE t.sprint_id = s.id AND t.coluna = 'done'
+    ), 0)
+    WHERE s.id = sprint_id_int
+    RETURNING s.pontos_concluidos;
+$$ LANGUAGE sql;
+
+-- Move as tarefas não concluídas para a próxima sprint planejada (mesma
+-- empresa e projeto, menor ordem seguinte) e recalcula os pontos da sprint
+-- de origem, tudo na mesma transação. Sem próxima sprint nada é movido.
+-- Devolve também a empresa da sprint, para a API invalidar o cache dela.
+DROP FUNCTION IF EXISTS mover_tarefas_incompletas(INTEGER);
+CREATE OR REPLACE FUNCTION mover_tarefas_incompletas(sprint_id_int INTEGER)
+RETURNS TABLE (
+    empresa_id INTEGER,
+    proxima_sprint_id INTEGER,
+    proxima_sprint_nome TEXT,
+    tarefas_movidas INTEGER,
+    pontos_concluidos INTEGER
+) AS $$
+DECLARE
+    origem sprints%ROWTYPE;
+    proxima sprints%ROWTYPE;
+    movidas INTEGER := 0;
+BEGIN
+    SELECT * INTO origem FROM sprints WHERE id = sprint_id_int;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    SELECT * INTO proxima FROM sprints s
+    WHERE s.empresa_id = origem.empresa_id
+    AND s.status = 'planejada'
+    AND (origem.projeto_id IS NULL OR s.projeto_id = origem.projeto_id)
+    AND s.ordem > COALESCE(origem.ordem, 0)
+    ORDER BY s.ordem
+    LIMIT 1;
+
+    IF proxima.id IS NOT NULL THEN
+        UPDATE tarefas t SET sprint_id = proxima.id, updated_at = NOW()
+        WHERE t.sprint_id = origem.id AND t.coluna IS DISTINCT FROM 'done';
+        GET DIAGNOSTICS movidas = ROW_COUNT;
+    END IF;
+
+    RETURN QUERY SELECT origem.empresa_id, proxima.id, proxima.nome, movidas, atualizar_pontos_sprint(origem.id);
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT 'Migration 006 completed successfully!' as result;
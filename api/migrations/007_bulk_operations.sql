@@ -0,0 +1,69 @@
+-- Migration 007: Bulk operations
+-- Multi-row update used by the /bulk endpoints (api/services/bulk.py)
+-- Run this in Supabase SQL Editor
+
+-- ============================================
+-- FUNCTIONS
+-- ============================================
+
+-- Atualiza várias linhas de uma tabela numa única chamada.
+-- itens: [{indice, id, dados: {coluna: valor}}]
+-- atomico = true: qualquer erro desfaz o lote inteiro.
+-- atomico = false: cada item roda num savepoint próprio e os erros voltam por item.
+CREATE OR REPLACE FUNCTION atualizar_em_lote(
+    tabela TEXT,
+    empresa_id_int INTEGER,
+    itens JSONB,
+    atomico BOOLEAN DEFAULT false
+)
+RETURNS TABLE (
+    indice INTEGER,
+    registro JSONB,
+    erro TEXT
+) AS $$
+DECLARE
+    item JSONB;
+    colunas TEXT;
+    linha JSONB;
+BEGIN
+    IF tabela NOT IN ('tarefas', 'transacoes', 'contratos') THEN
+        RAISE EXCEPTION 'Tabela não suportada: %', tabela;
+    END IF;
+
+    FOR item IN SELECT value FROM jsonb_array_elements(itens) LOOP
+        SELECT string_agg(format('%I = r.%I', k, k), ', ')
+        INTO colunas
+        FROM jsonb_object_keys(item->'dados') AS k;
+
+        BEGIN
+            EXECUTE format(
+                'UPDATE %I t SET %s FROM jsonb_populate_record(NULL::%I, $1) r
+                 WHERE t.id = $2 AND t.empresa_id = $3
+                 RETURNING to_jsonb(t.*) - ''embedding'' - ''search_vector''',
+                tabela, colunas, tabela
+            )
+            INTO linha
+            USING item->'dados', (item->>'id')::INTEGER, empresa_id_int;
+
+            IF linha IS NULL THEN
+                RAISE EXCEPTION 'Registro % não encontrado', item->>'id';
+            END IF;
+
+            indice := (item->>'indice')::INTEGER;
+            registro := linha;
+            erro := NULL;
+            RETURN NEXT;
+        EXCEPTION WHEN OTHERS THEN
+            IF atomico THEN
+                RAISE EXCEPTION 'Item %: %', item->>'indice', SQLERRM;
+            END IF;
+            indice := (item->>'indice')::INTEGER;
+            registro := NULL;
+            erro := SQLERRM;
+            RETURN NEXT;
+        END;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT 'Migration 007 completed successfully!' as result;
@@ -0,0 +1,26 @@
+-- Migration 008: Keyset pagination
+-- Composite indexes matching the list ordering used by the cursor
+-- pagination (api/services/paginacao.py)
+-- Run this in Supabase SQL Editor
+
+-- ============================================
+-- CREATE INDEXES
+-- ============================================
+
+-- Listagens por empresa em ordem de criação (mais recentes primeiro)
+CREATE INDEX IF NOT EXISTS idx_tarefas_empresa_keyset
+    ON tarefas(empresa_id, created_at DESC NULLS LAST, id DESC);
+CREATE INDEX IF NOT EXISTS idx_contratos_empresa_keyset
+    ON contratos(empresa_id, created_at DESC NULLS LAST, id DESC);
+CREATE INDEX IF NOT EXISTS idx_projetos_empresa_keyset
+    ON projetos(empresa_id, created_at DESC NULLS LAST, id DESC);
+
+-- Transações por data da transação
+CREATE INDEX IF NOT EXISTS idx_transacoes_empresa_keyset
+    ON transacoes(empresa_id, data_transacao DESC NULLS LAST, id DESC);
+
+-- Usuários por nome
+CREATE INDEX IF NOT EXISTS idx_usuarios_empresa_keyset
+    ON usuarios(empresa_id, nome, id);
+
+SELECT 'Migration 008 completed successfully!' as result;
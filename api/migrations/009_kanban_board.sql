@@ -0,0 +1,69 @@
+-- Migration 009: Kanban board
+-- Single-query board used by GET /api/tarefas/board (api/services/tarefas.py)
+-- Run this in Supabase SQL Editor
+
+-- ============================================
+-- CREATE INDEXES
+-- ============================================
+
+-- Cartões de cada coluna em ordem
+CREATE INDEX IF NOT EXISTS idx_tarefas_board ON tarefas(empresa_id, coluna, ordem, id);
+
+-- ============================================
+-- FUNCTIONS
+-- ============================================
+
+-- Tarefas agrupadas por coluna: total de cada coluna e no máximo
+-- limite_coluna cartões (ordem, id). Filtros nulos são ignorados.
+CREATE OR REPLACE FUNCTION tarefas_board(
+    empresa_id_int INTEGER,
+    limite_coluna INTEGER DEFAULT 50,
+    sprint_id_int INTEGER DEFAULT NULL,
+    grupo_id_int INTEGER DEFAULT NULL,
+    projeto_id_int INTEGER DEFAULT NULL,
+    responsavel_int INTEGER DEFAULT NULL,
+    prioridade_filtro TEXT DEFAULT NULL,
+    status_filtro TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    coluna TEXT,
+    total BIGINT,
+    tarefas JSONB
+) AS $$
+    -- Só as colunas que o quadro pode projetar (CAMPOS_LISTA em
+    -- api/services/tarefas.py): embedding e descricao_html nem são lidos
+    WITH filtradas AS (
+        SELECT
+            t.id, t.empresa_id, t.projeto_id, t.titulo, t.descricao, t.coluna, t.prioridade,
+            t.estimativa_horas, t.estimativa_pontos, t.prazo, t.data_conclusao, t.tempo_gasto_minutos,
+            t.responsaveis, t.created_by, t.cliente_nome, t.tarefa_pai_id, t.eh_subtarefa, t.ordem,
+            t.tags, t.status, t.sprint_id, t.grupo_id, t.observadores, t.previsao_entrega,
+            t.estimativa_horas_prevista, t.data_inicio, t.motivo_pausa, t.motivo_suspensao,
+            t.motivo_abandono, t.data_pausa, t.data_suspensao, t.data_abandono,
+            t.created_at, t.updated_at,
+            ROW_NUMBER() OVER (PARTITION BY t.coluna ORDER BY t.ordem, t.id) AS posicao,
+            COUNT(*) OVER (PARTITION BY t.coluna) AS total_coluna
+        FROM tarefas t
+        WHERE t.empresa_id = empresa_id_int
+        AND (sprint_id_int IS NULL OR t.sprint_id = sprint_id_int)
+        AND (grupo_id_int IS NULL OR t.grupo_id = grupo_id_int)
+        AND (projeto_id_int IS NULL OR t.projeto_id = projeto_id_int)
+        AND (responsavel_int IS NULL OR t.responsaveis @> ARRAY[responsavel_int])
+        AND (prioridade_filtro IS NULL OR t.prioridade = prioridade_filtro)
+        AND (status_filtro IS NULL OR t.status = status_filtro)
+    )
+    SELECT
+        f.coluna,
+        MAX(f.total_coluna),
+        COALESCE(
+            jsonb_agg(
+                to_jsonb(f) - 'posicao' - 'total_coluna'
+                ORDER BY f.ordem, f.id
+            ) FILTER (WHERE f.posicao <= limite_coluna),
+            '[]'::jsonb
+        )
+    FROM filtradas f
+    GROUP BY f.coluna;
+$$ LANGUAGE sql STABLE;
+
+SELECT 'Migration 009 completed successfully!' as result;
@@ -0,0 +1,165 @@
+-- Migration 010: Conditional requests
+-- Cheap per-tenant version probe used for ETag / If-None-Match
+-- (api/middleware/condicional.py)
+-- Run this in Supabase SQL Editor
+
+-- ============================================
+-- CREATE TABLES
+-- ============================================
+
+-- Um contador por (tabela, empresa), incrementado na mesma transação de
+-- cada escrita. Diferente de MAX(updated_at)/COUNT(*), não perde escritas
+-- que começaram antes da última leitura e terminaram depois dela, nem um
+-- delete + insert que deixa o total igual.
+CREATE TABLE IF NOT EXISTS versoes_dados (
+    tabela TEXT NOT NULL,
+    empresa_id INTEGER NOT NULL,
+    versao BIGINT NOT NULL DEFAULT 0,
+    atualizado_em TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT clock_timestamp(),
+    PRIMARY KEY (tabela, empresa_id)
+);
+
+-- Versões de partida para os dados que já existem
+INSERT INTO versoes_dados (tabela, empresa_id, versao, atualizado_em)
+SELECT 'tarefas', empresa_id, COUNT(*), COALESCE(MAX(updated_at), clock_timestamp()) FROM tarefas GROUP BY empresa_id
+ON CONFLICT (tabela, empresa_id) DO NOTHING;
+
+INSERT INTO versoes_dados (tabela, empresa_id, versao, atualizado_em)
+SELECT 'transacoes', empresa_id, COUNT(*), COALESCE(MAX(updated_at), clock_timestamp()) FROM transacoes GROUP BY empresa_id
+ON CONFLICT (tabela, empresa_id) DO NOTHING;
+
+INSERT INTO versoes_dados (tabela, empresa_id, versao, atualizado_em)
+SELECT 'sprints', empresa_id, COUNT(*), COALESCE(MAX(updated_at), clock_timestamp()) FROM sprints GROUP BY empresa_id
+ON CONFLICT (tabela, empresa_id) DO NOTHING;
+
+-- ============================================
+-- TRIGGERS
+-- ============================================
+
+-- updated_at acompanha qualquer UPDATE, inclusive os feitos por RPCs
+-- (mover_tarefas_incompletas, atualizar_pontos_sprint, atualizar_em_lote).
+-- clock_timestamp(): a hora da escrita, não a do início da transação
+CREATE OR REPLACE FUNCTION tocar_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION _incrementar_versao(tabela_nome TEXT, empresa INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    IF empresa IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO versoes_dados (tabela, empresa_id, versao, atualizado_em)
+    VALUES (tabela_nome, empresa, 1, clock_timestamp())
+    ON CONFLICT (tabela, empresa_id) DO UPDATE SET
+        versao = versoes_dados.versao + 1,
+        atualizado_em = clock_timestamp();
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION incrementar_versao_dados()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM _incrementar_versao(TG_TABLE_NAME, OLD.empresa_id);
+        RETURN NULL;
+    END IF;
+
+    PERFORM _incrementar_versao(TG_TABLE_NAME, NEW.empresa_id);
+    IF TG_OP = 'UPDATE' THEN
+        -- Linha que troca de empresa muda as duas versões
+        IF OLD.empresa_id IS DISTINCT FROM NEW.empresa_id THEN
+            PERFORM _incrementar_versao(TG_TABLE_NAME, OLD.empresa_id);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Em tarefas e transações, o UPDATE que só grava o embedding
+-- (aplicar_embeddings, em segundo plano) não é uma mudança visível: não toca
+-- updated_at nem a versão, e não invalida ETags nem o cache do chat.
+-- search_vector é gerada a partir do texto e só muda junto com ele.
+DROP TRIGGER IF EXISTS trg_tarefas_updated_at ON tarefas;
+CREATE TRIGGER trg_tarefas_updated_at
+    BEFORE UPDATE ON tarefas
+    FOR EACH ROW
+    WHEN (OLD.embedding IS NOT DISTINCT FROM NEW.embedding)
+    EXECUTE FUNCTION tocar_updated_at();
+
+DROP TRIGGER IF EXISTS trg_transacoes_updated_at ON transacoes;
+CREATE TRIGGER trg_transacoes_updated_at
+    BEFORE UPDATE ON transacoes
+    FOR EACH ROW
+    WHEN (OLD.embedding IS NOT DISTINCT FROM NEW.embedding)
+    EXECUTE FUNCTION tocar_updated_at();
+
+DROP TRIGGER IF EXISTS trg_sprints_updated_at ON sprints;
+CREATE TRIGGER trg_sprints_updated_at
+    BEFORE UPDATE ON sprints
+    FOR EACH ROW EXECUTE FUNCTION tocar_updated_at();
+
+DROP TRIGGER IF EXISTS trg_tarefas_versao ON tarefas;
+CREATE TRIGGER trg_tarefas_versao
+    AFTER INSERT OR DELETE ON tarefas
+    FOR EACH ROW EXECUTE FUNCTION incrementar_versao_dados();
+
+DROP TRIGGER IF EXISTS trg_tarefas_versao_update ON tarefas;
+CREATE TRIGGER trg_tarefas_versao_update
+    AFTER UPDATE ON tarefas
+    FOR EACH ROW
+    WHEN (OLD.embedding IS NOT DISTINCT FROM NEW.embedding)
+    EXECUTE FUNCTION incrementar_versao_dados();
+
+DROP TRIGGER IF EXISTS trg_transacoes_versao ON transacoes;
+CREATE TRIGGER trg_transacoes_versao
+    AFTER INSERT OR DELETE ON transacoes
+    FOR EACH ROW EXECUTE FUNCTION incrementar_versao_dados();
+
+DROP TRIGGER IF EXISTS trg_transacoes_versao_update ON transacoes;
+CREATE TRIGGER trg_transacoes_versao_update
+    AFTER UPDATE ON transacoes
+    FOR EACH ROW
+    WHEN (OLD.embedding IS NOT DISTINCT FROM NEW.embedding)
+    EXECUTE FUNCTION incrementar_versao_dados();
+
+DROP TRIGGER IF EXISTS trg_sprints_versao ON sprints;
+CREATE TRIGGER trg_sprints_versao
+    AFTER INSERT OR UPDATE OR DELETE ON sprints
+    FOR EACH ROW EXECUTE FUNCTION incrementar_versao_dados();
+
+-- ============================================
+-- FUNCTIONS
+-- ============================================
+
+-- Versão dos dados de uma empresa numa tabela: o contador e a hora da
+-- última escrita (Last-Modified). Uma leitura por chave primária.
+DROP FUNCTION IF EXISTS versao_dados(TEXT, INTEGER);
+CREATE OR REPLACE FUNCTION versao_dados(tabela TEXT, empresa_id_int INTEGER)
+RETURNS TABLE (
+    versao BIGINT,
+    atualizado_em TIMESTAMP WITH TIME ZONE
+) AS $$
+BEGIN
+    IF tabela NOT IN ('tarefas', 'transacoes', 'sprints') THEN
+        RAISE EXCEPTION 'Tabela não suportada: %', tabela;
+    END IF;
+
+    RETURN QUERY
+    SELECT COALESCE(MAX(v.versao), 0)::BIGINT, MAX(v.atualizado_em)
+    FROM versoes_dados v
+    WHERE v.tabela = versao_dados.tabela AND v.empresa_id = empresa_id_int;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Os índices (empresa_id, updated_at) só serviam ao MAX(updated_at)
+DROP INDEX IF EXISTS idx_tarefas_empresa_updated;
+DROP INDEX IF EXISTS idx_transacoes_empresa_updated;
+DROP INDEX IF EXISTS idx_sprints_empresa_updated;
+
+SELECT 'Migration 010 completed successfully!' as result;
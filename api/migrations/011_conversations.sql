@@ -0,0 +1,87 @@
+-- Migration 011: Conversations
+-- Server-side chat history used by /api/chat (api/services/conversas.py)
+-- Run this in Supabase SQL Editor
+
+-- ============================================
+-- CONVERSAS TABLE
+-- ============================================
+CREATE TABLE IF NOT EXISTS conversas (
+    id SERIAL PRIMARY KEY,
+    empresa_id INTEGER NOT NULL DEFAULT 1,
+    usuario_id UUID,
+    agente VARCHAR(50) NOT NULL,
+    titulo VARCHAR(255),
+    contexto JSONB,
+    status VARCHAR(20) DEFAULT 'ativa',
+    mensagens_count INTEGER DEFAULT 0,
+    tokens_usados INTEGER DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Resumo das mensagens que já saíram da janela de contexto
+ALTER TABLE conversas ADD COLUMN IF NOT EXISTS resumo TEXT;
+ALTER TABLE conversas ADD COLUMN IF NOT EXISTS resumo_ate_id INTEGER DEFAULT 0;
+
+-- ============================================
+-- MENSAGENS TABLE
+-- ============================================
+CREATE TABLE IF NOT EXISTS mensagens (
+    id SERIAL PRIMARY KEY,
+    conversa_id INTEGER REFERENCES conversas(id) ON DELETE CASCADE,
+    role VARCHAR(20) NOT NULL,
+    conteudo TEXT NOT NULL,
+    conteudo_html TEXT,
+    modelo VARCHAR(100),
+    tokens INTEGER,
+    tempo_resposta_ms INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- ============================================
+-- CREATE INDEXES
+-- ============================================
+
+-- Últimas mensagens de uma conversa (janela de contexto)
+CREATE INDEX IF NOT EXISTS idx_mensagens_conversa ON mensagens(conversa_id, id DESC);
+
+-- Conversas recentes por empresa e agente
+CREATE INDEX IF NOT EXISTS idx_conversas_empresa ON conversas(empresa_id, agente, updated_at DESC);
+
+-- ============================================
+-- FUNCTIONS
+-- ============================================
+
+-- Grava a pergunta e a resposta de um turno e atualiza os contadores da
+-- conversa numa única chamada.
+-- itens: [{role, conteudo, modelo, tokens, tempo_resposta_ms}]
+CREATE OR REPLACE FUNCTION registrar_mensagens(
+    conversa_id_int INTEGER,
+    itens JSONB
+)
+RETURNS SETOF mensagens AS $$
+DECLARE
+    total_tokens INTEGER;
+BEGIN
+    SELECT COALESCE(SUM((value->>'tokens')::INTEGER), 0)
+    INTO total_tokens
+    FROM jsonb_array_elements(itens);
+
+    UPDATE conversas
+    SET mensagens_count = mensagens_count + jsonb_array_length(itens),
+        tokens_usados = tokens_usados + total_tokens,
+        updated_at = NOW()
+    WHERE id = conversa_id_int;
+
+    RETURN QUERY
+    INSERT INTO mensagens (conversa_id, role, conteudo, modelo, tokens, tempo_resposta_ms)
+    SELECT conversa_id_int, r.role, r.conteudo, r.modelo, r.tokens, r.tempo_resposta_ms
+    FROM jsonb_to_recordset(itens) AS r(role TEXT, conteudo TEXT, modelo TEXT, tokens INTEGER, tempo_resposta_ms INTEGER)
+    RETURNING *;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE conversas DISABLE ROW LEVEL SECURITY;
+ALTER TABLE mensagens DISABLE ROW LEVEL SECURITY;
+
+SELECT 'Migration 011 completed successfully!' as result;
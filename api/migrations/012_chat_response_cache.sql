@@ -0,0 +1,81 @@
+-- Migration 012: Chat response cache
+-- Version counters (versoes_dados, migration 010) for contratos and projetos.
+-- The /api/chat response cache keys on cache generations instead
+-- (api/services/respostas.py), so nothing here runs per chat message
+-- Run this in Supabase SQL Editor
+
+-- ============================================
+-- CREATE TABLES
+-- ============================================
+
+-- Versões de partida em versoes_dados (migration 010)
+INSERT INTO versoes_dados (tabela, empresa_id, versao, atualizado_em)
+SELECT 'contratos', empresa_id, COUNT(*), COALESCE(MAX(updated_at), clock_timestamp()) FROM contratos GROUP BY empresa_id
+ON CONFLICT (tabela, empresa_id) DO NOTHING;
+
+INSERT INTO versoes_dados (tabela, empresa_id, versao, atualizado_em)
+SELECT 'projetos', empresa_id, COUNT(*), COALESCE(MAX(updated_at), clock_timestamp()) FROM projetos GROUP BY empresa_id
+ON CONFLICT (tabela, empresa_id) DO NOTHING;
+
+-- ============================================
+-- TRIGGERS
+-- ============================================
+
+-- contratos também recebe embeddings em segundo plano: o UPDATE que só
+-- grava o embedding não muda updated_at nem a versão
+DROP TRIGGER IF EXISTS trg_contratos_updated_at ON contratos;
+CREATE TRIGGER trg_contratos_updated_at
+    BEFORE UPDATE ON contratos
+    FOR EACH ROW
+    WHEN (OLD.embedding IS NOT DISTINCT FROM NEW.embedding)
+    EXECUTE FUNCTION tocar_updated_at();
+
+DROP TRIGGER IF EXISTS trg_projetos_updated_at ON projetos;
+CREATE TRIGGER trg_projetos_updated_at
+    BEFORE UPDATE ON projetos
+    FOR EACH ROW EXECUTE FUNCTION tocar_updated_at();
+
+DROP TRIGGER IF EXISTS trg_contratos_versao ON contratos;
+CREATE TRIGGER trg_contratos_versao
+    AFTER INSERT OR DELETE ON contratos
+    FOR EACH ROW EXECUTE FUNCTION incrementar_versao_dados();
+
+DROP TRIGGER IF EXISTS trg_contratos_versao_update ON contratos;
+CREATE TRIGGER trg_contratos_versao_update
+    AFTER UPDATE ON contratos
+    FOR EACH ROW
+    WHEN (OLD.embedding IS NOT DISTINCT FROM NEW.embedding)
+    EXECUTE FUNCTION incrementar_versao_dados();
+
+DROP TRIGGER IF EXISTS trg_projetos_versao ON projetos;
+CREATE TRIGGER trg_projetos_versao
+    AFTER INSERT OR UPDATE OR DELETE ON projetos
+    FOR EACH ROW EXECUTE FUNCTION incrementar_versao_dados();
+
+-- ============================================
+-- FUNCTIONS
+-- ============================================
+
+-- Mesma função da migration 010, agora também para contratos e projetos
+DROP FUNCTION IF EXISTS versao_dados(TEXT, INTEGER);
+CREATE OR REPLACE FUNCTION versao_dados(tabela TEXT, empresa_id_int INTEGER)
+RETURNS TABLE (
+    versao BIGINT,
+    atualizado_em TIMESTAMP WITH TIME ZONE
+) AS $$
+BEGIN
+    IF tabela NOT IN ('tarefas', 'transacoes', 'sprints', 'contratos', 'projetos') THEN
+        RAISE EXCEPTION 'Tabela não suportada: %', tabela;
+    END IF;
+
+    RETURN QUERY
+    SELECT COALESCE(MAX(v.versao), 0)::BIGINT, MAX(v.atualizado_em)
+    FROM versoes_dados v
+    WHERE v.tabela = versao_dados.tabela AND v.empresa_id = empresa_id_int;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+DROP INDEX IF EXISTS idx_contratos_empresa_updated;
+DROP INDEX IF EXISTS idx_projetos_empresa_updated;
+
+SELECT 'Migration 012 completed successfully!' as result;
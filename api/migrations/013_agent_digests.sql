@@ -0,0 +1,161 @@
+-- Migration 013: Agent digests
+-- Open tasks aggregated per priority for the data digests injected into the
+-- chat prompts (api/services/panoramas.py). Counts are kept incrementally by
+-- triggers on tarefas (tarefas_abertas_rollup), like migration 005.
+-- Requires PostgreSQL 15+ (UNIQUE NULLS NOT DISTINCT)
+-- Run this in Supabase SQL Editor
+
+-- ============================================
+-- CREATE INDEXES
+-- ============================================
+
+-- Tarefas abertas por prioridade e prazo (o digest não lê as concluídas)
+CREATE INDEX IF NOT EXISTS idx_tarefas_abertas_prazo ON tarefas(empresa_id, prioridade, prazo)
+    WHERE coluna <> 'done';
+
+-- Contratos ativos por vencimento
+CREATE INDEX IF NOT EXISTS idx_contratos_ativos_data_fim ON contratos(empresa_id, data_fim)
+    WHERE status = 'ativo';
+
+-- ============================================
+-- ROLLUP TABLE
+-- ============================================
+
+-- Tarefas abertas por (empresa, prioridade, prazo), mantidas pelos triggers
+-- como os rollups de transações (migration 005). O prazo fica no bucket
+-- para "atrasadas" valer para qualquer dia sem recontar as tarefas
+CREATE TABLE IF NOT EXISTS tarefas_abertas_rollup (
+    id BIGSERIAL PRIMARY KEY,
+    empresa_id INTEGER NOT NULL,
+    prioridade TEXT,
+    prazo DATE,
+    total INTEGER NOT NULL DEFAULT 0,
+    UNIQUE NULLS NOT DISTINCT (empresa_id, prioridade, prazo)
+);
+
+ALTER TABLE tarefas_abertas_rollup DISABLE ROW LEVEL SECURITY;
+
+-- ============================================
+-- INCREMENTAL MAINTENANCE
+-- ============================================
+
+-- Soma (sinal = 1) ou remove (sinal = -1) uma tarefa do rollup, se aberta
+CREATE OR REPLACE FUNCTION aplicar_tarefa_aberta_rollup(t tarefas, sinal INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    -- Mesma definição de aberta de panorama_tarefas (coluna nula não conta)
+    IF t.empresa_id IS NULL OR t.coluna IS NULL OR t.coluna = 'done'
+        OR COALESCE(t.status, 'ativa') IN ('concluida', 'abandonada') THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO tarefas_abertas_rollup AS r (empresa_id, prioridade, prazo, total)
+    VALUES (t.empresa_id, t.prioridade, t.prazo, sinal)
+    ON CONFLICT (empresa_id, prioridade, prazo) DO UPDATE SET
+        total = r.total + EXCLUDED.total;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tarefas_abertas_rollup_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM aplicar_tarefa_aberta_rollup(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM aplicar_tarefa_aberta_rollup(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_tarefas_abertas_rollup ON tarefas;
+CREATE TRIGGER trg_tarefas_abertas_rollup
+    AFTER INSERT OR DELETE OR UPDATE OF empresa_id, prioridade, prazo, coluna, status
+    ON tarefas
+    FOR EACH ROW EXECUTE FUNCTION tarefas_abertas_rollup_trigger();
+
+-- ============================================
+-- REBUILD / BACKFILL
+-- ============================================
+
+-- Recalcula o rollup a partir de tarefas (uma empresa ou todas).
+-- Bloqueia escritas em tarefas durante a reconstrução.
+CREATE OR REPLACE FUNCTION reconstruir_tarefas_abertas_rollup(empresa_id_int INTEGER DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    buckets INTEGER;
+BEGIN
+    LOCK TABLE tarefas IN SHARE MODE;
+
+    DELETE FROM tarefas_abertas_rollup WHERE empresa_id_int IS NULL OR empresa_id = empresa_id_int;
+
+    INSERT INTO tarefas_abertas_rollup (empresa_id, prioridade, prazo, total)
+    SELECT empresa_id, prioridade, prazo, COUNT(*)
+    FROM tarefas
+    WHERE (empresa_id_int IS NULL OR empresa_id = empresa_id_int)
+    AND empresa_id IS NOT NULL
+    AND coluna <> 'done'
+    AND COALESCE(status, 'ativa') NOT IN ('concluida', 'abandonada')
+    GROUP BY empresa_id, prioridade, prazo;
+
+    SELECT count(*) INTO buckets FROM tarefas_abertas_rollup
+    WHERE empresa_id_int IS NULL OR empresa_id = empresa_id_int;
+    RETURN buckets;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT reconstruir_tarefas_abertas_rollup();
+
+-- ============================================
+-- FUNCTIONS
+-- ============================================
+
+-- Uma linha por prioridade: total de tarefas abertas e quantas estão
+-- atrasadas (somas do rollup, custo proporcional ao número de buckets) e as
+-- limite_itens de prazo mais próximo (idx_tarefas_abertas_prazo, com LIMIT)
+CREATE OR REPLACE FUNCTION panorama_tarefas(
+    empresa_id_int INTEGER,
+    hoje DATE,
+    limite_itens INTEGER DEFAULT 5
+)
+RETURNS TABLE (
+    prioridade TEXT,
+    total BIGINT,
+    atrasadas BIGINT,
+    tarefas JSONB
+) AS $$
+    WITH contagens AS (
+        SELECT
+            r.prioridade,
+            SUM(r.total)::BIGINT AS total,
+            COALESCE(SUM(r.total) FILTER (WHERE r.prazo < hoje), 0)::BIGINT AS atrasadas
+        FROM tarefas_abertas_rollup r
+        WHERE r.empresa_id = empresa_id_int
+        GROUP BY r.prioridade
+        HAVING SUM(r.total) > 0
+    )
+    SELECT
+        c.prioridade,
+        c.total,
+        c.atrasadas,
+        COALESCE((
+            SELECT jsonb_agg(
+                jsonb_build_object('id', p.id, 'titulo', p.titulo, 'coluna', p.coluna, 'prazo', p.prazo)
+                ORDER BY p.prazo NULLS LAST, p.id
+            )
+            FROM (
+                SELECT t.id, t.titulo, t.coluna, t.prazo
+                FROM tarefas t
+                WHERE t.empresa_id = empresa_id_int
+                AND (t.prioridade = c.prioridade OR (c.prioridade IS NULL AND t.prioridade IS NULL))
+                AND t.coluna <> 'done'
+                AND COALESCE(t.status, 'ativa') NOT IN ('concluida', 'abandonada')
+                ORDER BY t.prazo NULLS LAST, t.id
+                LIMIT limite_itens
+            ) p
+        ), '[]'::jsonb)
+    FROM contagens c;
+$$ LANGUAGE sql STABLE;
+
+SELECT 'Migration 013 completed successfully!' as result;
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
-import os
+from typing import Optional, List, Dict, Any, AsyncIterator
+import asyncio
+import json
+import time
 import httpx
 
+from api.services import llm, conversas, respostas, roteador, admissao, panoramas, metricas
+
 router = APIRouter()
 
+HEADER_CACHE = "X-Chat-Cache"
+
 AGENT_SYSTEM_PROMPTS = {
     "chief": """Você é o Chief Agent da EdiculaWorks, um assistente de gestão estratégica.
     Você ajuda com planejamento estratégico, objetivos de negócio, métricas e decisões de alto nível.
@@ -33,6 +40,62 @@ AGENT_SYSTEM_PROMPTS = {
 }
 
 
+# Orçamento de tokens do prompt por agente: system, resumo, histórico e a
+# nova mensagem (a resposta tem o próprio limite, LLM_MAX_TOKENS)
+AGENT_CONTEXT_TOKENS = {
+    "chief": 8000,
+    "tech": 12000,
+    "gestao": 6000,
+    "financeiro": 6000,
+    "security": 6000,
+    "ops": 4000,
+}
+
+# Tabelas cujos dados o agente consulta: a versão delas entra na chave do
+# cache de respostas, então qualquer escrita nelas invalida as respostas
+AGENT_DADOS = {
+    "chief": ["tarefas", "projetos", "contratos", "transacoes"],
+    "tech": ["tarefas"],
+    "gestao": ["tarefas", "sprints", "projetos"],
+    "financeiro": ["contratos", "transacoes"],
+    "security": [],
+    "ops": ["tarefas", "contratos"],
+}
+
+# Resumos dos dados da empresa (api/services/panoramas.py) que entram no
+# prompt do agente, já em cache: perguntas como "o que está atrasado?" não
+# precisam de listas coladas no histórico
+AGENT_PANORAMAS = {
+    "chief": ["tarefas", "contratos", "caixa"],
+    "tech": ["tarefas"],
+    "gestao": ["tarefas", "sprint"],
+    "financeiro": ["contratos", "caixa"],
+    "security": [],
+    "ops": ["tarefas", "contratos"],
+}
+
+# Categoria da tabela "routing" do config/model-config.json usada por agente
+# (o modelo dela vem primeiro; o resto da fallbackChain é o failover)
+AGENT_ROTA = {
+    "chief": "analysis",
+    "tech": "code",
+    "gestao": "simple",
+    "financeiro": "analysis",
+    "security": "simple",
+    "ops": "simple",
+}
+
+# Prioridade na fila de chamadas ao LLM quando não há vaga (menor passa na frente)
+AGENT_PRIORIDADE = {
+    "chief": 0,
+    "gestao": 1,
+    "financeiro": 1,
+    "tech": 2,
+    "security": 2,
+    "ops": 3,
+}
+
+
 class ChatMessage(BaseModel):
     role: str
     content: str
@@ -41,65 +104,224 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     agente: str
     mensagem: str
+    conversa_id: Optional[int] = None
+    # Compatibilidade: sem conversa_id, o histórico enviado pelo cliente é usado e nada é gravado
     historico: Optional[List[ChatMessage]] = []
 
 
 class ChatResponse(BaseModel):
     resposta: str
     agente: str
+    conversa_id: Optional[int] = None
 
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    """Endpoint para chat com agentes IA via OpenRouter"""
-    
+class Turno:
+    """Prompt de um turno e a conversa em que ele será gravado."""
+
+    def __init__(self, request: ChatRequest, empresa_id: int, messages: List[Dict[str, str]], conversa: Optional[Dict[str, Any]], persistir: bool):
+        self.request = request
+        self.empresa_id = empresa_id
+        self.messages = messages
+        self.conversa = conversa
+        self.persistir = persistir
+        # Versão dos dados do agente, só quando o cache de respostas vale para ele
+        self.versao: Optional[str] = None
+
+    async def consultar_cache(self) -> Optional[respostas.Consulta]:
+        if self.versao is None:
+            return None
+        return await respostas.Consulta(self.request.agente, self.empresa_id, self.messages, self.versao).iniciar()
+
+    async def registrar(self, resposta: str, modelo: Optional[str], tempo_ms: Optional[float]) -> Optional[int]:
+        """Grava o turno (criando a conversa no primeiro) e devolve o conversa_id."""
+        if not self.persistir:
+            return None
+        try:
+            if self.conversa is None:
+                self.conversa = await conversas.criar_conversa(self.request.agente, self.empresa_id, self.request.mensagem[:80])
+            await conversas.registrar_turno(
+                self.conversa["id"], self.request.mensagem, resposta, modelo,
+                int(tempo_ms) if tempo_ms is not None else None
+            )
+        except Exception as e:
+            print(f"[ERROR] Erro ao gravar conversa: {e}")
+        return self.conversa["id"] if self.conversa else None
+
+
+async def _turno(request: ChatRequest, empresa_id: int) -> Turno:
     if request.agente not in AGENT_SYSTEM_PROMPTS:
         raise HTTPException(status_code=400, detail="Agente inválido")
     
-    openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
-    if not openrouter_api_key:
-        raise HTTPException(status_code=500, detail="OpenRouter API key não configurada")
-    
     system_prompt = AGENT_SYSTEM_PROMPTS[request.agente]
+    panorama = await panoramas.montar(AGENT_PANORAMAS.get(request.agente, []), empresa_id)
+    if panorama:
+        system_prompt = f"{system_prompt}\n\n{panorama}"
     
-    messages = [
-        {"role": "system", "content": system_prompt}
-    ]
+    if request.conversa_id is None:
+        messages = [{"role": "system", "content": system_prompt}]
+        for msg in request.historico:
+            messages.append({"role": msg.role, "content": msg.content})
+        messages.append({"role": "user", "content": request.mensagem})
+        return Turno(request, empresa_id, messages, None, persistir=not request.historico)
     
-    for msg in request.historico:
-        messages.append({"role": msg.role, "content": msg.content})
+    conversa = await conversas.buscar_conversa(request.conversa_id, empresa_id)
+    if not conversa:
+        raise HTTPException(status_code=404, detail="Conversa não encontrada")
+    if conversa["agente"] != request.agente:
+        raise HTTPException(status_code=400, detail="Conversa pertence a outro agente")
     
-    messages.append({"role": "user", "content": request.mensagem})
+    messages = await conversas.montar_contexto(
+        conversa, system_prompt, request.mensagem,
+        AGENT_CONTEXT_TOKENS.get(request.agente, conversas.CHAT_CONTEXT_TOKENS)
+    )
+    return Turno(request, empresa_id, messages, conversa, persistir=True)
+
+
+def _medir(agente: str, modo: str, modelo: Optional[str], origem: str, ttft_ms: Optional[float], total_ms: Optional[float]):
+    """Tempos do turno em /metrics (llm_time_to_first_token_seconds, llm_response_duration_seconds)."""
+    if ttft_ms is not None:
+        metricas.llm_ttft.observar(ttft_ms / 1000, agente, modelo or "", modo, origem)
+    if total_ms is not None:
+        metricas.llm_duracao.observar(total_ms / 1000, agente, modelo or "", modo, origem)
+
+
+async def _preparar(request: ChatRequest, empresa_id: int) -> Turno:
+    turno = await _turno(request, empresa_id)
+    if respostas.habilitado(request.agente):
+        turno.versao = respostas.versao(AGENT_DADOS.get(request.agente, []))
+    return turno
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest, response: Response, empresa_id: int = Query(1)):
+    """
+    Endpoint para chat com agentes IA via OpenRouter. O histórico fica no
+    servidor: o primeiro turno cria a conversa e devolve conversa_id; os
+    seguintes mandam só a mensagem nova com esse id. Para os agentes em
+    CHAT_CACHE_AGENTES, perguntas idênticas (mesmos dados) vêm do cache ou
+    esperam a chamada em andamento (header X-Chat-Cache). As chamadas ao
+    LLM passam por uma fila por prioridade do agente: sem vaga a tempo,
+    503; sem cota do provedor, 429.
+    """
+    
+    turno = await _preparar(request, empresa_id)
+    
+    async def gerar():
+        async with admissao.vaga(request.agente, AGENT_PRIORIDADE.get(request.agente, admissao.PRIORIDADE_PADRAO)):
+            modelo, resposta = await roteador.get_router().completar(turno.messages, AGENT_ROTA.get(request.agente), agente=request.agente)
+        return resposta, roteador.nome_api(modelo)
     
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {openrouter_api_key}",
-                    "Content-Type": "application/json",
-                    "HTTP-Referer": "https://edihub.work.gd",
-                    "X-Title": "EdiculaWorks"
-                },
-                json={
-                    "model": "openrouter/auto",
-                    "messages": messages,
-                    "max_tokens": 2048
-                }
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(status_code=500, detail=f"Erro na API: {response.text}")
-            
-            data = response.json()
-            resposta = data["choices"][0]["message"]["content"]
-            
-            return ChatResponse(resposta=resposta, agente=request.agente)
-            
+        inicio = time.perf_counter()
+        origem = "provedor"
+        if turno.versao is not None:
+            entrada, origem = await respostas.lembrar(request.agente, empresa_id, turno.messages, turno.versao, gerar)
+            resposta, modelo = entrada["resposta"], entrada["modelo"]
+            response.headers[HEADER_CACHE] = origem
+        else:
+            resposta, modelo = await gerar()
+        tempo_ms = (time.perf_counter() - inicio) * 1000
+    except llm.LLMError as e:
+        metricas.llm_erros.inc(request.agente, "completo", str(e.status_code))
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except httpx.TimeoutException:
+        metricas.llm_erros.inc(request.agente, "completo", "504")
         raise HTTPException(status_code=504, detail="Timeout na requisição")
     except Exception as e:
+        metricas.llm_erros.inc(request.agente, "completo", "500")
         raise HTTPException(status_code=500, detail=f"Erro: {str(e)}")
+    
+    # Sem streaming o primeiro trecho chega junto com a resposta inteira
+    _medir(request.agente, "completo", modelo, origem, tempo_ms, tempo_ms)
+    conversa_id = await turno.registrar(resposta, modelo, tempo_ms)
+    return ChatResponse(resposta=resposta, agente=request.agente, conversa_id=conversa_id)
+
+
+def _sse(evento: str, dados: Dict[str, Any]) -> bytes:
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n".encode()
+
+
+async def _relay(turno: Turno) -> AsyncIterator[bytes]:
+    inicio = time.perf_counter()
+    consulta = await turno.consultar_cache()
+    if consulta is not None:
+        origem = "cache"
+        entrada = consulta.entrada
+        if entrada is None and consulta.voo is not None:
+            origem = "coalescida"
+            entrada = await consulta.aguardar()
+        if entrada is not None:
+            tempos = {"ttft_ms": round((time.perf_counter() - inicio) * 1000, 1), "modelo": entrada["modelo"]}
+            _medir(turno.request.agente, "stream", entrada["modelo"], origem, tempos["ttft_ms"], tempos["ttft_ms"])
+            conversa_id = await turno.registrar(entrada["resposta"], entrada["modelo"], tempos["ttft_ms"])
+            yield _sse("delta", {"delta": entrada["resposta"]})
+            yield _sse("fim", {
+                "agente": turno.request.agente, "conversa_id": conversa_id, "resposta": entrada["resposta"],
+                "origem": origem, **tempos, "total_ms": tempos["ttft_ms"],
+            })
+            return
+        if not consulta.lider:
+            consulta = None
+
+    tempos: Dict[str, Any] = {}
+    partes: List[str] = []
+    concluido = False
+    try:
+        agente = turno.request.agente
+        async with admissao.vaga(agente, AGENT_PRIORIDADE.get(agente, admissao.PRIORIDADE_PADRAO)) as pedido:
+            tempos["fila_ms"] = round(pedido.espera * 1000, 1)
+            async for delta in roteador.get_router().stream(turno.messages, AGENT_ROTA.get(agente), tempos=tempos, agente=agente):
+                partes.append(delta)
+                yield _sse("delta", {"delta": delta})
+        resposta = "".join(partes)
+        if consulta is not None:
+            await consulta.gravar(resposta, tempos.get("modelo"), tempos.get("total_ms"))
+        concluido = True
+    except llm.LLMError as e:
+        if consulta is not None:
+            consulta.falhar(e)
+        metricas.llm_erros.inc(turno.request.agente, "stream", str(e.status_code))
+        yield _sse("erro", {"detail": str(e), "status": e.status_code})
+        return
+    except httpx.TimeoutException as e:
+        if consulta is not None:
+            consulta.falhar(e)
+        metricas.llm_erros.inc(turno.request.agente, "stream", "504")
+        yield _sse("erro", {"detail": "Timeout na requisição", "status": 504})
+        return
+    except Exception as e:
+        if consulta is not None:
+            consulta.falhar(e)
+        metricas.llm_erros.inc(turno.request.agente, "stream", "500")
+        yield _sse("erro", {"detail": f"Erro: {str(e)}", "status": 500})
+        return
+    finally:
+        # Cliente desconectou no meio: quem esperava por esta chamada segue sozinho
+        if consulta is not None and not concluido:
+            consulta.falhar(asyncio.CancelledError())
+    _medir(turno.request.agente, "stream", tempos.get("modelo"), "provedor", tempos.get("ttft_ms"), tempos.get("total_ms"))
+    conversa_id = await turno.registrar(resposta, tempos.get("modelo"), tempos.get("total_ms"))
+    yield _sse("fim", {
+        "agente": turno.request.agente, "conversa_id": conversa_id, "resposta": resposta,
+        "origem": "provedor" if consulta is not None else None, **tempos,
+    })
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, empresa_id: int = Query(1)):
+    """
+    Mesmo chat, em Server-Sent Events: um evento "delta" por trecho gerado,
+    "fim" com a resposta completa, o conversa_id e os tempos (ttft_ms,
+    total_ms) ou "erro".
+    """
+    turno = await _preparar(request, empresa_id)
+    if not llm.configurado():
+        raise HTTPException(status_code=500, detail="OpenRouter API key não configurada")
+    return StreamingResponse(
+        _relay(turno),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/agentes")
@@ -1,35 +1,80 @@
-from fastapi import APIRouter, HTTPException, status, Query, UploadFile, File, Form
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, status, Query, Response, UploadFile, File, Form
+from typing import List, Optional, Dict, Any
 from datetime import date
 
-from api.schemas.contrato import ContratoCreate, ContratoUpdate, ContratoResponse
+from api.schemas.contrato import ContratoCreate, ContratoUpdate, ContratoResponse, ContratoParcial, ContratoBulkStatus
 from api.services import contratos as contrato_service
+from api.services import paginacao
+from api.services.bulk import LoteRejeitado
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[ContratoResponse])
+@router.get("/", response_model=List[ContratoParcial], response_model_exclude_unset=True)
 async def listar_contratos(
+    response: Response,
     empresa_id: int = Query(1, description="ID da empresa"),
     status: Optional[str] = Query(None, description="Filtrar por status"),
     tipo: Optional[str] = Query(None, description="Filtrar por tipo"),
     cliente_id: Optional[int] = Query(None, description="Filtrar por cliente (ID)"),
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=500)
+    skip: int = Query(0, ge=0, description="Compatibilidade; prefira cursor"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor)"),
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula, um preset ou *")
 ):
-    return await contrato_service.listar_contratos(
-        empresa_id=empresa_id,
-        status=status,
-        tipo=tipo,
-        cliente_id=cliente_id,
-        skip=skip,
-        limit=limit
-    )
-
-
-@router.get("/{contrato_id}", response_model=ContratoResponse)
-async def buscar_contrato(contrato_id: int, empresa_id: int = Query(1)):
-    contrato = await contrato_service.buscar_contrato(contrato_id, empresa_id)
+    try:
+        rows = await contrato_service.listar_contratos(
+            empresa_id=empresa_id,
+            status=status,
+            tipo=tipo,
+            cliente_id=cliente_id,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            fields=fields
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cursor_proximo = paginacao.proximo_cursor(rows, contrato_service.ORDEM, limit)
+    if cursor_proximo:
+        response.headers[paginacao.HEADER_CURSOR] = cursor_proximo
+    return rows
+
+
+@router.post("/bulk")
+async def criar_contratos_em_lote(itens: List[Dict[str, Any]], atomico: bool = False):
+    try:
+        return await contrato_service.criar_contratos_em_lote(itens, atomico)
+    except LoteRejeitado as e:
+        raise HTTPException(status_code=422, detail={"mensagem": str(e), "erros": e.erros})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.patch("/bulk")
+async def atualizar_contratos_em_lote(itens: List[Dict[str, Any]], empresa_id: int = Query(1), atomico: bool = False):
+    try:
+        return await contrato_service.atualizar_contratos_em_lote(itens, empresa_id, atomico)
+    except LoteRejeitado as e:
+        raise HTTPException(status_code=422, detail={"mensagem": str(e), "erros": e.erros})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/bulk/status")
+async def alterar_status_contratos_em_lote(lote: ContratoBulkStatus, empresa_id: int = Query(1)):
+    try:
+        return await contrato_service.alterar_status_contratos_em_lote(lote.ids, lote.status.value, empresa_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{contrato_id}", response_model=ContratoParcial, response_model_exclude_unset=True)
+async def buscar_contrato(contrato_id: int, empresa_id: int = Query(1), fields: Optional[str] = None):
+    try:
+        contrato = await contrato_service.buscar_contrato(contrato_id, empresa_id, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not contrato:
         raise HTTPException(status_code=404, detail="Contrato não encontrado")
     return contrato
@@ -61,7 +106,7 @@ async def upload_arquivo(
     arquivo: UploadFile = File(...),
     empresa_id: int = Query(1)
 ):
-    from api.database import get_db
+    from api.database import get_db, run_sync
     
     contrato = await contrato_service.buscar_contrato(contrato_id, empresa_id)
     if not contrato:
@@ -82,13 +127,14 @@ async def upload_arquivo(
     content = await arquivo.read()
     
     try:
-        response = db.storage.from_("contratos").upload(
+        response = await run_sync(
+            db.storage.from_("contratos").upload,
             file_name,
             content,
             {"content-type": arquivo.content_type}
         )
         
-        public_url = db.storage.from_("contratos").get_public_url(file_name)
+        public_url = await run_sync(db.storage.from_("contratos").get_public_url, file_name)
         
         await contrato_service.atualizar_contrato(contrato_id, {"arquivo_url": public_url}, empresa_id)
         
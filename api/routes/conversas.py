@@ -0,0 +1,43 @@
+from fastapi import APIRouter, HTTPException, status, Query
+from typing import Optional
+
+from api.services import conversas as conversa_service
+
+router = APIRouter()
+
+
+@router.get("/")
+async def listar_conversas(
+    empresa_id: int = Query(1, description="ID da empresa"),
+    agente: Optional[str] = Query(None, description="Filtrar por agente"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200)
+):
+    return await conversa_service.listar_conversas(empresa_id, agente, skip, limit)
+
+
+@router.get("/{conversa_id}")
+async def buscar_conversa(conversa_id: int, empresa_id: int = Query(1)):
+    conversa = await conversa_service.buscar_conversa(conversa_id, empresa_id)
+    if not conversa:
+        raise HTTPException(status_code=404, detail="Conversa não encontrada")
+    return conversa
+
+
+@router.get("/{conversa_id}/mensagens")
+async def listar_mensagens(
+    conversa_id: int,
+    empresa_id: int = Query(1),
+    antes_de: Optional[int] = Query(None, description="Mensagens com id menor que este (página anterior)"),
+    limit: int = Query(50, ge=1, le=200)
+):
+    if not await conversa_service.buscar_conversa(conversa_id, empresa_id):
+        raise HTTPException(status_code=404, detail="Conversa não encontrada")
+    return await conversa_service.listar_mensagens(conversa_id, antes_de, limit)
+
+
+@router.delete("/{conversa_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def deletar_conversa(conversa_id: int, empresa_id: int = Query(1)):
+    sucesso = await conversa_service.deletar_conversa(conversa_id, empresa_id)
+    if not sucesso:
+        raise HTTPException(status_code=404, detail="Conversa não encontrada")
@@ -12,12 +12,12 @@ async def listar_grupos(
     empresa_id: int = Query(1, description="ID da empresa"),
     ativo: Optional[bool] = Query(None, description="Filtrar por status ativo")
 ):
-    return GrupoService.list(empresa_id=empresa_id, ativo=ativo)
+    return await GrupoService.list(empresa_id=empresa_id, ativo=ativo)
 
 
 @router.get("/{grupo_id}", response_model=GrupoResponse)
 async def buscar_grupo(grupo_id: int):
-    grupo = GrupoService.get_by_id(grupo_id)
+    grupo = await GrupoService.get_by_id(grupo_id)
     if not grupo:
         raise HTTPException(status_code=404, detail="Grupo não encontrado")
     return grupo
@@ -25,12 +25,12 @@ async def buscar_grupo(grupo_id: int):
 
 @router.post("/", response_model=GrupoResponse, status_code=status.HTTP_201_CREATED)
 async def criar_grupo(grupo: GrupoCreate):
-    return GrupoService.create(grupo.model_dump())
+    return await GrupoService.create(grupo.model_dump())
 
 
 @router.patch("/{grupo_id}", response_model=GrupoResponse)
 async def atualizar_grupo(grupo_id: int, grupo: GrupoUpdate):
-    grupo_atualizado = GrupoService.update(grupo_id, grupo.model_dump(exclude_unset=True))
+    grupo_atualizado = await GrupoService.update(grupo_id, grupo.model_dump(exclude_unset=True))
     if not grupo_atualizado:
         raise HTTPException(status_code=404, detail="Grupo não encontrado")
     return grupo_atualizado
@@ -38,6 +38,6 @@ async def atualizar_grupo(grupo_id: int, grupo: GrupoUpdate):
 
 @router.delete("/{grupo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def deletar_grupo(grupo_id: int):
-    sucesso = GrupoService.delete(grupo_id)
+    sucesso = await GrupoService.delete(grupo_id)
     if not sucesso:
         raise HTTPException(status_code=404, detail="Grupo não encontrado")
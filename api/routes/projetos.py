@@ -1,25 +1,36 @@
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, HTTPException, status, Query, Response
 from typing import List, Optional
 
 from api.schemas.projeto import ProjetoCreate, ProjetoUpdate, ProjetoResponse
 from api.services import projetos as projeto_service
+from api.services import paginacao
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[ProjetoResponse])
 async def listar_projetos(
+    response: Response,
     empresa_id: int = Query(1, description="ID da empresa"),
     status: Optional[str] = Query(None, description="Filtrar por status"),
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=500)
+    skip: int = Query(0, ge=0, description="Compatibilidade; prefira cursor"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor)")
 ):
-    return await projeto_service.listar_projetos(
-        empresa_id=empresa_id,
-        status=status,
-        skip=skip,
-        limit=limit
-    )
+    try:
+        rows = await projeto_service.listar_projetos(
+            empresa_id=empresa_id,
+            status=status,
+            skip=skip,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cursor_proximo = paginacao.proximo_cursor(rows, projeto_service.ORDEM, limit)
+    if cursor_proximo:
+        response.headers[paginacao.HEADER_CURSOR] = cursor_proximo
+    return rows
 
 
 @router.get("/{projeto_id}", response_model=ProjetoResponse)
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional, Dict, Any
 
 from api.services import search as search_service
+from api.services import embeddings as embeddings_service
 
 router = APIRouter()
 
@@ -11,9 +12,12 @@ async def buscar_similar(
     query: str,
     tipo: str = "all",
     limite: int = 10,
-    threshold: float = 0.7,
+    threshold: Optional[float] = None,
     projeto: Optional[str] = None,
-    coluna: Optional[str] = None
+    coluna: Optional[str] = None,
+    empresa_id: int = Query(1),
+    modo: str = Query("hibrido", pattern="^(texto|vetorial|hibrido)$"),
+    orcamento_ms: Optional[float] = Query(None, gt=0)
 ) -> Dict[str, Any]:
     return await search_service.buscar(
         query=query,
@@ -21,7 +25,10 @@ async def buscar_similar(
         limite=limite,
         threshold=threshold,
         projeto=projeto,
-        coluna=coluna
+        coluna=coluna,
+        empresa_id=empresa_id,
+        modo=modo,
+        orcamento_ms=orcamento_ms
     )
 
 
@@ -29,16 +36,20 @@ async def buscar_similar(
 async def buscar_tarefas_similares(
     query: str,
     limite: int = 10,
-    threshold: float = 0.7,
+    threshold: Optional[float] = None,
     projeto: Optional[str] = None,
-    coluna: Optional[str] = None
-) -> Dict[str, Any]:
+    coluna: Optional[str] = None,
+    empresa_id: int = Query(1),
+    modo: str = Query("hibrido", pattern="^(texto|vetorial|hibrido)$")
+) -> List[Dict[str, Any]]:
     return await search_service.buscar_tarefas(
         query=query,
         limite=limite,
         threshold=threshold,
         projeto=projeto,
-        coluna=coluna
+        coluna=coluna,
+        empresa_id=empresa_id,
+        modo=modo
     )
 
 
@@ -46,10 +57,36 @@ async def buscar_tarefas_similares(
 async def buscar_contratos_similares(
     query: str,
     limite: int = 10,
-    threshold: float = 0.7
-) -> Dict[str, Any]:
+    threshold: Optional[float] = None,
+    empresa_id: int = Query(1),
+    modo: str = Query("hibrido", pattern="^(texto|vetorial|hibrido)$")
+) -> List[Dict[str, Any]]:
     return await search_service.buscar_contratos(
         query=query,
         limite=limite,
-        threshold=threshold
+        threshold=threshold,
+        empresa_id=empresa_id,
+        modo=modo
     )
+
+
+@router.post("/embeddings/reindexar")
+async def reindexar_embeddings(
+    tipo: str = "all",
+    empresa_id: int = Query(1)
+) -> Dict[str, Any]:
+    if not embeddings_service.disponivel():
+        raise HTTPException(status_code=503, detail="Nenhum provedor de embeddings configurado")
+    tipos = list(embeddings_service.ENTIDADES) if tipo == "all" else [tipo]
+    if any(t not in embeddings_service.ENTIDADES for t in tipos):
+        raise HTTPException(status_code=400, detail="Tipo inválido")
+
+    agendados = {}
+    for t in tipos:
+        agendados[t] = await embeddings_service.reindexar_pendentes(t, empresa_id)
+    return {"agendados": agendados}
+
+
+@router.get("/embeddings/status")
+async def status_embeddings() -> Dict[str, Any]:
+    return embeddings_service.status()
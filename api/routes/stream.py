@@ -0,0 +1,54 @@
+from fastapi import APIRouter, HTTPException, Query, Request, Header
+from fastapi.responses import StreamingResponse
+from typing import Optional
+
+from api.services import stream
+
+router = APIRouter()
+
+
+@router.get("/status")
+async def status_stream():
+    return stream.hub.status()
+
+
+@router.get("")
+async def stream_eventos(
+    request: Request,
+    empresa_id: int = Query(1, description="ID da empresa"),
+    entidades: str = Query("tarefas,sprints", description="Entidades separadas por vírgula"),
+    sprint_id: Optional[int] = Query(None, description="Filtrar por sprint (ID)"),
+    projeto_id: Optional[int] = Query(None, description="Filtrar por projeto (ID)"),
+    grupo_id: Optional[int] = Query(None, description="Filtrar por grupo (ID)"),
+    responsavel: Optional[int] = Query(None, description="Filtrar por responsável (ID)"),
+    last_event_id: Optional[int] = Query(None, description="Retomar após este evento (alternativa ao header)"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Server-Sent Events com as mudanças de tarefas e sprints da empresa. O
+    navegador reenvia Last-Event-ID ao reconectar e recebe os eventos
+    perdidos; um evento "reset" pede para recarregar o quadro.
+    """
+    selecionadas = [e.strip() for e in entidades.split(",") if e.strip()]
+    invalidas = [e for e in selecionadas if e not in stream.ENTIDADES]
+    if invalidas or not selecionadas:
+        raise HTTPException(status_code=400, detail=f"Entidades inválidas: {', '.join(invalidas) or entidades}")
+
+    ultimo_id = last_event_id
+    if last_event_id_header:
+        try:
+            ultimo_id = int(last_event_id_header)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Last-Event-ID inválido")
+
+    filtros = {
+        "sprint_id": sprint_id,
+        "projeto_id": projeto_id,
+        "grupo_id": grupo_id,
+        "responsavel": responsavel,
+    }
+    return StreamingResponse(
+        stream.eventos(empresa_id, selecionadas, filtros, ultimo_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
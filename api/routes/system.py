@@ -2,6 +2,9 @@ from fastapi import APIRouter
 import psutil
 import os
 
+from api import database
+from api.services import cache, llm, respostas, roteador, admissao, panoramas
+
 router = APIRouter()
 
 
@@ -70,3 +73,24 @@ async def check_system_health():
             "status": "error",
             "error": str(e)
         }
+
+
+@router.get("/system/db-pool")
+async def get_db_pool_stats():
+    return database.pool_stats()
+
+
+@router.get("/system/cache")
+async def get_cache_stats():
+    return cache.status()
+
+
+@router.get("/system/llm")
+async def get_llm_stats():
+    return {
+        **llm.status(),
+        "admissao": admissao.status(),
+        "panoramas": panoramas.status(),
+        "roteamento": roteador.get_router().status(),
+        "cache_respostas": respostas.status(),
+    }
@@ -1,14 +1,21 @@
-from fastapi import APIRouter, HTTPException, status, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Dict, Any
 
-from api.schemas.tarefa import TarefaCreate, TarefaUpdate, TarefaResponse
+from api.schemas.tarefa import TarefaCreate, TarefaUpdate, TarefaResponse, TarefaParcial, TarefaBulkMover
 from api.services import tarefas as tarefa_service
+from api.services import paginacao
+from api.services import export as export_service
+from api.services.bulk import LoteRejeitado
+from api.middleware import condicional
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[TarefaResponse])
+@router.get("/", response_model=List[TarefaParcial], response_model_exclude_unset=True)
 async def listar_tarefas(
+    request: Request,
+    response: Response,
     empresa_id: int = Query(1, description="ID da empresa"),
     coluna: Optional[str] = Query(None, description="Filtrar por coluna"),
     prioridade: Optional[str] = Query(None, description="Filtrar por prioridade"),
@@ -17,26 +24,133 @@ async def listar_tarefas(
     sprint_id: Optional[int] = Query(None, description="Filtrar por sprint (ID)"),
     grupo_id: Optional[int] = Query(None, description="Filtrar por grupo (ID)"),
     status: Optional[str] = Query(None, description="Filtrar por status (ativa, pausada, abandonada, suspensa)"),
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=500)
+    skip: int = Query(0, ge=0, description="Compatibilidade; prefira cursor"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor)"),
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula, um preset ou *")
 ):
-    return await tarefa_service.listar_tarefas(
+    resposta = await condicional.nao_modificado(request, response, "tarefas", empresa_id)
+    if resposta:
+        return resposta
+    try:
+        rows = await tarefa_service.listar_tarefas(
+            empresa_id=empresa_id,
+            coluna=coluna,
+            prioridade=prioridade,
+            responsavel=responsavel,
+            projeto_id=projeto_id,
+            sprint_id=sprint_id,
+            grupo_id=grupo_id,
+            status=status,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            fields=fields
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cursor_proximo = paginacao.proximo_cursor(rows, tarefa_service.ORDEM, limit)
+    if cursor_proximo:
+        response.headers[paginacao.HEADER_CURSOR] = cursor_proximo
+    return rows
+
+
+@router.get("/board")
+async def board_tarefas(
+    request: Request,
+    response: Response,
+    empresa_id: int = Query(1, description="ID da empresa"),
+    sprint_id: Optional[int] = Query(None, description="Filtrar por sprint (ID)"),
+    grupo_id: Optional[int] = Query(None, description="Filtrar por grupo (ID)"),
+    projeto_id: Optional[int] = Query(None, description="Filtrar por projeto (ID)"),
+    responsavel: Optional[int] = Query(None, description="Filtrar por responsável (ID)"),
+    prioridade: Optional[str] = Query(None, description="Filtrar por prioridade"),
+    status: Optional[str] = Query(None, description="Filtrar por status (ativa, pausada, abandonada, suspensa)"),
+    limite_coluna: int = Query(50, ge=1, le=500, description="Máximo de tarefas por coluna"),
+    fields: Optional[str] = Query("card", description="Campos separados por vírgula, um preset ou *")
+):
+    resposta = await condicional.nao_modificado(request, response, "tarefas", empresa_id)
+    if resposta:
+        return resposta
+    try:
+        return await tarefa_service.board_tarefas(
+            empresa_id=empresa_id,
+            sprint_id=sprint_id,
+            grupo_id=grupo_id,
+            projeto_id=projeto_id,
+            responsavel=responsavel,
+            prioridade=prioridade,
+            status=status,
+            limite_coluna=limite_coluna,
+            fields=fields
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/export")
+async def exportar_tarefas(
+    formato: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    gzip: bool = Query(False, description="Comprimir a saída (.gz)"),
+    empresa_id: int = Query(1, description="ID da empresa"),
+    coluna: Optional[str] = Query(None, description="Filtrar por coluna"),
+    prioridade: Optional[str] = Query(None, description="Filtrar por prioridade"),
+    projeto_id: Optional[int] = Query(None, description="Filtrar por projeto (ID)"),
+    sprint_id: Optional[int] = Query(None, description="Filtrar por sprint (ID)"),
+    grupo_id: Optional[int] = Query(None, description="Filtrar por grupo (ID)"),
+    status: Optional[str] = Query(None, description="Filtrar por status")
+):
+    corpo = tarefa_service.exportar_tarefas(
+        formato, gzip,
         empresa_id=empresa_id,
         coluna=coluna,
         prioridade=prioridade,
-        responsavel=responsavel,
         projeto_id=projeto_id,
         sprint_id=sprint_id,
         grupo_id=grupo_id,
-        status=status,
-        skip=skip,
-        limit=limit
+        status=status
     )
-
-
-@router.get("/{tarefa_id}", response_model=TarefaResponse)
-async def buscar_tarefa(tarefa_id: int, empresa_id: int = Query(1)):
-    tarefa = await tarefa_service.buscar_tarefa(tarefa_id, empresa_id)
+    media_type, headers = export_service.cabecalhos("tarefas", formato, gzip)
+    return StreamingResponse(corpo, media_type=media_type, headers=headers)
+
+
+@router.post("/bulk")
+async def criar_tarefas_em_lote(itens: List[Dict[str, Any]], atomico: bool = False):
+    try:
+        return await tarefa_service.criar_tarefas_em_lote(itens, atomico)
+    except LoteRejeitado as e:
+        raise HTTPException(status_code=422, detail={"mensagem": str(e), "erros": e.erros})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.patch("/bulk")
+async def atualizar_tarefas_em_lote(itens: List[Dict[str, Any]], empresa_id: int = Query(1), atomico: bool = False):
+    try:
+        return await tarefa_service.atualizar_tarefas_em_lote(itens, empresa_id, atomico)
+    except LoteRejeitado as e:
+        raise HTTPException(status_code=422, detail={"mensagem": str(e), "erros": e.erros})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/bulk/mover")
+async def mover_tarefas_em_lote(lote: TarefaBulkMover, empresa_id: int = Query(1)):
+    try:
+        return await tarefa_service.mover_tarefas_em_lote(lote.ids, lote.coluna.value, empresa_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{tarefa_id}", response_model=TarefaParcial, response_model_exclude_unset=True)
+async def buscar_tarefa(request: Request, response: Response, tarefa_id: int, empresa_id: int = Query(1), fields: Optional[str] = None):
+    resposta = await condicional.nao_modificado(request, response, "tarefas", empresa_id)
+    if resposta:
+        return resposta
+    try:
+        tarefa = await tarefa_service.buscar_tarefa(tarefa_id, empresa_id, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not tarefa:
         raise HTTPException(status_code=404, detail="Tarefa não encontrada")
     return tarefa
@@ -75,7 +189,7 @@ async def iniciar_tarefa(tarefa_id: int, empresa_id: int = Query(1)):
     from datetime import datetime
     tarefa = await tarefa_service.atualizar_tarefa(
         tarefa_id,
-        {"status": "ativa", "data_inicio": datetime.now().isoformat()},
+        TarefaUpdate(status="ativa", data_inicio=datetime.now()),
         empresa_id
     )
     if not tarefa:
@@ -88,7 +202,7 @@ async def pausar_tarefa(tarefa_id: int, motivo: str = "", empresa_id: int = Quer
     from datetime import datetime
     tarefa = await tarefa_service.atualizar_tarefa(
         tarefa_id,
-        {"status": "pausada", "motivo_pausa": motivo, "data_pausa": datetime.now().isoformat()},
+        TarefaUpdate(status="pausada", motivo_pausa=motivo, data_pausa=datetime.now()),
         empresa_id
     )
     if not tarefa:
@@ -101,7 +215,7 @@ async def abandonar_tarefa(tarefa_id: int, motivo: str = "", empresa_id: int = Q
     from datetime import datetime
     tarefa = await tarefa_service.atualizar_tarefa(
         tarefa_id,
-        {"status": "abandonada", "motivo_abandono": motivo, "data_abandono": datetime.now().isoformat()},
+        TarefaUpdate(status="abandonada", motivo_abandono=motivo, data_abandono=datetime.now()),
         empresa_id
     )
     if not tarefa:
@@ -114,7 +228,7 @@ async def suspender_tarefa(tarefa_id: int, motivo: str = "", empresa_id: int = Q
     from datetime import datetime
     tarefa = await tarefa_service.atualizar_tarefa(
         tarefa_id,
-        {"status": "suspensa", "motivo_suspensao": motivo, "data_suspensao": datetime.now().isoformat()},
+        TarefaUpdate(status="suspensa", motivo_suspensao=motivo, data_suspensao=datetime.now()),
         empresa_id
     )
     if not tarefa:
@@ -127,7 +241,7 @@ async def finalizar_tarefa(tarefa_id: int, empresa_id: int = Query(1)):
     from datetime import datetime
     tarefa = await tarefa_service.atualizar_tarefa(
         tarefa_id,
-        {"status": "concluida", "coluna": "done", "data_conclusao": datetime.now().isoformat()},
+        TarefaUpdate(status="concluida", coluna="done", data_conclusao=datetime.now()),
         empresa_id
     )
     if not tarefa:
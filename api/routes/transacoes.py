@@ -1,36 +1,118 @@
-from fastapi import APIRouter, HTTPException, status, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Dict, Any
+from datetime import date
 
-from api.schemas.transacao import TransacaoCreate, TransacaoUpdate, TransacaoResponse
+from api.schemas.transacao import TransacaoCreate, TransacaoUpdate, TransacaoResponse, TransacaoParcial, TransacaoBulkStatus
 from api.services import transacoes as transacao_service
+from api.services import paginacao
+from api.services import export as export_service
+from api.services.bulk import LoteRejeitado
+from api.middleware import condicional
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[TransacaoResponse])
+@router.get("/", response_model=List[TransacaoParcial], response_model_exclude_unset=True)
 async def listar_transacoes(
+    request: Request,
+    response: Response,
     empresa_id: int = Query(1, description="ID da empresa"),
     tipo: Optional[str] = Query(None, description="Filtrar por tipo"),
     categoria_id: Optional[int] = Query(None, description="Filtrar por categoria (ID)"),
     status: Optional[str] = Query(None, description="Filtrar por status"),
     projeto_id: Optional[int] = Query(None, description="Filtrar por projeto (ID)"),
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=500)
+    skip: int = Query(0, ge=0, description="Compatibilidade; prefira cursor"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor)"),
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula, um preset ou *")
 ):
-    return await transacao_service.listar_transacoes(
+    resposta = await condicional.nao_modificado(request, response, "transacoes", empresa_id)
+    if resposta:
+        return resposta
+    try:
+        rows = await transacao_service.listar_transacoes(
+            empresa_id=empresa_id,
+            tipo=tipo,
+            categoria_id=categoria_id,
+            status=status,
+            projeto_id=projeto_id,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            fields=fields
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cursor_proximo = paginacao.proximo_cursor(rows, transacao_service.ORDEM, limit)
+    if cursor_proximo:
+        response.headers[paginacao.HEADER_CURSOR] = cursor_proximo
+    return rows
+
+
+@router.get("/export")
+async def exportar_transacoes(
+    formato: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    gzip: bool = Query(False, description="Comprimir a saída (.gz)"),
+    empresa_id: int = Query(1, description="ID da empresa"),
+    tipo: Optional[str] = Query(None, description="Filtrar por tipo"),
+    categoria_id: Optional[int] = Query(None, description="Filtrar por categoria (ID)"),
+    status: Optional[str] = Query(None, description="Filtrar por status"),
+    projeto_id: Optional[int] = Query(None, description="Filtrar por projeto (ID)"),
+    data_inicio: Optional[date] = Query(None, description="Data da transação a partir de (inclusive)"),
+    data_fim: Optional[date] = Query(None, description="Data da transação até (exclusive)")
+):
+    corpo = transacao_service.exportar_transacoes(
+        formato, gzip,
         empresa_id=empresa_id,
         tipo=tipo,
         categoria_id=categoria_id,
         status=status,
         projeto_id=projeto_id,
-        skip=skip,
-        limit=limit
+        data_inicio=data_inicio,
+        data_fim=data_fim
     )
-
-
-@router.get("/{transacao_id}", response_model=TransacaoResponse)
-async def buscar_transacao(transacao_id: int, empresa_id: int = Query(1)):
-    transacao = await transacao_service.buscar_transacao(transacao_id, empresa_id)
+    media_type, headers = export_service.cabecalhos("transacoes", formato, gzip)
+    return StreamingResponse(corpo, media_type=media_type, headers=headers)
+
+
+@router.post("/bulk")
+async def criar_transacoes_em_lote(itens: List[Dict[str, Any]], atomico: bool = False):
+    try:
+        return await transacao_service.criar_transacoes_em_lote(itens, atomico)
+    except LoteRejeitado as e:
+        raise HTTPException(status_code=422, detail={"mensagem": str(e), "erros": e.erros})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.patch("/bulk")
+async def atualizar_transacoes_em_lote(itens: List[Dict[str, Any]], empresa_id: int = Query(1), atomico: bool = False):
+    try:
+        return await transacao_service.atualizar_transacoes_em_lote(itens, empresa_id, atomico)
+    except LoteRejeitado as e:
+        raise HTTPException(status_code=422, detail={"mensagem": str(e), "erros": e.erros})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/bulk/status")
+async def alterar_status_transacoes_em_lote(lote: TransacaoBulkStatus, empresa_id: int = Query(1)):
+    try:
+        return await transacao_service.alterar_status_transacoes_em_lote(lote.ids, lote.status.value, empresa_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{transacao_id}", response_model=TransacaoParcial, response_model_exclude_unset=True)
+async def buscar_transacao(request: Request, response: Response, transacao_id: int, empresa_id: int = Query(1), fields: Optional[str] = None):
+    resposta = await condicional.nao_modificado(request, response, "transacoes", empresa_id)
+    if resposta:
+        return resposta
+    try:
+        transacao = await transacao_service.buscar_transacao(transacao_id, empresa_id, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not transacao:
         raise HTTPException(status_code=404, detail="Transação não encontrada")
     return transacao
@@ -57,15 +139,24 @@ async def deletar_transacao(transacao_id: int, empresa_id: int = Query(1)):
 
 
 @router.get("/resumo/mensal")
-async def resumo_mensal(ano: int, mes: int, empresa_id: int = Query(1)):
-    return await transacao_service.resumo_mensal(ano, mes, empresa_id)
+async def resumo_mensal(request: Request, response: Response, ano: int, mes: int, empresa_id: int = Query(1)):
+    resposta = await condicional.nao_modificado(request, response, "transacoes", empresa_id)
+    if resposta:
+        return resposta
+    return await transacao_service.resumo_mensal(ano, mes, empresa_id, condicional.versao(request))
 
 
 @router.get("/resumo/projetos")
-async def resumo_projetos(empresa_id: int = Query(1)):
-    return await transacao_service.resumo_por_projeto(empresa_id)
+async def resumo_projetos(request: Request, response: Response, empresa_id: int = Query(1)):
+    resposta = await condicional.nao_modificado(request, response, "transacoes", empresa_id)
+    if resposta:
+        return resposta
+    return await transacao_service.resumo_por_projeto(empresa_id, condicional.versao(request))
 
 
 @router.get("/resumo/categorias")
-async def resumo_categorias(ano: int, mes: int, empresa_id: int = Query(1)):
-    return await transacao_service.resumo_por_categoria(ano, mes, empresa_id)
+async def resumo_categorias(request: Request, response: Response, ano: int, mes: int, empresa_id: int = Query(1)):
+    resposta = await condicional.nao_modificado(request, response, "transacoes", empresa_id)
+    if resposta:
+        return resposta
+    return await transacao_service.resumo_por_categoria(ano, mes, empresa_id, condicional.versao(request))
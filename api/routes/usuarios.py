@@ -1,27 +1,38 @@
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, HTTPException, status, Query, Response
 from typing import List, Optional
 
 from api.schemas.usuario import UsuarioCreate, UsuarioUpdate, UsuarioResponse
 from api.services import usuarios as usuario_service
+from api.services import paginacao
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[UsuarioResponse])
 async def listar_usuarios(
+    response: Response,
     empresa_id: int = Query(1, description="ID da empresa"),
     ativo: Optional[bool] = Query(None, description="Filtrar por status ativo"),
     role: Optional[str] = Query(None, description="Filtrar por role"),
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=500)
+    skip: int = Query(0, ge=0, description="Compatibilidade; prefira cursor"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor)")
 ):
-    return await usuario_service.listar_usuarios(
-        empresa_id=empresa_id,
-        ativo=ativo,
-        role=role,
-        skip=skip,
-        limit=limit
-    )
+    try:
+        rows = await usuario_service.listar_usuarios(
+            empresa_id=empresa_id,
+            ativo=ativo,
+            role=role,
+            skip=skip,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cursor_proximo = paginacao.proximo_cursor(rows, usuario_service.ORDEM, limit)
+    if cursor_proximo:
+        response.headers[paginacao.HEADER_CURSOR] = cursor_proximo
+    return rows
 
 
 @router.get("/{usuario_id}", response_model=UsuarioResponse)
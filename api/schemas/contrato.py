@@ -3,6 +3,8 @@ from typing import Optional, List, Any
 from datetime import datetime, date
 from enum import Enum
 
+from api.schemas.parcial import parcial
+
 
 class TipoContrato(str, Enum):
     nda = "nda"
@@ -92,6 +94,11 @@ class ContratoUpdate(BaseModel):
     arquivo_url: Optional[str] = None
 
 
+class ContratoBulkStatus(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+    status: StatusContrato
+
+
 class ContratoResponse(BaseModel):
     id: int
     empresa_id: int
@@ -131,3 +138,6 @@ class ContratoResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+ContratoParcial = parcial(ContratoResponse)
@@ -0,0 +1,16 @@
+from typing import Optional, Type
+
+from pydantic import BaseModel, create_model
+
+
+def parcial(modelo: Type[BaseModel]) -> Type[BaseModel]:
+    """
+    Versão do schema com todos os campos opcionais, para respostas com
+    projeção (?fields=). Usar com response_model_exclude_unset=True para
+    que os campos não selecionados fiquem fora do JSON.
+    """
+    campos = {
+        nome: (Optional[info.annotation], None)
+        for nome, info in modelo.model_fields.items()
+    }
+    return create_model(f"{modelo.__name__}Parcial", __base__=None, **campos)
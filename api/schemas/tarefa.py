@@ -3,6 +3,8 @@ from typing import Optional, List, Any
 from datetime import datetime, date
 from enum import Enum
 
+from api.schemas.parcial import parcial
+
 
 class Prioridade(str, Enum):
     urgente = "urgente"
@@ -105,6 +107,11 @@ class TarefaUpdate(BaseModel):
     data_abandono: Optional[datetime] = None
 
 
+class TarefaBulkMover(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+    coluna: Coluna
+
+
 class TarefaResponse(BaseModel):
     id: int
     empresa_id: int
@@ -154,3 +161,6 @@ class TarefaResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+TarefaParcial = parcial(TarefaResponse)
@@ -3,6 +3,8 @@ from typing import Optional, List, Any
 from datetime import datetime, date
 from enum import Enum
 
+from api.schemas.parcial import parcial
+
 
 class TipoTransacao(str, Enum):
     receita = "receita"
@@ -105,6 +107,11 @@ class TransacaoUpdate(BaseModel):
     tags: Optional[List[str]] = None
 
 
+class TransacaoBulkStatus(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+    status: StatusTransacao
+
+
 class TransacaoResponse(BaseModel):
     id: int
     empresa_id: int
@@ -159,3 +166,6 @@ class TransacaoResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+TransacaoParcial = parcial(TransacaoResponse)
@@ -0,0 +1,267 @@
+from typing import List, Optional, Dict, Any, AsyncIterator
+from collections import deque
+from contextlib import asynccontextmanager
+import asyncio
+import itertools
+import os
+import time
+
+from api.services import llm, metricas
+
+
+# Chamadas ao LLM em andamento ao mesmo tempo: no total e por agente
+# (LLM_CONCORRENCIA_AGENTES sobrescreve por agente, ex.: "chief:6,ops:2")
+LLM_CONCORRENCIA_MAX = int(os.getenv("LLM_CONCORRENCIA_MAX", "8"))
+LLM_CONCORRENCIA_AGENTE = int(os.getenv("LLM_CONCORRENCIA_AGENTE", "4"))
+LLM_CONCORRENCIA_AGENTES = {
+    agente.strip(): int(limite)
+    for agente, _, limite in (item.partition(":") for item in os.getenv("LLM_CONCORRENCIA_AGENTES", "").split(","))
+    if agente.strip() and limite.strip()
+}
+# Pedidos esperando vaga e quanto tempo cada um pode esperar
+LLM_FILA_MAX = int(os.getenv("LLM_FILA_MAX", "100"))
+LLM_FILA_TIMEOUT_S = float(os.getenv("LLM_FILA_TIMEOUT_S", "15"))
+# Cota do provedor em requisições por minuto (0 desliga) e rajada permitida
+LLM_RPM = float(os.getenv("LLM_RPM", "0"))
+LLM_RAJADA = int(os.getenv("LLM_RAJADA", "10"))
+
+PRIORIDADE_PADRAO = 5
+# Chamadas em segundo plano (resumos): passam depois de todos os agentes
+PRIORIDADE_SEGUNDO_PLANO = 9
+
+espera_fila = metricas.Histograma(
+    "llm_admission_wait_seconds", "Espera por vaga para chamar o LLM por agente", ("agente",)
+)
+
+
+class AdmissaoRecusada(llm.LLMError):
+    """Sem vaga a tempo (fila cheia, prazo na fila) ou sem cota do provedor."""
+
+    def __init__(self, mensagem: str, status_code: int = 503):
+        super().__init__(mensagem, status_code, retentavel=False)
+
+
+class Pedido:
+    """Um pedido de vaga; menor prioridade passa na frente e, empatado, o mais antigo."""
+
+    _seq = itertools.count()
+
+    def __init__(self, agente: str, prioridade: int):
+        self.agente = agente
+        self.prioridade = prioridade
+        self.ordem = (prioridade, next(self._seq))
+        self.chegada = time.perf_counter()
+        self.espera: Optional[float] = None
+        self.futuro: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+
+    def __lt__(self, outro: "Pedido") -> bool:
+        return self.ordem < outro.ordem
+
+
+class Admissao:
+    """
+    Vagas para chamadas ao LLM. Sem vaga, o pedido entra numa fila por
+    prioridade; ao liberar uma vaga, passa o primeiro da fila cujo agente
+    ainda esteja abaixo do próprio limite.
+    """
+
+    def __init__(
+        self,
+        maximo: int = LLM_CONCORRENCIA_MAX,
+        por_agente: int = LLM_CONCORRENCIA_AGENTE,
+        limites: Optional[Dict[str, int]] = None,
+        fila_max: int = LLM_FILA_MAX,
+        timeout: float = LLM_FILA_TIMEOUT_S
+    ):
+        self.maximo = maximo
+        self.por_agente = por_agente
+        self.limites = LLM_CONCORRENCIA_AGENTES if limites is None else limites
+        self.fila_max = fila_max
+        self.timeout = timeout
+        self.ativos = 0
+        self.ativos_agente: Dict[str, int] = {}
+        self.fila: List[Pedido] = []
+        self.esperas: "deque[float]" = deque(maxlen=500)
+        self.esperas_agente: Dict[str, "deque[float]"] = {}
+        self.contadores = {"admitidos": 0, "enfileirados": 0, "fila_cheia": 0, "expirados": 0, "cancelados": 0, "extras": 0, "extras_recusadas": 0}
+
+    def limite(self, agente: str) -> int:
+        return self.limites.get(agente, self.por_agente)
+
+    def _cabe(self, agente: str) -> bool:
+        return self.ativos < self.maximo and self.ativos_agente.get(agente, 0) < self.limite(agente)
+
+    def _despachar(self):
+        for pedido in sorted(self.fila):
+            if self.ativos >= self.maximo:
+                break
+            if not self._cabe(pedido.agente):
+                continue
+            self.fila.remove(pedido)
+            self.ativos += 1
+            self.ativos_agente[pedido.agente] = self.ativos_agente.get(pedido.agente, 0) + 1
+            pedido.espera = time.perf_counter() - pedido.chegada
+            self.esperas.append(pedido.espera)
+            self.esperas_agente.setdefault(pedido.agente, deque(maxlen=200)).append(pedido.espera)
+            espera_fila.observar(pedido.espera, pedido.agente)
+            self.contadores["admitidos"] += 1
+            pedido.futuro.set_result(None)
+
+    async def entrar(self, agente: str, prioridade: int = PRIORIDADE_PADRAO) -> Pedido:
+        pedido = Pedido(agente, prioridade)
+        self.fila.append(pedido)
+        self._despachar()
+        if pedido.futuro.done():
+            return pedido
+
+        if len(self.fila) > self.fila_max:
+            self.fila.remove(pedido)
+            self.contadores["fila_cheia"] += 1
+            raise AdmissaoRecusada("Muitas requisições ao LLM na fila, tente novamente")
+
+        self.contadores["enfileirados"] += 1
+        try:
+            await asyncio.wait({pedido.futuro}, timeout=self.timeout)
+        except BaseException:
+            # Cancelado esperando: devolve a vaga se ela chegou nesse meio tempo
+            self.contadores["cancelados"] += 1
+            self._desistir(pedido)
+            raise
+        if not pedido.futuro.done():
+            self.contadores["expirados"] += 1
+            self._desistir(pedido)
+            raise AdmissaoRecusada(f"Sem vaga para o LLM em {self.timeout:g}s, tente novamente")
+        return pedido
+
+    def tentar(self, agente: str, prioridade: int = PRIORIDADE_PADRAO) -> Optional[Pedido]:
+        """
+        Uma vaga a mais, só se couber agora e ninguém estiver na fila; None
+        senão. Para chamadas opcionais (hedge), que não devem esperar nem
+        passar na frente de quem espera. Devolver com sair().
+        """
+        if self.fila or not self._cabe(agente):
+            self.contadores["extras_recusadas"] += 1
+            return None
+        pedido = Pedido(agente, prioridade)
+        pedido.espera = 0.0
+        self.ativos += 1
+        self.ativos_agente[agente] = self.ativos_agente.get(agente, 0) + 1
+        self.contadores["extras"] += 1
+        return pedido
+
+    def _desistir(self, pedido: Pedido):
+        if pedido.futuro.done():
+            self.sair(pedido)
+        else:
+            self.fila.remove(pedido)
+            pedido.futuro.cancel()
+
+    def sair(self, pedido: Pedido):
+        self.ativos -= 1
+        self.ativos_agente[pedido.agente] -= 1
+        self._despachar()
+
+    def status(self) -> Dict[str, Any]:
+        agentes = set(self.ativos_agente) | {p.agente for p in self.fila} | set(self.limites)
+        return {
+            **self.contadores,
+            "ativos": self.ativos,
+            "maximo": self.maximo,
+            "fila": len(self.fila),
+            "fila_max": self.fila_max,
+            "timeout_s": self.timeout,
+            "espera": llm.LLMMetrics._percentis(self.esperas),
+            "agentes": {
+                agente: {
+                    "ativos": self.ativos_agente.get(agente, 0),
+                    "limite": self.limite(agente),
+                    "fila": sum(1 for p in self.fila if p.agente == agente),
+                    "espera": llm.LLMMetrics._percentis(self.esperas_agente.get(agente, ())),
+                }
+                for agente in sorted(agentes)
+            },
+        }
+
+
+class Cota:
+    """
+    Token bucket da cota do provedor: LLM_RPM requisições por minuto com
+    rajada de até LLM_RAJADA. Cada chamada ao provedor (inclusive failover
+    e hedge) retira um token; sem token a tempo, AdmissaoRecusada (429).
+    """
+
+    def __init__(self, por_minuto: float = LLM_RPM, rajada: int = LLM_RAJADA, timeout: float = LLM_FILA_TIMEOUT_S):
+        self.taxa = por_minuto / 60
+        self.capacidade = max(1, rajada)
+        self.timeout = timeout
+        self.tokens = float(self.capacidade)
+        self.atualizado = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self.contadores = {"retiradas": 0, "esperas": 0, "recusadas": 0, "espera_ms": 0.0}
+
+    async def retirar(self):
+        if self.taxa <= 0:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        inicio = time.monotonic()
+        esperou = False
+        # Um de cada vez, na ordem de chegada
+        async with self._lock:
+            while True:
+                agora = time.monotonic()
+                self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado) * self.taxa)
+                self.atualizado = agora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.contadores["retiradas"] += 1
+                    if esperou:
+                        self.contadores["esperas"] += 1
+                        self.contadores["espera_ms"] += (agora - inicio) * 1000
+                    return
+                falta = (1 - self.tokens) / self.taxa
+                if agora + falta - inicio > self.timeout:
+                    self.contadores["recusadas"] += 1
+                    raise AdmissaoRecusada("Cota de requisições ao provedor esgotada, tente novamente", 429)
+                esperou = True
+                await asyncio.sleep(falta)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            **self.contadores,
+            "espera_ms": round(self.contadores["espera_ms"], 1),
+            "rpm": round(self.taxa * 60, 2),
+            "rajada": self.capacidade,
+            "tokens": round(min(self.capacidade, self.tokens + (time.monotonic() - self.atualizado) * self.taxa), 2) if self.taxa > 0 else None,
+        }
+
+
+controle = Admissao()
+cota = Cota()
+
+metricas.Medidor(
+    "llm_admission_active", "Chamadas ao LLM em andamento por agente",
+    lambda: {(agente,): n for agente, n in controle.ativos_agente.items()}, ("agente",)
+)
+metricas.Medidor(
+    "llm_admission_queue_depth", "Pedidos esperando vaga para o LLM por agente",
+    lambda: {
+        (agente,): sum(1 for p in controle.fila if p.agente == agente)
+        for agente in set(controle.ativos_agente) | {p.agente for p in controle.fila}
+    },
+    ("agente",)
+)
+
+
+@asynccontextmanager
+async def vaga(agente: str, prioridade: int = PRIORIDADE_PADRAO) -> AsyncIterator[Pedido]:
+    """Segura uma vaga de chamada ao LLM durante o bloco (esperando na fila se preciso)."""
+    pedido = await controle.entrar(agente, prioridade)
+    try:
+        yield pedido
+    finally:
+        controle.sair(pedido)
+
+
+def status() -> Dict[str, Any]:
+    return {**controle.status(), "cota": cota.status()}
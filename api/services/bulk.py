@@ -0,0 +1,199 @@
+from typing import List, Optional, Dict, Any, Tuple, Type, Callable
+import asyncio
+import os
+
+from pydantic import BaseModel, ValidationError
+
+from api.database import get_db, execute
+
+
+BULK_MAX_ITENS = int(os.getenv("BULK_MAX_ITENS", "1000"))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+
+
+class LoteRejeitado(ValueError):
+    """Lote no modo atômico com algum erro: nada foi gravado."""
+
+    def __init__(self, erros: List[Dict[str, Any]]):
+        super().__init__("Lote rejeitado; nenhum item foi gravado")
+        self.erros = erros
+
+
+def _chunks(itens: List[Any], tamanho: int):
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
+
+
+def _mensagem(e: Exception) -> str:
+    if isinstance(e, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(p) for p in erro['loc']) or 'item'}: {erro['msg']}"
+            for erro in e.errors()
+        )
+    return getattr(e, "message", None) or str(e)
+
+
+def _select(campos: Optional[List[str]]) -> str:
+    # Como atualizar_em_lote, que devolve to_jsonb(t.*) - embedding - search_vector
+    return ",".join(campos) if campos else "*"
+
+
+def _resultado(total: int, itens: List[Dict[str, Any]], erros: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "total": total,
+        "sucesso": len(itens),
+        "falhas": len(erros),
+        "itens": itens,
+        "erros": sorted(erros, key=lambda e: e["indice"] if e["indice"] is not None else -1),
+    }
+
+
+def validar(
+    itens: List[Dict[str, Any]],
+    schema: Type[BaseModel],
+    com_id: bool = False
+) -> Tuple[List[Tuple[int, Optional[int], BaseModel]], List[Dict[str, Any]]]:
+    """Valida cada item com o schema; retorna (indice, id, modelo) dos válidos e os erros."""
+    if len(itens) > BULK_MAX_ITENS:
+        raise ValueError(f"Máximo de {BULK_MAX_ITENS} itens por lote")
+
+    validos = []
+    erros = []
+    for indice, item in enumerate(itens):
+        dados = dict(item)
+        item_id = dados.pop("id", None) if com_id else None
+        if com_id and not isinstance(item_id, int):
+            erros.append({"indice": indice, "id": item_id, "erro": "id: campo obrigatório (inteiro)"})
+            continue
+        try:
+            validos.append((indice, item_id, schema.model_validate(dados)))
+        except ValidationError as e:
+            erros.append({"indice": indice, "id": item_id, "erro": _mensagem(e)})
+    return validos, erros
+
+
+async def criar_em_lote(
+    tabela: str,
+    itens: List[Dict[str, Any]],
+    schema: Type[BaseModel],
+    preparar: Callable[[BaseModel], Dict[str, Any]],
+    atomico: bool = False,
+    campos: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Insere em INSERTs multi-linha de até BULK_CHUNK_SIZE itens. No modo atômico
+    o lote inteiro vai num único INSERT (uma transação). Fora dele, um bloco que
+    falhar é reenviado linha a linha para isolar os itens com erro. `campos`
+    limita o que volta de cada linha (sem embedding/search_vector).
+    """
+    db = get_db()
+    select = _select(campos)
+
+    validos, erros = validar(itens, schema)
+    if atomico and erros:
+        raise LoteRejeitado(erros)
+
+    linhas = [(indice, preparar(modelo)) for indice, _, modelo in validos]
+    criados: List[Dict[str, Any]] = []
+
+    if atomico:
+        if linhas:
+            try:
+                result = await execute(db.table(tabela).insert([l for _, l in linhas], default_to_null=False).select(select))
+            except Exception as e:
+                raise LoteRejeitado([{"indice": None, "id": None, "erro": _mensagem(e)}])
+            criados.extend(result.data or [])
+        return _resultado(len(itens), criados, erros)
+
+    async def inserir_um(indice: int, linha: Dict[str, Any]):
+        try:
+            result = await execute(db.table(tabela).insert(linha).select(select))
+            criados.extend(result.data or [])
+        except Exception as e:
+            erros.append({"indice": indice, "id": None, "erro": _mensagem(e)})
+
+    for bloco in _chunks(linhas, BULK_CHUNK_SIZE):
+        try:
+            result = await execute(db.table(tabela).insert([l for _, l in bloco], default_to_null=False).select(select))
+            criados.extend(result.data or [])
+        except Exception:
+            await asyncio.gather(*(inserir_um(indice, linha) for indice, linha in bloco))
+
+    return _resultado(len(itens), criados, erros)
+
+
+async def atualizar_em_lote(
+    tabela: str,
+    itens: List[Dict[str, Any]],
+    schema: Type[BaseModel],
+    preparar: Callable[[BaseModel], Dict[str, Any]],
+    empresa_id: int = 1,
+    atomico: bool = False
+) -> Dict[str, Any]:
+    """Atualiza via RPC atualizar_em_lote (api/migrations/007_bulk_operations.sql)."""
+    db = get_db()
+
+    validos, erros = validar(itens, schema, com_id=True)
+    if atomico and erros:
+        raise LoteRejeitado(erros)
+
+    payload = [
+        {"indice": indice, "id": item_id, "dados": preparar(modelo)}
+        for indice, item_id, modelo in validos
+    ]
+    ids = {p["indice"]: p["id"] for p in payload}
+    atualizados: List[Dict[str, Any]] = []
+
+    for bloco in ([payload] if atomico else _chunks(payload, BULK_CHUNK_SIZE)):
+        if not bloco:
+            continue
+        try:
+            result = await execute(db.rpc("atualizar_em_lote", {
+                "tabela": tabela,
+                "empresa_id_int": empresa_id,
+                "itens": bloco,
+                "atomico": atomico
+            }))
+        except Exception as e:
+            if atomico:
+                raise LoteRejeitado([{"indice": None, "id": None, "erro": _mensagem(e)}])
+            erros.extend({"indice": p["indice"], "id": p["id"], "erro": _mensagem(e)} for p in bloco)
+            continue
+
+        for row in result.data or []:
+            if row["erro"] is None:
+                atualizados.append(row["registro"])
+            else:
+                erros.append({"indice": row["indice"], "id": ids.get(row["indice"]), "erro": row["erro"]})
+
+    return _resultado(len(itens), atualizados, erros)
+
+
+async def mover_em_lote(
+    tabela: str,
+    ids: List[int],
+    dados: Dict[str, Any],
+    empresa_id: int = 1,
+    campos: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Aplica os mesmos campos a vários ids com um UPDATE ... WHERE id IN (...) por bloco."""
+    db = get_db()
+    select = _select(campos)
+
+    if len(ids) > BULK_MAX_ITENS:
+        raise ValueError(f"Máximo de {BULK_MAX_ITENS} itens por lote")
+
+    movidos: List[Dict[str, Any]] = []
+    for bloco in _chunks(list(dict.fromkeys(ids)), BULK_CHUNK_SIZE):
+        result = await execute(
+            db.table(tabela).update(dados).eq("empresa_id", empresa_id).in_("id", bloco).select(select)
+        )
+        movidos.extend(result.data or [])
+
+    encontrados = {row["id"] for row in movidos}
+    erros = [
+        {"indice": indice, "id": item_id, "erro": "Registro não encontrado"}
+        for indice, item_id in enumerate(ids)
+        if item_id not in encontrados
+    ]
+    return _resultado(len(ids), movidos, erros)
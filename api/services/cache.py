@@ -0,0 +1,402 @@
+from typing import Optional, Dict, Any, Callable, Awaitable, Hashable, Tuple, List
+from collections import OrderedDict
+import asyncio
+import copy
+import json
+import os
+import time
+import uuid
+
+
+CACHE_MAX_ITENS = int(os.getenv("CACHE_MAX_ITENS", "1000"))
+
+# TTL em segundos por entidade (0 desliga o cache da entidade)
+TTL = {
+    "grupos": float(os.getenv("CACHE_TTL_GRUPOS", "300")),
+    "tags": float(os.getenv("CACHE_TTL_TAGS", "300")),
+    "sprints": float(os.getenv("CACHE_TTL_SPRINTS", "60")),
+    "projetos": float(os.getenv("CACHE_TTL_PROJETOS", "120")),
+    "usuarios": float(os.getenv("CACHE_TTL_USUARIOS", "120")),
+    "resumos": float(os.getenv("CACHE_TTL_RESUMOS", "60")),
+    # Só os resumos de tarefas e contratos do chat (api/services/panoramas.py)
+    "tarefas": float(os.getenv("CACHE_TTL_TAREFAS", "300")),
+    "contratos": float(os.getenv("CACHE_TTL_CONTRATOS", "300")),
+}
+
+# Cache compartilhado entre workers; sem REDIS_URL usa o backend em memória
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_PREFIXO = os.getenv("CACHE_PREFIXO", "edicula")
+# Lock de single-flight entre workers e quanto os demais esperam por ele
+CACHE_LOCK_MS = int(os.getenv("CACHE_LOCK_MS", "5000"))
+CACHE_ESPERA_MS = int(os.getenv("CACHE_ESPERA_MS", "2000"))
+
+CANAL_INVALIDACAO = f"{CACHE_PREFIXO}:invalidacao"
+WORKER_ID = uuid.uuid4().hex
+
+Chave = Tuple[str, Optional[int], Hashable]
+
+
+class ReadCache:
+    """
+    LRU limitado a max_itens com expiração por entrada. As chaves são
+    (entidade, empresa_id, filtros); a invalidação remove por entidade e,
+    opcionalmente, por empresa.
+    """
+
+    def __init__(self, max_itens: int = CACHE_MAX_ITENS):
+        self.max_itens = max_itens
+        self._itens: "OrderedDict[Chave, Tuple[float, Any]]" = OrderedDict()
+        # Incrementada a cada invalidação: uma leitura iniciada antes dela
+        # não grava o resultado (possivelmente velho) no cache
+        self.geracoes: Dict[str, int] = {}
+        self.contadores = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, chave: Chave) -> Tuple[bool, Any]:
+        item = self._itens.get(chave)
+        if item is None:
+            self.contadores["misses"] += 1
+            return False, None
+        expira, valor = item
+        if expira <= time.monotonic():
+            del self._itens[chave]
+            self.contadores["expirations"] += 1
+            self.contadores["misses"] += 1
+            return False, None
+        self._itens.move_to_end(chave)
+        self.contadores["hits"] += 1
+        return True, valor
+
+    def set(self, chave: Chave, valor: Any, ttl: float):
+        self._itens[chave] = (time.monotonic() + ttl, valor)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+            self.contadores["evictions"] += 1
+
+    def invalidar(self, entidade: str, empresa_id: Optional[int] = None) -> int:
+        """Remove as entradas da entidade; com empresa_id, só as dessa empresa e as sem empresa."""
+        chaves = [
+            chave for chave in self._itens
+            if chave[0] == entidade and (empresa_id is None or chave[1] in (empresa_id, None))
+        ]
+        for chave in chaves:
+            del self._itens[chave]
+        self.geracoes[entidade] = self.geracoes.get(entidade, 0) + 1
+        self.contadores["invalidations"] += len(chaves)
+        return len(chaves)
+
+    def limpar(self):
+        self._itens.clear()
+
+    def status(self) -> Dict[str, Any]:
+        consultas = self.contadores["hits"] + self.contadores["misses"]
+        por_entidade: Dict[str, int] = {}
+        for entidade, _, _ in self._itens:
+            por_entidade[entidade] = por_entidade.get(entidade, 0) + 1
+        return {
+            **self.contadores,
+            "hit_ratio": round(self.contadores["hits"] / consultas, 4) if consultas else None,
+            "itens": len(self._itens),
+            "max_itens": self.max_itens,
+            "por_entidade": por_entidade,
+            "ttl": TTL,
+        }
+
+
+class CacheBackend:
+    """Interface do cache compartilhado (subconjunto de comandos do Redis)."""
+
+    nome = "base"
+
+    async def get(self, chave: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def set(self, chave: str, valor: str, ttl: float, nx: bool = False) -> bool:
+        raise NotImplementedError
+
+    async def delete(self, chave: str):
+        raise NotImplementedError
+
+    async def incr(self, chave: str) -> int:
+        raise NotImplementedError
+
+    async def publish(self, canal: str, mensagem: str):
+        raise NotImplementedError
+
+    async def subscribe(self, canal: str, callback: Callable[[str], Awaitable[None]]):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """Fallback sem servidor (e fake para testes): vale só para o processo atual."""
+
+    nome = "memoria"
+
+    def __init__(self):
+        self._dados: Dict[str, Tuple[Optional[float], str]] = {}
+        self._assinantes: Dict[str, List[Callable[[str], Awaitable[None]]]] = {}
+
+    def _vivo(self, chave: str) -> Optional[str]:
+        item = self._dados.get(chave)
+        if item is None:
+            return None
+        expira, valor = item
+        if expira is not None and expira <= time.monotonic():
+            del self._dados[chave]
+            return None
+        return valor
+
+    async def get(self, chave: str) -> Optional[str]:
+        return self._vivo(chave)
+
+    async def set(self, chave: str, valor: str, ttl: float, nx: bool = False) -> bool:
+        if nx and self._vivo(chave) is not None:
+            return False
+        self._dados[chave] = (time.monotonic() + ttl, valor)
+        return True
+
+    async def delete(self, chave: str):
+        self._dados.pop(chave, None)
+
+    async def incr(self, chave: str) -> int:
+        valor = int(self._vivo(chave) or 0) + 1
+        self._dados[chave] = (None, str(valor))
+        return valor
+
+    async def publish(self, canal: str, mensagem: str):
+        for callback in self._assinantes.get(canal, []):
+            await callback(mensagem)
+
+    async def subscribe(self, canal: str, callback: Callable[[str], Awaitable[None]]):
+        self._assinantes.setdefault(canal, []).append(callback)
+
+    async def close(self):
+        self._dados.clear()
+        self._assinantes.clear()
+
+
+class RedisBackend(CacheBackend):
+    nome = "redis"
+
+    def __init__(self, url: Optional[str] = None, cliente: Any = None):
+        if cliente is None:
+            import redis.asyncio as redis
+            cliente = redis.from_url(url, decode_responses=True)
+        self.cliente = cliente
+        self._tarefas: List[asyncio.Task] = []
+
+    async def get(self, chave: str) -> Optional[str]:
+        return await self.cliente.get(chave)
+
+    async def set(self, chave: str, valor: str, ttl: float, nx: bool = False) -> bool:
+        return bool(await self.cliente.set(chave, valor, px=max(1, int(ttl * 1000)), nx=nx))
+
+    async def delete(self, chave: str):
+        await self.cliente.delete(chave)
+
+    async def incr(self, chave: str) -> int:
+        return await self.cliente.incr(chave)
+
+    async def publish(self, canal: str, mensagem: str):
+        await self.cliente.publish(canal, mensagem)
+
+    async def subscribe(self, canal: str, callback: Callable[[str], Awaitable[None]]):
+        pubsub = self.cliente.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(canal)
+
+        async def ouvir():
+            while True:
+                try:
+                    mensagem = await pubsub.get_message(timeout=1.0)
+                    if mensagem:
+                        await callback(mensagem["data"])
+                except asyncio.CancelledError:
+                    await pubsub.aclose()
+                    raise
+                except Exception as e:
+                    print(f"[ERROR] Falha no pub/sub do cache: {e}")
+                    await asyncio.sleep(1)
+
+        self._tarefas.append(asyncio.create_task(ouvir()))
+
+    async def close(self):
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas.clear()
+        await self.cliente.aclose()
+
+
+cache = ReadCache()
+compartilhado: CacheBackend = MemoryBackend()
+_voos: Dict[str, "asyncio.Future[Any]"] = {}
+contadores_compartilhado = {"hits": 0, "misses": 0, "loads": 0, "coalesced": 0, "lock_waits": 0, "errors": 0}
+
+
+async def _ao_invalidar(mensagem: str):
+    dados = json.loads(mensagem)
+    if dados.get("origem") != WORKER_ID:
+        cache.invalidar(dados["entidade"], dados.get("empresa_id"))
+
+
+async def iniciar(backend: Optional[CacheBackend] = None):
+    """Escolhe o backend compartilhado e assina as invalidações (startup)."""
+    global compartilhado
+    if backend is None and REDIS_URL:
+        try:
+            backend = RedisBackend(REDIS_URL)
+            await backend.cliente.ping()
+        except Exception as e:
+            print(f"[ERROR] Redis indisponível ({e}); usando cache em memória")
+            backend = None
+    compartilhado = backend or MemoryBackend()
+    await compartilhado.subscribe(CANAL_INVALIDACAO, _ao_invalidar)
+
+
+async def encerrar():
+    global compartilhado
+    await compartilhado.close()
+    compartilhado = MemoryBackend()
+
+
+def _filtros(filtros: Dict[str, Any]) -> Hashable:
+    return tuple(sorted(filtros.items()))
+
+
+def _chave_geracao(entidade: str) -> str:
+    return f"{CACHE_PREFIXO}:gen:{entidade}"
+
+
+async def _carregar_compartilhado(entidade: str, chave: Chave, ttl: float, carregar: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Lê do cache compartilhado; num miss só um worker carrega do banco (lock
+    com SET NX) e os demais esperam o valor aparecer até CACHE_ESPERA_MS.
+    A geração da entidade faz parte da chave, então invalidar é um INCR.
+    """
+    try:
+        geracao = await compartilhado.get(_chave_geracao(entidade)) or "0"
+        chave_str = f"{CACHE_PREFIXO}:{entidade}:{geracao}:{json.dumps(chave[1:], default=str)}"
+        valor = await compartilhado.get(chave_str)
+        if valor is not None:
+            contadores_compartilhado["hits"] += 1
+            return json.loads(valor)
+        contadores_compartilhado["misses"] += 1
+
+        lock = f"{chave_str}:lock"
+        if not await compartilhado.set(lock, WORKER_ID, CACHE_LOCK_MS / 1000, nx=True):
+            contadores_compartilhado["lock_waits"] += 1
+            limite = time.monotonic() + CACHE_ESPERA_MS / 1000
+            while time.monotonic() < limite:
+                await asyncio.sleep(0.05)
+                valor = await compartilhado.get(chave_str)
+                if valor is not None:
+                    return json.loads(valor)
+            lock = None
+    except Exception as e:
+        contadores_compartilhado["errors"] += 1
+        print(f"[ERROR] Falha no cache compartilhado: {e}")
+        return await carregar()
+
+    contadores_compartilhado["loads"] += 1
+    try:
+        valor = await carregar()
+        if valor is not None:
+            try:
+                await compartilhado.set(chave_str, json.dumps(valor, default=str), ttl)
+            except Exception as e:
+                contadores_compartilhado["errors"] += 1
+                print(f"[ERROR] Falha ao gravar no cache compartilhado: {e}")
+        return valor
+    finally:
+        if lock:
+            try:
+                await compartilhado.delete(lock)
+            except Exception:
+                pass
+
+
+async def lembrar(
+    entidade: str,
+    empresa_id: Optional[int],
+    filtros: Dict[str, Any],
+    carregar: Callable[[], Awaitable[Any]],
+    versao: Optional[Hashable] = None
+) -> Any:
+    """
+    Valor para (entidade, empresa_id, filtros): cache local, depois o
+    compartilhado, depois carregar(). Leituras simultâneas da mesma chave no
+    worker esperam a mesma carga (single-flight).
+
+    `versao` é a versão dos dados que o chamador conferiu (a do ETag, ver
+    condicional.versao): faz parte da chave, então uma entrada carregada
+    antes de uma escrita nunca é servida com o ETag da versão nova.
+    """
+    ttl = TTL.get(entidade, 0)
+    if ttl <= 0:
+        return await carregar()
+
+    if versao is not None:
+        filtros = {**filtros, "_versao": versao}
+    chave = (entidade, empresa_id, _filtros(filtros))
+    encontrado, valor = cache.get(chave)
+    if encontrado:
+        return copy.deepcopy(valor)
+
+    voo_id = repr(chave)
+    voo = _voos.get(voo_id)
+    if voo is not None:
+        contadores_compartilhado["coalesced"] += 1
+        return copy.deepcopy(await asyncio.shield(voo))
+
+    voo = asyncio.get_running_loop().create_future()
+    _voos[voo_id] = voo
+    try:
+        geracao = cache.geracoes.get(entidade, 0)
+        valor = await _carregar_compartilhado(entidade, chave, ttl, carregar)
+        # Ausências (None) não são guardadas: um registro recém-criado
+        # precisa aparecer sem esperar o TTL
+        if valor is not None and cache.geracoes.get(entidade, 0) == geracao:
+            cache.set(chave, valor, ttl)
+        voo.set_result(valor)
+    except asyncio.CancelledError:
+        voo.cancel()
+        raise
+    except Exception as e:
+        voo.set_exception(e)
+        # Marca a exceção como lida quando ninguém mais estiver esperando
+        voo.exception()
+        raise
+    finally:
+        _voos.pop(voo_id, None)
+
+    # Cópia para o chamador não alterar a entrada compartilhada
+    return copy.deepcopy(valor)
+
+
+async def invalidar(entidade: str, empresa_id: Optional[int] = None) -> int:
+    """Invalida no worker, no cache compartilhado (nova geração) e avisa os demais workers."""
+    removidos = cache.invalidar(entidade, empresa_id)
+    try:
+        await compartilhado.incr(_chave_geracao(entidade))
+        await compartilhado.publish(CANAL_INVALIDACAO, json.dumps({
+            "entidade": entidade,
+            "empresa_id": empresa_id,
+            "origem": WORKER_ID
+        }))
+    except Exception as e:
+        contadores_compartilhado["errors"] += 1
+        print(f"[ERROR] Falha ao invalidar cache compartilhado: {e}")
+    return removidos
+
+
+def status() -> Dict[str, Any]:
+    return {
+        **cache.status(),
+        "compartilhado": {
+            "backend": compartilhado.nome,
+            **contadores_compartilhado,
+        },
+    }
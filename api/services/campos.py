@@ -0,0 +1,35 @@
+from typing import List, Optional, Dict, Iterable
+
+
+# Colunas grandes que só são lidas quando pedidas explicitamente em ?fields=
+PESADOS = {"embedding"}
+
+
+def projecao(
+    fields: Optional[str],
+    disponiveis: Iterable[str],
+    padrao: List[str],
+    obrigatorios: Iterable[str] = ("id",),
+    presets: Optional[Dict[str, List[str]]] = None
+) -> str:
+    """
+    Monta o select a partir de ?fields=. Aceita uma lista separada por
+    vírgula, o nome de um preset (ex.: "card") ou "*" para todos os campos
+    do schema (sem os pesados). Sem fields usa a projeção padrão. Os
+    obrigatórios (id e colunas da ordenação) entram sempre.
+    """
+    disponiveis = list(disponiveis)
+
+    if not fields:
+        campos = padrao
+    elif fields == "*":
+        campos = [c for c in disponiveis if c not in PESADOS]
+    elif presets and fields in presets:
+        campos = presets[fields]
+    else:
+        campos = [c.strip() for c in fields.split(",") if c.strip()]
+        invalidos = [c for c in campos if c not in disponiveis]
+        if invalidos:
+            raise ValueError(f"Campos inválidos: {', '.join(invalidos)}")
+
+    return ",".join(dict.fromkeys([*obrigatorios, *campos]))
@@ -0,0 +1,124 @@
+from typing import List, Optional, Dict, Tuple, Iterator
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+import os
+
+from api.services import metricas
+
+
+# Orçamento de chamadas ao banco por requisição (0 desliga o aviso) e
+# quantas vezes a mesma tabela/operação pode se repetir antes de ser
+# apontada como provável N+1
+DB_CONSULTAS_MAX = int(os.getenv("DB_CONSULTAS_MAX", "15"))
+DB_CONSULTAS_REPETIDAS = int(os.getenv("DB_CONSULTAS_REPETIDAS", "5"))
+
+consultas_requisicao = metricas.Histograma(
+    "db_queries_per_request", "Chamadas ao PostgREST por requisição HTTP",
+    ("route",), (1, 2, 3, 5, 8, 13, 20, 30, 50, 100)
+)
+orcamento_excedido = metricas.Contador(
+    "db_query_budget_exceeded_total", "Requisições acima do orçamento de chamadas ao banco", ("route",)
+)
+
+
+class Contagem:
+    """Chamadas ao banco feitas dentro de um escopo (uma requisição ou um bloco de teste)."""
+
+    def __init__(self, rotulo: str = ""):
+        self.rotulo = rotulo
+        # (tabela, operação, duração em segundos), na ordem em que terminaram
+        self.consultas: List[Tuple[str, str, float]] = []
+
+    def registrar(self, tabela: str, operacao: str, duracao: float) -> None:
+        self.consultas.append((tabela, operacao, duracao))
+
+    @property
+    def total(self) -> int:
+        return len(self.consultas)
+
+    @property
+    def tempo_ms(self) -> float:
+        return sum(duracao for _, _, duracao in self.consultas) * 1000
+
+    def por_operacao(self) -> Dict[Tuple[str, str], int]:
+        return dict(Counter((tabela, operacao) for tabela, operacao, _ in self.consultas).most_common())
+
+    def repetidas(self, minimo: int = DB_CONSULTAS_REPETIDAS) -> Dict[Tuple[str, str], int]:
+        """Tabela/operação chamadas `minimo` vezes ou mais: o padrão de um N+1."""
+        if minimo <= 0:
+            return {}
+        return {chave: n for chave, n in self.por_operacao().items() if n >= minimo}
+
+    def resumo(self) -> str:
+        return ", ".join(f"{tabela}/{operacao} x{n}" for (tabela, operacao), n in self.por_operacao().items())
+
+
+_atual: ContextVar[Optional[Contagem]] = ContextVar("consultas", default=None)
+# Listas que recebem a contagem de cada requisição encerrada (assert_max_queries)
+_observadores: List[List[Contagem]] = []
+
+
+def registrar(tabela: str, operacao: str, duracao: float) -> None:
+    """Chamado por database.execute a cada chamada ao PostgREST."""
+    contagem = _atual.get()
+    if contagem is not None:
+        contagem.registrar(tabela, operacao, duracao)
+
+
+@contextmanager
+def contar(rotulo: str = "") -> Iterator[Contagem]:
+    """
+    Conta as chamadas ao banco feitas no contexto atual durante o bloco,
+    inclusive nas tasks criadas dentro dele (que herdam o contexto).
+    """
+    contagem = Contagem(rotulo)
+    token = _atual.set(contagem)
+    try:
+        yield contagem
+    finally:
+        _atual.reset(token)
+
+
+def encerrar(contagem: Contagem, rota: str) -> None:
+    """Fecha a contagem de uma requisição: métricas, avisos de orçamento e N+1."""
+    if metricas.METRICAS:
+        consultas_requisicao.observar(contagem.total, rota)
+    for observador in _observadores:
+        observador.append(contagem)
+
+    if DB_CONSULTAS_MAX and contagem.total > DB_CONSULTAS_MAX:
+        if metricas.METRICAS:
+            orcamento_excedido.inc(rota)
+        print(
+            f"[WARN] {contagem.rotulo}: {contagem.total} consultas ao banco em {contagem.tempo_ms:.1f} ms "
+            f"(orçamento {DB_CONSULTAS_MAX}): {contagem.resumo()}"
+        )
+    for (tabela, operacao), n in contagem.repetidas().items():
+        print(f"[WARN] Possível N+1 em {contagem.rotulo}: {tabela}/{operacao} chamada {n} vezes")
+
+
+@contextmanager
+def assert_max_queries(maximo: int) -> Iterator[List[Contagem]]:
+    """
+    Para os testes (tests/test_consultas.py): falha com AssertionError se
+    alguma requisição atendida pela API durante o bloco (TestClient ou
+    httpx.ASGITransport) fizer mais de `maximo` chamadas ao banco. Sem
+    requisições, vale o total do próprio bloco (chamadas diretas aos services).
+
+        with assert_max_queries(3):
+            client.post("/api/sprints/1/concluir")
+    """
+    requisicoes: List[Contagem] = []
+    _observadores.append(requisicoes)
+    try:
+        with contar("bloco") as bloco:
+            yield requisicoes
+    finally:
+        _observadores.remove(requisicoes)
+
+    excedidas = [c for c in (requisicoes or [bloco]) if c.total > maximo]
+    if excedidas:
+        raise AssertionError("\n".join(
+            f"{c.rotulo}: {c.total} consultas ao banco (máximo {maximo}): {c.resumo()}" for c in excedidas
+        ))
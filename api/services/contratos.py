@@ -1,8 +1,27 @@
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date, timedelta
 
-from api.database import get_db
-from api.schemas.contrato import ContratoCreate, ContratoUpdate
+from postgrest.types import ReturnMethod
+
+from api.database import get_db, execute
+from api.services import embeddings, bulk, paginacao, campos, cache
+from api.schemas.contrato import ContratoCreate, ContratoUpdate, ContratoResponse
+
+
+CAMPOS = [c for c in ContratoResponse.model_fields if c != "embedding"]
+# Descrição só no detalhe ou com ?fields=
+CAMPOS_LISTA = [c for c in CAMPOS if c != "descricao"]
+PROJECOES = {
+    "resumo": [
+        "titulo", "numero", "tipo", "contraparte_nome", "valor", "valor_mensal",
+        "data_inicio", "data_fim", "status", "renovacao_automatica",
+    ],
+}
+ORDEM = [("created_at", True), ("id", True)]
+
+
+def _projecao(fields: Optional[str], padrao: List[str]) -> str:
+    return campos.projecao(fields, ContratoResponse.model_fields, padrao, [c for c, _ in ORDEM], PROJECOES)
 
 
 async def listar_contratos(
@@ -11,11 +30,13 @@ async def listar_contratos(
     tipo: Optional[str] = None,
     cliente_id: Optional[int] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     db = get_db()
     
-    query = db.table("contratos").select("*").eq("empresa_id", empresa_id)
+    query = db.table("contratos").select(_projecao(fields, CAMPOS_LISTA)).eq("empresa_id", empresa_id)
     
     if status:
         query = query.eq("status", status)
@@ -24,16 +45,16 @@ async def listar_contratos(
     if cliente_id:
         query = query.eq("cliente_id", cliente_id)
     
-    query = query.order("created_at", desc=True).range(skip, skip + limit - 1)
+    query = paginacao.paginar(query, ORDEM, cursor, skip, limit)
     
-    result = query.execute()
+    result = await execute(query)
     return result.data or []
 
 
-async def buscar_contrato(contrato_id: int, empresa_id: int = 1) -> Optional[Dict[str, Any]]:
+async def buscar_contrato(contrato_id: int, empresa_id: int = 1, fields: Optional[str] = None) -> Optional[Dict[str, Any]]:
     db = get_db()
     
-    result = db.table("contratos").select("*").eq("id", contrato_id).eq("empresa_id", empresa_id).execute()
+    result = await execute(db.table("contratos").select(_projecao(fields, CAMPOS)).eq("id", contrato_id).eq("empresa_id", empresa_id))
     
     return result.data[0] if result.data else None
 
@@ -47,11 +68,12 @@ async def criar_contrato(contrato: ContratoCreate) -> Dict[str, Any]:
         if isinstance(value, date):
             data[key] = value.isoformat()
     
-    data["embedding"] = None
-    
-    result = db.table("contratos").insert(data).execute()
+    result = await execute(db.table("contratos").insert(data).select(",".join(CAMPOS)))
     
-    return result.data[0] if result.data else None
+    contrato_criado = result.data[0] if result.data else None
+    await cache.invalidar("contratos", data.get("empresa_id"))
+    embeddings.agendar("contrato", contrato_criado)
+    return contrato_criado
 
 
 async def atualizar_contrato(contrato_id: int, contrato: ContratoUpdate, empresa_id: int = 1) -> Optional[Dict[str, Any]]:
@@ -66,9 +88,14 @@ async def atualizar_contrato(contrato_id: int, contrato: ContratoUpdate, empresa
     if data:
         data["updated_at"] = datetime.utcnow().isoformat()
         
-        result = db.table("contratos").update(data).eq("id", contrato_id).eq("empresa_id", empresa_id).execute()
+        result = await execute(
+            db.table("contratos").update(data).eq("id", contrato_id).eq("empresa_id", empresa_id).select(",".join(CAMPOS))
+        )
         
-        return result.data[0] if result.data else None
+        contrato_atualizado = result.data[0] if result.data else None
+        await cache.invalidar("contratos", empresa_id)
+        embeddings.agendar("contrato", contrato_atualizado)
+        return contrato_atualizado
     
     return await buscar_contrato(contrato_id, empresa_id)
 
@@ -76,18 +103,60 @@ async def atualizar_contrato(contrato_id: int, contrato: ContratoUpdate, empresa
 async def deletar_contrato(contrato_id: int, empresa_id: int = 1) -> bool:
     db = get_db()
     
-    result = db.table("contratos").delete().eq("id", contrato_id).eq("empresa_id", empresa_id).execute()
+    result = await execute(db.table("contratos").delete().eq("id", contrato_id).eq("empresa_id", empresa_id))
+    await cache.invalidar("contratos", empresa_id)
     
     return len(result.data) > 0 if result.data else False
 
 
+def _dados_criacao(contrato: ContratoCreate) -> Dict[str, Any]:
+    return contrato.model_dump(mode="json")
+
+
+def _dados_atualizacao(contrato: ContratoUpdate) -> Dict[str, Any]:
+    data = contrato.model_dump(mode="json", exclude_unset=True)
+    data["updated_at"] = datetime.utcnow().isoformat()
+    return data
+
+
+async def criar_contratos_em_lote(itens: List[Dict[str, Any]], atomico: bool = False) -> Dict[str, Any]:
+    resultado = await bulk.criar_em_lote("contratos", itens, ContratoCreate, _dados_criacao, atomico, CAMPOS)
+    for contrato in resultado["itens"]:
+        embeddings.agendar("contrato", contrato)
+    await cache.invalidar("contratos")
+    return resultado
+
+
+async def atualizar_contratos_em_lote(
+    itens: List[Dict[str, Any]],
+    empresa_id: int = 1,
+    atomico: bool = False
+) -> Dict[str, Any]:
+    resultado = await bulk.atualizar_em_lote("contratos", itens, ContratoUpdate, _dados_atualizacao, empresa_id, atomico)
+    for contrato in resultado["itens"]:
+        embeddings.agendar("contrato", contrato)
+    await cache.invalidar("contratos", empresa_id)
+    return resultado
+
+
+async def alterar_status_contratos_em_lote(ids: List[int], status: str, empresa_id: int = 1) -> Dict[str, Any]:
+    data = {
+        "status": status,
+        "updated_at": datetime.utcnow().isoformat()
+    }
+    
+    resultado = await bulk.mover_em_lote("contratos", ids, data, empresa_id, CAMPOS)
+    await cache.invalidar("contratos", empresa_id)
+    return resultado
+
+
 async def contratos_vencem_em(dias: int, empresa_id: int = 1) -> List[Dict[str, Any]]:
     db = get_db()
     
     hoje = date.today()
     limite = hoje + timedelta(days=dias)
     
-    result = db.table("contratos").select("*").eq("empresa_id", empresa_id).eq("status", "ativo").gte("data_fim", hoje.isoformat()).lte("data_fim", limite.isoformat()).execute()
+    result = await execute(db.table("contratos").select(_projecao(None, CAMPOS_LISTA)).eq("empresa_id", empresa_id).eq("status", "ativo").gte("data_fim", hoje.isoformat()).lte("data_fim", limite.isoformat()))
     
     return result.data or []
 
@@ -97,7 +166,7 @@ async def contratos_expirados(empresa_id: int = 1) -> List[Dict[str, Any]]:
     
     hoje = date.today()
     
-    result = db.table("contratos").select("*").eq("empresa_id", empresa_id).eq("status", "ativo").lt("data_fim", hoje.isoformat()).execute()
+    result = await execute(db.table("contratos").select(_projecao(None, CAMPOS_LISTA)).eq("empresa_id", empresa_id).eq("status", "ativo").lt("data_fim", hoje.isoformat()))
     
     return result.data or []
 
@@ -121,7 +190,7 @@ async def adicionar_renovacao(
     if valor_anterior and valor_novo:
         percentual_aumento = ((valor_novo - valor_anterior) / valor_anterior) * 100
     
-    result_renovacao = db.table("contrato_renovacoes").insert({
+    result_renovacao = await execute(db.table("contrato_renovacoes").insert({
         "contrato_id": contrato_id,
         "numero_renovacao": 1,
         "data_inicio": data_inicio.isoformat(),
@@ -130,13 +199,14 @@ async def adicionar_renovacao(
         "valor_novo": valor_novo,
         "percentual_aumento": percentual_aumento,
         "status": "ativa"
-    }).execute()
+    }))
     
-    db.table("contratos").update({
+    await execute(db.table("contratos").update({
         "data_inicio": data_inicio.isoformat(),
         "data_fim": data_fim.isoformat(),
         "valor": valor_novo,
         "updated_at": datetime.utcnow().isoformat()
-    }).eq("id", contrato_id).eq("empresa_id", empresa_id).execute()
+    }, returning=ReturnMethod.minimal).eq("id", contrato_id).eq("empresa_id", empresa_id))
+    await cache.invalidar("contratos", empresa_id)
     
     return result_renovacao.data[0] if result_renovacao.data else {}
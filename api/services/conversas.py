@@ -0,0 +1,195 @@
+from typing import List, Optional, Dict, Any
+import asyncio
+import os
+
+from api.database import get_db, execute
+from api.services import llm, admissao
+
+
+# Orçamento padrão do prompt (tokens) quando o agente não define um
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "6000"))
+# Mensagens lidas do banco para montar a janela (as mais recentes)
+CHAT_HISTORICO_MAX = int(os.getenv("CHAT_HISTORICO_MAX", "50"))
+# Resumir as mensagens que saem da janela (uma chamada extra ao LLM, em background)
+CHAT_RESUMO = os.getenv("CHAT_RESUMO", "true").lower() in ("1", "true", "yes")
+CHAT_RESUMO_MAX_TOKENS = int(os.getenv("CHAT_RESUMO_MAX_TOKENS", "400"))
+
+CAMPOS_MENSAGEM = "id,conversa_id,role,conteudo,modelo,tokens,tempo_resposta_ms,created_at"
+
+PROMPT_RESUMO = """Resuma a conversa abaixo entre um usuário e um assistente em poucos parágrafos.
+Mantenha decisões, números, nomes, pendências e preferências do usuário; descarte cumprimentos.
+Responda só com o resumo."""
+
+_resumindo: set = set()
+_tarefas: set = set()
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimativa sem tokenizer (~4 caracteres por token, mais o overhead da mensagem)."""
+    return len(texto or "") // 4 + 4
+
+
+async def criar_conversa(agente: str, empresa_id: int = 1, titulo: Optional[str] = None) -> Dict[str, Any]:
+    db = get_db()
+    result = await execute(db.table("conversas").insert({
+        "empresa_id": empresa_id,
+        "agente": agente,
+        "titulo": (titulo or "")[:255] or None,
+    }))
+    return result.data[0]
+
+
+async def buscar_conversa(conversa_id: int, empresa_id: int = 1) -> Optional[Dict[str, Any]]:
+    db = get_db()
+    result = await execute(db.table("conversas").select("*").eq("id", conversa_id).eq("empresa_id", empresa_id))
+    return result.data[0] if result.data else None
+
+
+async def listar_conversas(
+    empresa_id: int = 1,
+    agente: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 50
+) -> List[Dict[str, Any]]:
+    db = get_db()
+    query = db.table("conversas").select(
+        "id,empresa_id,agente,titulo,status,mensagens_count,tokens_usados,created_at,updated_at"
+    ).eq("empresa_id", empresa_id)
+    if agente:
+        query = query.eq("agente", agente)
+    result = await execute(query.order("updated_at", desc=True).range(skip, skip + limit - 1))
+    return result.data or []
+
+
+async def listar_mensagens(conversa_id: int, antes_de: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    """Mensagens da conversa em ordem cronológica; antes_de pagina para trás por id."""
+    db = get_db()
+    query = db.table("mensagens").select(CAMPOS_MENSAGEM).eq("conversa_id", conversa_id)
+    if antes_de:
+        query = query.lt("id", antes_de)
+    result = await execute(query.order("id", desc=True).limit(limit))
+    return list(reversed(result.data or []))
+
+
+async def deletar_conversa(conversa_id: int, empresa_id: int = 1) -> bool:
+    db = get_db()
+    result = await execute(db.table("conversas").delete().eq("id", conversa_id).eq("empresa_id", empresa_id))
+    return len(result.data) > 0 if result.data else False
+
+
+async def montar_contexto(
+    conversa: Dict[str, Any],
+    system_prompt: str,
+    mensagem: str,
+    orcamento: int = CHAT_CONTEXT_TOKENS
+) -> List[Dict[str, str]]:
+    """
+    Prompt do turno: system, resumo (se houver), as mensagens mais recentes
+    que couberem no orçamento e a nova mensagem. As que ficam de fora e
+    ainda não foram resumidas disparam um resumo em background; até ele
+    terminar, elas são só cortadas.
+    """
+    db = get_db()
+    result = await execute(
+        db.table("mensagens").select("id,role,conteudo,tokens")
+        .eq("conversa_id", conversa["id"])
+        .gt("id", conversa.get("resumo_ate_id") or 0)
+        .order("id", desc=True)
+        .limit(CHAT_HISTORICO_MAX)
+    )
+    recentes = result.data or []
+
+    resumo = conversa.get("resumo")
+    fixas = [{"role": "system", "content": system_prompt}]
+    if resumo:
+        fixas.append({"role": "system", "content": f"Resumo da conversa até aqui:\n{resumo}"})
+    nova = {"role": "user", "content": mensagem}
+
+    restante = orcamento - sum(estimar_tokens(m["content"]) for m in fixas + [nova])
+    janela: List[Dict[str, Any]] = []
+    for row in recentes:
+        custo = row.get("tokens") or estimar_tokens(row["conteudo"])
+        if custo > restante:
+            break
+        restante -= custo
+        janela.append(row)
+
+    fora = recentes[len(janela):]
+    if fora and CHAT_RESUMO:
+        agendar_resumo(conversa, fora[0]["id"])
+
+    historico = [{"role": row["role"], "content": row["conteudo"]} for row in reversed(janela)]
+    return fixas + historico + [nova]
+
+
+async def registrar_turno(
+    conversa_id: int,
+    pergunta: str,
+    resposta: str,
+    modelo: Optional[str] = None,
+    tempo_resposta_ms: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Grava pergunta e resposta e atualiza os contadores da conversa (RPC registrar_mensagens)."""
+    db = get_db()
+    result = await execute(db.rpc("registrar_mensagens", {
+        "conversa_id_int": conversa_id,
+        "itens": [
+            {"role": "user", "conteudo": pergunta, "tokens": estimar_tokens(pergunta)},
+            {
+                "role": "assistant",
+                "conteudo": resposta,
+                "modelo": modelo,
+                "tokens": estimar_tokens(resposta),
+                "tempo_resposta_ms": tempo_resposta_ms,
+            },
+        ],
+    }))
+    return result.data or []
+
+
+def agendar_resumo(conversa: Dict[str, Any], ate_id: int) -> None:
+    """Resume em background até ate_id (inclusive); um resumo por conversa de cada vez."""
+    if conversa["id"] in _resumindo:
+        return
+    _resumindo.add(conversa["id"])
+    tarefa = asyncio.create_task(_resumir(conversa, ate_id))
+    _tarefas.add(tarefa)
+    tarefa.add_done_callback(_tarefas.discard)
+
+
+async def _resumir(conversa: Dict[str, Any], ate_id: int) -> None:
+    try:
+        db = get_db()
+        result = await execute(
+            db.table("mensagens").select("id,role,conteudo")
+            .eq("conversa_id", conversa["id"])
+            .gt("id", conversa.get("resumo_ate_id") or 0)
+            .lte("id", ate_id)
+            .order("id")
+        )
+        mensagens = result.data or []
+        if not mensagens:
+            return
+
+        texto = "\n".join(f"{m['role']}: {m['conteudo']}" for m in mensagens)
+        if conversa.get("resumo"):
+            texto = f"Resumo anterior:\n{conversa['resumo']}\n\nContinuação:\n{texto}"
+
+        # Conta no limite de concorrência do agente, atrás das mensagens do chat
+        async with admissao.vaga(conversa["agente"], admissao.PRIORIDADE_SEGUNDO_PLANO):
+            await admissao.cota.retirar()
+            resumo = await llm.completar(
+                [{"role": "system", "content": PROMPT_RESUMO}, {"role": "user", "content": texto}],
+                max_tokens=CHAT_RESUMO_MAX_TOKENS
+            )
+        # Só avança se ninguém resumiu além deste ponto enquanto isso
+        await execute(
+            db.table("conversas")
+            .update({"resumo": resumo, "resumo_ate_id": mensagens[-1]["id"]})
+            .eq("id", conversa["id"])
+            .lt("resumo_ate_id", mensagens[-1]["id"])
+        )
+    except Exception as e:
+        print(f"[ERROR] Erro ao resumir conversa {conversa['id']}: {e}")
+    finally:
+        _resumindo.discard(conversa["id"])
@@ -0,0 +1,425 @@
+from typing import List, Optional, Dict, Any, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
+import math
+import os
+import re
+import unicodedata
+
+import httpx
+
+from api.database import get_db, execute
+from api.services import cache
+
+
+EMBEDDING_DIMENSIONS = 1536
+# Sem EMBEDDING_API_KEY não há provedor: a busca fica só textual. O "local"
+# (hash, sem semântica) só vale quando pedido explicitamente
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai" if os.getenv("EMBEDDING_API_KEY") else "")
+EMBEDDING_API_URL = os.getenv("EMBEDDING_API_URL", "https://api.openai.com/v1/embeddings")
+EMBEDDING_API_KEY = os.getenv("EMBEDDING_API_KEY")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_FLUSH_INTERVAL = float(os.getenv("EMBEDDING_FLUSH_INTERVAL", "2"))
+# Indexa no startup as linhas ainda sem embedding (criadas sem provedor ou antes dele)
+EMBEDDING_BACKFILL = os.getenv("EMBEDDING_BACKFILL", "true").lower() == "true"
+# Só um worker faz o backfill: os demais encontram o lock (cache compartilhado)
+# e pulam. Expira sozinho se o worker que o pegou morrer no meio
+EMBEDDING_BACKFILL_LOCK_S = float(os.getenv("EMBEDDING_BACKFILL_LOCK_S", "3600"))
+
+# Campos usados para montar o texto de cada entidade
+ENTIDADES = {
+    "tarefa": {"tabela": "tarefas", "campos": ("titulo", "descricao")},
+    "contrato": {"tabela": "contratos", "campos": ("titulo", "contraparte_nome", "descricao")},
+    "transacao": {"tabela": "transacoes", "campos": ("descricao", "pessoa_nome", "descricao_detalhada", "observacoes")},
+}
+
+
+class EmbeddingProvider:
+    """Interface dos provedores de embedding."""
+
+    nome = "base"
+    dimensions = EMBEDDING_DIMENSIONS
+
+    async def embed(self, textos: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """Qualquer endpoint compatível com POST /v1/embeddings da OpenAI."""
+
+    def __init__(self, url: str, api_key: str, model: str):
+        self.nome = f"openai:{model}"
+        self.url = url
+        self.model = model
+        self._client = httpx.AsyncClient(
+            timeout=30.0,
+            headers={"Authorization": f"Bearer {api_key}"}
+        )
+
+    async def embed(self, textos: List[str]) -> List[List[float]]:
+        response = await self._client.post(
+            self.url,
+            json={"model": self.model, "input": textos, "dimensions": self.dimensions}
+        )
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    Embedding determinístico por feature hashing de palavras e trigramas.
+    Não precisa de rede nem captura sinônimos: só para desenvolvimento e
+    testes (EMBEDDING_PROVIDER=local ou set_provider).
+    """
+
+    nome = "local:hash-v1"
+
+    async def embed(self, textos: List[str]) -> List[List[float]]:
+        return [self.vetor(texto) for texto in textos]
+
+    def vetor(self, texto: str) -> List[float]:
+        vetor = [0.0] * self.dimensions
+        for feature, peso in self._features(texto):
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            indice = int.from_bytes(digest[:4], "little") % self.dimensions
+            sinal = 1.0 if digest[4] & 1 else -1.0
+            vetor[indice] += sinal * peso
+
+        norma = math.sqrt(sum(v * v for v in vetor))
+        if not norma:
+            return vetor
+        return [v / norma for v in vetor]
+
+    @staticmethod
+    def _features(texto: str):
+        texto = unicodedata.normalize("NFKD", texto.lower())
+        texto = "".join(c for c in texto if not unicodedata.combining(c))
+        for palavra in re.findall(r"\w+", texto):
+            yield f"w:{palavra}", 1.0
+            marcada = f"#{palavra}#"
+            for i in range(len(marcada) - 2):
+                yield f"t:{marcada[i:i + 3]}", 0.5
+
+
+_provider: Optional[EmbeddingProvider] = None
+
+
+def get_provider() -> Optional[EmbeddingProvider]:
+    """Provedor configurado; None se não há nenhum (sem EMBEDDING_API_KEY)."""
+    global _provider
+
+    if _provider is None:
+        if EMBEDDING_PROVIDER == "openai":
+            if not EMBEDDING_API_KEY:
+                raise Exception("Missing config: EMBEDDING_API_KEY")
+            _provider = OpenAIEmbeddingProvider(EMBEDDING_API_URL, EMBEDDING_API_KEY, EMBEDDING_MODEL)
+        elif EMBEDDING_PROVIDER == "local":
+            _provider = LocalEmbeddingProvider()
+        elif EMBEDDING_PROVIDER:
+            raise Exception(f"Invalid config: EMBEDDING_PROVIDER={EMBEDDING_PROVIDER}")
+    return _provider
+
+
+def disponivel() -> bool:
+    """Há provedor de embeddings? Sem ele as buscas caem para o modo texto."""
+    return get_provider() is not None
+
+
+async def close_provider() -> None:
+    global _provider
+
+    if _provider is not None:
+        await _provider.close()
+        _provider = None
+
+
+def set_provider(provider: Optional[EmbeddingProvider]) -> None:
+    """Troca o provedor (ex.: LocalEmbeddingProvider em testes)."""
+    global _provider
+    _provider = provider
+    _query_cache.clear()
+
+
+def texto_entidade(entidade_tipo: str, row: Dict[str, Any]) -> str:
+    campos = ENTIDADES[entidade_tipo]["campos"]
+    return "\n".join(str(row[c]) for c in campos if row.get(c))
+
+
+def texto_hash(texto: str) -> str:
+    """Hash do texto + provedor; trocar de modelo invalida os embeddings antigos."""
+    return hashlib.sha256(f"{get_provider().nome}\n{texto}".encode()).hexdigest()
+
+
+_query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+_QUERY_CACHE_SIZE = 512
+
+
+async def gerar_embedding(texto: str) -> Optional[List[float]]:
+    """Embedding de uma consulta de busca (com cache LRU em memória)."""
+    texto = texto.strip()
+    if not texto or not disponivel():
+        return None
+
+    chave = texto_hash(texto)
+    if chave in _query_cache:
+        _query_cache.move_to_end(chave)
+        return _query_cache[chave]
+
+    try:
+        vetor = (await get_provider().embed([texto]))[0]
+    except Exception as e:
+        print(f"[ERROR] Erro ao gerar embedding: {e}")
+        return None
+
+    _query_cache[chave] = vetor
+    if len(_query_cache) > _QUERY_CACHE_SIZE:
+        _query_cache.popitem(last=False)
+    return vetor
+
+
+class EmbeddingQueue:
+    """
+    Fila assíncrona de linhas a (re)indexar. O worker agrupa pedidos em lotes,
+    pula textos cujo hash já está em embeddings_cache e grava o resto com uma
+    única chamada a aplicar_embeddings por lote.
+    """
+
+    def __init__(self, batch_size: int = EMBEDDING_BATCH_SIZE, flush_interval: float = EMBEDDING_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pendentes: "OrderedDict[Tuple[str, int], Dict[str, Any]]" = OrderedDict()
+        self._evento: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"agendados": 0, "embedados": 0, "reaproveitados": 0, "inalterados": 0, "erros": 0}
+
+    def agendar(self, entidade_tipo: str, row: Optional[Dict[str, Any]], sem_embedding: bool = False) -> None:
+        # Sem provedor a linha fica com embedding nulo até o próximo backfill
+        if not row or entidade_tipo not in ENTIDADES or not disponivel():
+            return
+
+        texto = texto_entidade(entidade_tipo, row)
+        if not texto:
+            return
+
+        # Edições repetidas da mesma linha antes do flush viram um único item
+        chave = (entidade_tipo, row["id"])
+        anterior = self._pendentes.get(chave)
+        self._pendentes[chave] = {
+            "entidade_tipo": entidade_tipo,
+            "entidade_id": row["id"],
+            "empresa_id": row.get("empresa_id"),
+            "texto": texto,
+            # Linha lida com embedding nulo: aplica o vetor mesmo se o cache já o tem
+            "sem_embedding": sem_embedding or bool(anterior and anterior["sem_embedding"]),
+        }
+        self.stats["agendados"] += 1
+        if len(self._pendentes) >= self.batch_size and self._evento is not None:
+            self._evento.set()
+
+    def pendentes(self) -> int:
+        return len(self._pendentes)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._evento = asyncio.Event()
+            self._task = asyncio.create_task(self._worker())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._evento = None
+        await self.flush()
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._evento.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._evento.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        while self._pendentes:
+            lote = []
+            while self._pendentes and len(lote) < self.batch_size:
+                lote.append(self._pendentes.popitem(last=False)[1])
+            try:
+                await self._processar(lote)
+            except Exception as e:
+                self.stats["erros"] += 1
+                print(f"[ERROR] Erro ao processar lote de embeddings: {e}")
+
+    async def _processar(self, lote: List[Dict[str, Any]]) -> None:
+        db = get_db()
+
+        for item in lote:
+            item["texto_hash"] = texto_hash(item["texto"])
+        hashes = list({item["texto_hash"] for item in lote})
+
+        existentes = await execute(
+            db.table("embeddings_cache")
+            .select("entidade_tipo, entidade_id, texto_hash, embedding")
+            .in_("texto_hash", hashes)
+        )
+
+        atuais = {(r["entidade_tipo"], r["entidade_id"], r["texto_hash"]) for r in existentes.data or []}
+        por_hash = {r["texto_hash"]: r["embedding"] for r in existentes.data or []}
+
+        novos = []
+        for item in lote:
+            # O cache pode estar em dia e a linha de origem não (ex.: linha
+            # recriada, aplicação interrompida): essas recebem o vetor do cache
+            if (item["entidade_tipo"], item["entidade_id"], item["texto_hash"]) in atuais and not item["sem_embedding"]:
+                self.stats["inalterados"] += 1
+                continue
+            novos.append(item)
+
+        if not novos:
+            return
+
+        # Textos idênticos (no lote ou já no cache) são embedados uma única vez
+        faltando = OrderedDict()
+        for item in novos:
+            if item["texto_hash"] in por_hash:
+                self.stats["reaproveitados"] += 1
+            else:
+                faltando.setdefault(item["texto_hash"], item["texto"])
+
+        if faltando:
+            vetores = await get_provider().embed(list(faltando.values()))
+            por_hash.update(zip(faltando.keys(), vetores))
+            self.stats["embedados"] += len(faltando)
+
+        await execute(db.rpc("aplicar_embeddings", {
+            "itens": [
+                {
+                    "entidade_tipo": item["entidade_tipo"],
+                    "entidade_id": item["entidade_id"],
+                    "empresa_id": item["empresa_id"],
+                    "texto_hash": item["texto_hash"],
+                    "texto_preview": item["texto"][:200],
+                    "embedding": por_hash[item["texto_hash"]],
+                }
+                for item in novos
+            ]
+        }))
+
+
+fila = EmbeddingQueue()
+
+
+def agendar(entidade_tipo: str, row: Optional[Dict[str, Any]]) -> None:
+    """Agenda a (re)indexação de uma linha recém-criada ou alterada."""
+    fila.agendar(entidade_tipo, row)
+
+
+async def reindexar_pendentes(
+    entidade_tipo: str,
+    empresa_id: Optional[int] = 1,
+    pagina: int = 500,
+    aguardar: bool = False
+) -> int:
+    """
+    Agenda todas as linhas ainda sem embedding (backfill) da empresa, ou de
+    todas as empresas com empresa_id=None. Com `aguardar`, cada página é
+    indexada antes da próxima ser lida, para a fila não crescer sem limite.
+    """
+    if not disponivel():
+        return 0
+
+    db = get_db()
+    config = ENTIDADES[entidade_tipo]
+    colunas = ", ".join(("id", "empresa_id") + config["campos"])
+
+    total = 0
+    ultimo_id = 0
+    while True:
+        query = db.table(config["tabela"]).select(colunas)
+        if empresa_id is not None:
+            query = query.eq("empresa_id", empresa_id)
+        result = await execute(
+            query
+            .is_("embedding", "null")
+            .gt("id", ultimo_id)
+            .order("id")
+            .limit(pagina)
+        )
+        rows = result.data or []
+        for row in rows:
+            fila.agendar(entidade_tipo, row, sem_embedding=True)
+        total += len(rows)
+        if aguardar:
+            await fila.flush()
+        if len(rows) < pagina:
+            return total
+        ultimo_id = rows[-1]["id"]
+
+
+_backfill: Optional[asyncio.Task] = None
+
+
+def _chave_backfill() -> str:
+    return f"{cache.CACHE_PREFIXO}:embeddings:backfill"
+
+
+async def _backfill_todos() -> None:
+    if not await cache.compartilhado.set(_chave_backfill(), cache.WORKER_ID, EMBEDDING_BACKFILL_LOCK_S, nx=True):
+        return
+    try:
+        for entidade_tipo in ENTIDADES:
+            try:
+                await reindexar_pendentes(entidade_tipo, None, aguardar=True)
+            except Exception as e:
+                print(f"[ERROR] Erro no backfill de embeddings de {entidade_tipo}: {e}")
+    finally:
+        await cache.compartilhado.delete(_chave_backfill())
+
+
+def iniciar_backfill() -> None:
+    """
+    Startup (depois de cache.iniciar): indexa em segundo plano, pela fila,
+    tudo o que ficou sem embedding. Um worker por vez, pelo lock no cache
+    compartilhado; sem REDIS_URL o lock é só do processo.
+    """
+    global _backfill
+
+    if not disponivel():
+        print("[WARN] Nenhum provedor de embeddings (EMBEDDING_API_KEY): buscas só no modo texto")
+        return
+    if EMBEDDING_BACKFILL and _backfill is None:
+        _backfill = asyncio.create_task(_backfill_todos())
+
+
+async def encerrar_backfill() -> None:
+    global _backfill
+
+    if _backfill is not None:
+        _backfill.cancel()
+        try:
+            await _backfill
+        except asyncio.CancelledError:
+            pass
+        _backfill = None
+
+
+def status() -> Dict[str, Any]:
+    return {
+        "provider": get_provider().nome if disponivel() else None,
+        "pendentes": fila.pendentes(),
+        **fila.stats,
+    }
@@ -0,0 +1,110 @@
+from typing import List, Dict, Any, AsyncIterator, Callable, Tuple
+import asyncio
+import csv
+import io
+import json
+import os
+import zlib
+
+from api.database import get_db, execute
+
+
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+async def paginar(
+    tabela: str,
+    colunas: List[str],
+    filtrar: Callable[[Any], Any],
+    pagina: int = EXPORT_PAGE_SIZE
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Percorre a tabela por keyset (id > último id, ordem por id). A próxima
+    página já é buscada enquanto a atual é serializada; no máximo duas
+    páginas ficam em memória.
+    """
+    db = get_db()
+
+    async def buscar(ultimo_id: int) -> List[Dict[str, Any]]:
+        query = filtrar(db.table(tabela).select(",".join(colunas)))
+        result = await execute(query.gt("id", ultimo_id).order("id").limit(pagina))
+        return result.data or []
+
+    proxima = asyncio.ensure_future(buscar(0))
+    try:
+        while proxima is not None:
+            rows = await proxima
+            proxima = asyncio.ensure_future(buscar(rows[-1]["id"])) if len(rows) == pagina else None
+            if rows:
+                yield rows
+    finally:
+        if proxima is not None and not proxima.done():
+            proxima.cancel()
+
+
+def _valor_csv(valor: Any) -> Any:
+    if valor is None:
+        return ""
+    if isinstance(valor, (list, dict)):
+        return json.dumps(valor, ensure_ascii=False)
+    return valor
+
+
+async def _csv(paginas: AsyncIterator[List[Dict[str, Any]]], colunas: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # BOM para o Excel reconhecer UTF-8 (acentos)
+    buffer.write("\ufeff")
+    writer.writerow(colunas)
+    async for rows in paginas:
+        for row in rows:
+            writer.writerow([_valor_csv(row.get(c)) for c in colunas])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def _ndjson(paginas: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    async for rows in paginas:
+        yield "".join(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows).encode()
+
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        dados = compressor.compress(chunk)
+        if dados:
+            yield dados
+    yield compressor.flush()
+
+
+def exportar(
+    tabela: str,
+    colunas: List[str],
+    filtrar: Callable[[Any], Any],
+    formato: str = "csv",
+    gzip: bool = False
+) -> AsyncIterator[bytes]:
+    """Corpo da exportação em blocos de bytes, página a página."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato}")
+
+    paginas = paginar(tabela, colunas, filtrar)
+    corpo = _csv(paginas, colunas) if formato == "csv" else _ndjson(paginas)
+    return _gzip(corpo) if gzip else corpo
+
+
+def cabecalhos(nome: str, formato: str, gzip: bool = False) -> Tuple[str, Dict[str, str]]:
+    """media_type e headers para o StreamingResponse da exportação."""
+    arquivo = f"{nome}.{formato}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else FORMATOS[formato]
+    return media_type, {"Content-Disposition": f'attachment; filename="{arquivo}"'}
@@ -1,43 +1,51 @@
 from typing import Optional, List, Dict, Any
-from api.database import get_db
+from api.database import get_db, execute
+from api.services import cache
 
 
 class GrupoService:
     @staticmethod
-    def create(data: Dict[str, Any]) -> Dict[str, Any]:
+    async def create(data: Dict[str, Any]) -> Dict[str, Any]:
         db = get_db()
-        result = db.table("grupos").insert(data).execute()
+        result = await execute(db.table("grupos").insert(data))
+        await cache.invalidar("grupos", data.get("empresa_id"))
         if result.data:
             return result.data[0]
         return {}
     
     @staticmethod
-    def get_by_id(grupo_id: int) -> Optional[Dict[str, Any]]:
-        db = get_db()
-        result = db.table("grupos").select("*").eq("id", grupo_id).execute()
-        if result.data:
-            return result.data[0]
-        return None
+    async def get_by_id(grupo_id: int) -> Optional[Dict[str, Any]]:
+        async def carregar():
+            db = get_db()
+            result = await execute(db.table("grupos").select("*").eq("id", grupo_id))
+            if result.data:
+                return result.data[0]
+            return None
+        return await cache.lembrar("grupos", None, {"id": grupo_id}, carregar)
     
     @staticmethod
-    def list(empresa_id: int = 1, ativo: Optional[bool] = None) -> List[Dict[str, Any]]:
-        db = get_db()
-        query = db.table("grupos").select("*").eq("empresa_id", empresa_id)
-        if ativo is not None:
-            query = query.eq("ativo", ativo)
-        result = query.order("ordem").execute()
-        return result.data or []
+    async def list(empresa_id: int = 1, ativo: Optional[bool] = None) -> List[Dict[str, Any]]:
+        async def carregar():
+            db = get_db()
+            query = db.table("grupos").select("*").eq("empresa_id", empresa_id)
+            if ativo is not None:
+                query = query.eq("ativo", ativo)
+            result = await execute(query.order("ordem"))
+            return result.data or []
+        return await cache.lembrar("grupos", empresa_id, {"ativo": ativo}, carregar)
     
     @staticmethod
-    def update(grupo_id: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def update(grupo_id: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         db = get_db()
-        result = db.table("grupos").update(data).eq("id", grupo_id).execute()
+        result = await execute(db.table("grupos").update(data).eq("id", grupo_id))
+        await cache.invalidar("grupos")
         if result.data:
             return result.data[0]
         return None
     
     @staticmethod
-    def delete(grupo_id: int) -> bool:
+    async def delete(grupo_id: int) -> bool:
         db = get_db()
-        result = db.table("grupos").delete().eq("id", grupo_id).execute()
+        result = await execute(db.table("grupos").delete().eq("id", grupo_id))
+        await cache.invalidar("grupos")
         return len(result.data) > 0 if result.data else False
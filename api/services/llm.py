@@ -0,0 +1,228 @@
+from typing import List, Optional, Dict, Any, AsyncIterator
+from collections import deque
+import json
+import math
+import os
+import time
+
+import httpx
+
+
+OPENROUTER_API_URL = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+LLM_MODEL = os.getenv("LLM_MODEL", "openrouter/auto")
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "2048"))
+
+# Pool HTTP com o OpenRouter (por worker), aberto no startup e reaproveitado
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "20"))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "10"))
+LLM_POOL_KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+# Tempo máximo sem receber bytes (no streaming, entre dois deltas)
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() in ("1", "true", "yes")
+
+HEADERS = {
+    "Content-Type": "application/json",
+    "HTTP-Referer": "https://edihub.work.gd",
+    "X-Title": "EdiculaWorks",
+}
+
+
+# Status do provedor que não adianta repetir em outro modelo
+STATUS_DEFINITIVOS = {400, 401, 403}
+
+
+class LLMError(Exception):
+    """
+    Resposta de erro do provedor (status HTTP ou erro no meio do stream).
+    upstream é o status devolvido pelo provedor, quando houver; retentavel
+    indica se outro modelo pode dar certo (rate limit, 5xx, erro no stream).
+    """
+
+    def __init__(self, mensagem: str, status_code: int = 502, upstream: Optional[int] = None, retentavel: bool = True):
+        super().__init__(mensagem)
+        self.status_code = status_code
+        self.upstream = upstream
+        self.retentavel = retentavel
+
+
+class LLMMetrics:
+    """Tempo até o primeiro token (TTFT) e duração das chamadas ao provedor."""
+
+    def __init__(self, amostras: int = 500):
+        self.contadores = {"requests": 0, "streams": 0, "erros": 0, "timeouts": 0, "deltas": 0}
+        self.ttft: "deque[float]" = deque(maxlen=amostras)
+        self.duracao: "deque[float]" = deque(maxlen=amostras)
+
+    def registrar(self, ttft: Optional[float], duracao: float):
+        if ttft is not None:
+            self.ttft.append(ttft)
+        self.duracao.append(duracao)
+
+    @staticmethod
+    def _percentis(valores) -> Dict[str, Optional[float]]:
+        if not valores:
+            return {"p50_ms": None, "p95_ms": None, "max_ms": None}
+        ordenados = sorted(valores)
+
+        def p(q):
+            # Nearest-rank
+            return round(ordenados[max(0, math.ceil(q * len(ordenados)) - 1)] * 1000, 1)
+
+        return {"p50_ms": p(0.5), "p95_ms": p(0.95), "max_ms": round(ordenados[-1] * 1000, 1)}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.contadores,
+            "ttft": self._percentis(self.ttft),
+            "duracao": self._percentis(self.duracao),
+        }
+
+
+metricas = LLMMetrics()
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=LLM_HTTP2,
+            limits=httpx.Limits(
+                max_connections=LLM_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_POOL_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def configurado() -> bool:
+    return bool(os.getenv("OPENROUTER_API_KEY"))
+
+
+def _headers() -> Dict[str, str]:
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    if not api_key:
+        raise LLMError("OpenRouter API key não configurada", 500, retentavel=False)
+    return {**HEADERS, "Authorization": f"Bearer {api_key}"}
+
+
+def _corpo(messages: List[Dict[str, str]], model: Optional[str], max_tokens: Optional[int], stream: bool) -> Dict[str, Any]:
+    corpo = {
+        "model": model or LLM_MODEL,
+        "messages": messages,
+        "max_tokens": max_tokens or LLM_MAX_TOKENS,
+    }
+    if stream:
+        corpo["stream"] = True
+    return corpo
+
+
+async def completar(
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    max_tokens: Optional[int] = None
+) -> str:
+    """Resposta completa (sem streaming) pelo cliente compartilhado."""
+    inicio = time.perf_counter()
+    metricas.contadores["requests"] += 1
+    try:
+        response = await get_client().post(OPENROUTER_API_URL, headers=_headers(), json=_corpo(messages, model, max_tokens, False))
+        if response.status_code != 200:
+            raise LLMError(
+                f"Erro na API: {response.text}", 500,
+                upstream=response.status_code, retentavel=response.status_code not in STATUS_DEFINITIVOS
+            )
+        resposta = response.json()["choices"][0]["message"]["content"]
+    except httpx.TimeoutException:
+        metricas.contadores["timeouts"] += 1
+        raise
+    except Exception:
+        metricas.contadores["erros"] += 1
+        raise
+    # Sem streaming o primeiro token chega junto com o último
+    duracao = time.perf_counter() - inicio
+    metricas.registrar(duracao, duracao)
+    return resposta
+
+
+async def stream(
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    max_tokens: Optional[int] = None,
+    tempos: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[str]:
+    """
+    Repassa os deltas do SSE do OpenRouter conforme chegam. Comentários de
+    keep-alive (": OPENROUTER PROCESSING") são ignorados; um objeto "error"
+    no meio do stream vira LLMError. Se tempos for passado, recebe ttft_ms,
+    total_ms e o modelo usado ao final.
+    """
+    inicio = time.perf_counter()
+    ttft = None
+    metricas.contadores["streams"] += 1
+    try:
+        async with get_client().stream(
+            "POST", OPENROUTER_API_URL, headers=_headers(), json=_corpo(messages, model, max_tokens, True)
+        ) as response:
+            if response.status_code != 200:
+                raise LLMError(
+                    f"Erro na API: {(await response.aread()).decode(errors='replace')}", 500,
+                    upstream=response.status_code, retentavel=response.status_code not in STATUS_DEFINITIVOS
+                )
+
+            async for linha in response.aiter_lines():
+                if not linha.startswith("data:"):
+                    continue
+                dados = linha[5:].strip()
+                # Depois do [DONE] o corpo é lido até o fim para a conexão voltar ao pool
+                if dados == "[DONE]":
+                    continue
+                evento = json.loads(dados)
+                if "error" in evento:
+                    raise LLMError(f"Erro na API: {evento['error'].get('message', evento['error'])}")
+                if tempos is not None and evento.get("model"):
+                    tempos["modelo"] = evento["model"]
+                for choice in evento.get("choices") or []:
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        if ttft is None:
+                            ttft = time.perf_counter() - inicio
+                        metricas.contadores["deltas"] += 1
+                        yield delta
+    except httpx.TimeoutException:
+        metricas.contadores["timeouts"] += 1
+        raise
+    except Exception:
+        metricas.contadores["erros"] += 1
+        raise
+    finally:
+        duracao = time.perf_counter() - inicio
+        metricas.registrar(ttft, duracao)
+        if tempos is not None:
+            tempos["ttft_ms"] = round(ttft * 1000, 1) if ttft is not None else None
+            tempos["total_ms"] = round(duracao * 1000, 1)
+
+
+def status() -> Dict[str, Any]:
+    return {
+        "url": OPENROUTER_API_URL,
+        "modelo": LLM_MODEL,
+        "pool": {
+            "max_connections": LLM_POOL_MAX_CONNECTIONS,
+            "max_keepalive": LLM_POOL_MAX_KEEPALIVE,
+            "aberto": _client is not None,
+        },
+        **metricas.snapshot(),
+    }
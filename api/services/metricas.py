@@ -0,0 +1,163 @@
+from typing import List, Optional, Dict, Any, Callable, Tuple, Iterable
+from bisect import bisect_left
+import math
+import os
+
+
+# Expor /metrics (formato texto do Prometheus)
+METRICAS = os.getenv("METRICAS", "true").lower() in ("1", "true", "yes")
+
+# Limites dos buckets em segundos: rotas e banco (ms a segundos) e LLM (segundos a minuto)
+BUCKETS_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_LLM = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+Labels = Tuple[str, ...]
+
+_registro: List["Metrica"] = []
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar(valor: float) -> str:
+    if valor == math.inf:
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class Metrica:
+    """
+    Base das métricas. Sem locks: as observações acontecem no event loop
+    (uma thread por worker), inclusive as do banco, registradas depois do
+    await da thread do supabase-py.
+    """
+
+    tipo = "untyped"
+
+    def __init__(self, nome: str, ajuda: str, labels: Iterable[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.labels = tuple(labels)
+        _registro.append(self)
+
+    def _rotulos(self, valores: Labels, extra: str = "") -> str:
+        pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(self.labels, valores)]
+        if extra:
+            pares.append(extra)
+        return "{" + ",".join(pares) + "}" if pares else ""
+
+    def amostras(self) -> List[str]:
+        raise NotImplementedError
+
+    def exportar(self) -> str:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        return "\n".join(linhas + self.amostras())
+
+
+class Contador(Metrica):
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, labels: Iterable[str] = ()):
+        super().__init__(nome, ajuda, labels)
+        self.valores: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, valor: float = 1) -> None:
+        self.valores[labels] = self.valores.get(labels, 0) + valor
+
+    def amostras(self) -> List[str]:
+        return [f"{self.nome}{self._rotulos(labels)} {_formatar(v)}" for labels, v in self.valores.items()]
+
+
+class Medidor(Metrica):
+    """Valor lido na hora da coleta: coletar() devolve {labels: valor}."""
+
+    tipo = "gauge"
+
+    def __init__(self, nome: str, ajuda: str, coletar: Callable[[], Dict[Labels, float]], labels: Iterable[str] = ()):
+        super().__init__(nome, ajuda, labels)
+        self.coletar = coletar
+
+    def amostras(self) -> List[str]:
+        try:
+            valores = self.coletar()
+        except Exception as e:
+            print(f"[ERROR] Falha ao coletar {self.nome}: {e}")
+            return []
+        return [f"{self.nome}{self._rotulos(labels)} {_formatar(v)}" for labels, v in valores.items()]
+
+
+class Histograma(Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = BUCKETS_HTTP):
+        super().__init__(nome, ajuda, labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [contagem por bucket (não acumulada, o último é +Inf), soma, total]
+        self.series: Dict[Labels, List[Any]] = {}
+
+    def observar(self, valor: float, *labels: str) -> None:
+        serie = self.series.get(labels)
+        if serie is None:
+            serie = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        serie[0][bisect_left(self.buckets, valor)] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+    def amostras(self) -> List[str]:
+        linhas = []
+        for labels, (contagens, soma, total) in self.series.items():
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (math.inf,), contagens):
+                acumulado += contagem
+                le = 'le="' + _formatar(limite) + '"'
+                linhas.append(f"{self.nome}_bucket{self._rotulos(labels, le)} {acumulado}")
+            linhas.append(f"{self.nome}_sum{self._rotulos(labels)} {_formatar(soma)}")
+            linhas.append(f"{self.nome}_count{self._rotulos(labels)} {total}")
+        return linhas
+
+
+# ============================================
+# Métricas da API
+# ============================================
+
+http_duracao = Histograma(
+    "http_request_duration_seconds", "Duração das requisições HTTP por rota",
+    ("method", "route", "status")
+)
+db_duracao = Histograma(
+    "db_query_duration_seconds", "Duração das chamadas ao PostgREST por tabela e operação",
+    ("table", "operation", "status")
+)
+llm_ttft = Histograma(
+    "llm_time_to_first_token_seconds", "Tempo até o primeiro trecho da resposta do chat",
+    ("agente", "modelo", "modo", "origem"), BUCKETS_LLM
+)
+llm_duracao = Histograma(
+    "llm_response_duration_seconds", "Duração das respostas do chat",
+    ("agente", "modelo", "modo", "origem"), BUCKETS_LLM
+)
+llm_erros = Contador(
+    "llm_errors_total", "Respostas do chat que terminaram em erro", ("agente", "modo", "status")
+)
+llm_tentativas = Histograma(
+    "llm_upstream_attempt_duration_seconds", "Duração das chamadas a cada modelo no provedor",
+    ("modelo", "modo", "resultado"), BUCKETS_LLM
+)
+
+
+def exportar() -> str:
+    return "\n".join(m.exportar() for m in _registro) + "\n"
+
+
+def operacao(metodo: str, caminho: str, prefer: Optional[str]) -> Tuple[str, str]:
+    """(tabela, operação) de uma requisição ao PostgREST ("/rest/v1/tarefas", "PATCH")."""
+    partes = caminho.rstrip("/").split("/")
+    if len(partes) >= 2 and partes[-2] == "rpc":
+        return partes[-1], "rpc"
+    tabela = partes[-1] if partes else ""
+    if metodo == "POST":
+        return tabela, "upsert" if prefer and "resolution=" in prefer else "insert"
+    return tabela, {"GET": "select", "HEAD": "count", "PATCH": "update", "DELETE": "delete"}.get(metodo, metodo.lower())
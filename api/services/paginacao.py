@@ -0,0 +1,83 @@
+from typing import List, Optional, Dict, Any, Tuple
+import base64
+import json
+
+
+# Ordenações das listagens: (coluna, desc). O id entra sempre por último como
+# desempate, para a ordem ser total e o cursor apontar para uma linha só.
+Ordem = List[Tuple[str, bool]]
+
+HEADER_CURSOR = "X-Next-Cursor"
+
+
+def codificar_cursor(valores: List[Any]) -> str:
+    dados = json.dumps(valores, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(dados).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, ordem: Ordem) -> List[Any]:
+    try:
+        dados = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(dados)
+    except (ValueError, TypeError):
+        raise ValueError("Cursor inválido")
+    if not isinstance(valores, list) or len(valores) != len(ordem):
+        raise ValueError("Cursor inválido")
+    return valores
+
+
+def _valor(valor: Any) -> str:
+    # Aspas para valores com vírgula, ponto ou parênteses (datas, nomes)
+    return '"' + str(valor).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _depois(coluna: str, desc: bool, valor: Any) -> Optional[str]:
+    """Condição "vem depois de valor" na ordem da coluna (nulls por último)."""
+    if valor is None:
+        return None
+    return f"{coluna}.{'lt' if desc else 'gt'}.{_valor(valor)},{coluna}.is.null"
+
+
+def _filtro_keyset(ordem: Ordem, valores: List[Any]) -> str:
+    """
+    Expande (a, b, id) > (x, y, z) em OR de prefixos iguais:
+    a > x OR (a = x AND b > y) OR (a = x AND b = y AND id > z).
+    """
+    termos = []
+    for i, (coluna, desc) in enumerate(ordem):
+        iguais = [
+            f"{c}.is.null" if v is None else f"{c}.eq.{_valor(v)}"
+            for (c, _), v in zip(ordem[:i], valores[:i])
+        ]
+        depois = _depois(coluna, desc, valores[i])
+        if depois is None:
+            continue
+        cond = f"or({depois})" if "," in depois else depois
+        termos.append(f"and({','.join(iguais + [cond])})" if iguais else cond)
+    return ",".join(termos)
+
+
+def paginar(query, ordem: Ordem, cursor: Optional[str] = None, skip: int = 0, limit: int = 100):
+    """
+    Aplica ordem e paginação. Com cursor a página começa logo após a última
+    linha da anterior (keyset); sem cursor cai no OFFSET por skip, mantido
+    só por compatibilidade.
+    """
+    for coluna, desc in ordem:
+        query = query.order(coluna, desc=desc, nullsfirst=False)
+
+    if cursor:
+        filtro = _filtro_keyset(ordem, decodificar_cursor(cursor, ordem))
+        if filtro:
+            query = query.or_(filtro)
+        return query.limit(limit)
+
+    return query.range(skip, skip + limit - 1)
+
+
+def proximo_cursor(rows: List[Dict[str, Any]], ordem: Ordem, limit: int) -> Optional[str]:
+    """Cursor da próxima página, ou None se esta foi a última."""
+    if len(rows) < limit:
+        return None
+    ultima = rows[-1]
+    return codificar_cursor([ultima.get(coluna) for coluna, _ in ordem])
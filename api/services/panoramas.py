@@ -0,0 +1,183 @@
+from typing import List, Optional, Dict, Any, Callable, Awaitable, Tuple
+from datetime import date, timedelta
+import asyncio
+import os
+
+from api.database import get_db, execute
+from api.services import cache, transacoes
+from api.services.sprints import SprintService
+
+
+# Resumos dos dados da empresa que entram no prompt dos agentes do chat.
+# Ficam no cache de leitura e só são recalculados quando a tabela de origem
+# muda (cache.invalidar nas escritas), então uma mensagem não custa consultas.
+CHAT_PANORAMAS = os.getenv("CHAT_PANORAMAS", "true").lower() in ("1", "true", "yes")
+# Itens listados por resumo e janela de vencimento dos contratos (dias)
+CHAT_PANORAMA_ITENS = int(os.getenv("CHAT_PANORAMA_ITENS", "5"))
+CHAT_PANORAMA_DIAS = int(os.getenv("CHAT_PANORAMA_DIAS", "30"))
+
+PRIORIDADES = ["urgente", "alta", "media", "baixa"]
+MESES = ["jan", "fev", "mar", "abr", "mai", "jun", "jul", "ago", "set", "out", "nov", "dez"]
+
+contadores = {"montados": 0, "erros": 0}
+
+
+def _reais(valor: Optional[float]) -> str:
+    texto = f"{valor or 0:,.2f}"
+    return "R$ " + texto.replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+async def tarefas_abertas(empresa_id: int = 1) -> Dict[str, Any]:
+    """
+    Tarefas abertas por prioridade, atrasadas e as de prazo mais próximo
+    (RPC panorama_tarefas). As contagens vêm do rollup mantido pelos
+    triggers (migration 013); a invalidação do cache só refaz a leitura dele.
+    """
+    hoje = date.today()
+
+    async def carregar():
+        db = get_db()
+        result = await execute(db.rpc("panorama_tarefas", {
+            "empresa_id_int": empresa_id,
+            "hoje": hoje.isoformat(),
+            "limite_itens": CHAT_PANORAMA_ITENS
+        }))
+        por_prioridade = {row["prioridade"]: row for row in result.data or []}
+        ordem = PRIORIDADES + sorted(p for p in por_prioridade if p not in PRIORIDADES)
+        tarefas = [
+            {**tarefa, "prioridade": prioridade}
+            for prioridade in ordem if prioridade in por_prioridade
+            for tarefa in por_prioridade[prioridade]["tarefas"]
+        ]
+        # Atrasadas primeiro, depois pela prioridade (a lista já vem em ordem de prioridade)
+        tarefas.sort(key=lambda t: not (t.get("prazo") and t["prazo"] < hoje.isoformat()))
+        return {
+            "total": sum(row["total"] for row in por_prioridade.values()),
+            "atrasadas": sum(row["atrasadas"] for row in por_prioridade.values()),
+            "por_prioridade": {p: por_prioridade[p]["total"] for p in ordem if p in por_prioridade},
+            "tarefas": tarefas[:CHAT_PANORAMA_ITENS],
+        }
+
+    return await cache.lembrar("tarefas", empresa_id, {"panorama": "abertas", "hoje": hoje.isoformat()}, carregar)
+
+
+async def contratos_vencendo(empresa_id: int = 1) -> Dict[str, Any]:
+    """Contratos ativos vencidos ou que vencem em CHAT_PANORAMA_DIAS."""
+    hoje = date.today()
+
+    async def carregar():
+        db = get_db()
+        limite = hoje + timedelta(days=CHAT_PANORAMA_DIAS)
+        result = await execute(
+            db.table("contratos").select("id,titulo,contraparte_nome,data_fim,valor,valor_mensal")
+            .eq("empresa_id", empresa_id)
+            .eq("status", "ativo")
+            .lte("data_fim", limite.isoformat())
+            .order("data_fim")
+        )
+        contratos = result.data or []
+        return {
+            "total": len(contratos),
+            "vencidos": sum(1 for c in contratos if c["data_fim"] < hoje.isoformat()),
+            "valor_mensal": sum(c.get("valor_mensal") or 0 for c in contratos),
+            "contratos": contratos[:CHAT_PANORAMA_ITENS],
+        }
+
+    return await cache.lembrar("contratos", empresa_id, {"panorama": "vencendo", "hoje": hoje.isoformat()}, carregar)
+
+
+async def caixa_mes(empresa_id: int = 1) -> Dict[str, Any]:
+    """Receitas, despesas e saldo do mês corrente (rollups, já em cache como "resumos")."""
+    hoje = date.today()
+    return await transacoes.resumo_mensal(hoje.year, hoje.month, empresa_id)
+
+
+async def sprint_ativa(empresa_id: int = 1) -> Dict[str, Any]:
+    async def carregar():
+        # Embrulhada: "sem sprint ativa" também fica no cache
+        return {"sprint": await SprintService.get_active(empresa_id)}
+
+    return await cache.lembrar("sprints", empresa_id, {"panorama": "ativa"}, carregar)
+
+
+def _texto_tarefas(dados: Dict[str, Any]) -> str:
+    hoje = date.today().isoformat()
+    if not dados["total"]:
+        return "Tarefas abertas: nenhuma"
+    prioridades = ", ".join(f"{p} {n}" for p, n in dados["por_prioridade"].items())
+    linhas = [f"Tarefas abertas: {dados['total']} ({prioridades}); {dados['atrasadas']} atrasadas"]
+    for t in dados["tarefas"]:
+        prazo = ""
+        if t.get("prazo"):
+            prazo = f", prazo {t['prazo']}" + (" (atrasada)" if t["prazo"] < hoje else "")
+        linhas.append(f"- #{t['id']} [{t['prioridade']}] {t['titulo']} ({t['coluna']}{prazo})")
+    return "\n".join(linhas)
+
+
+def _texto_contratos(dados: Dict[str, Any]) -> str:
+    if not dados["total"]:
+        return f"Contratos ativos vencendo em {CHAT_PANORAMA_DIAS} dias: nenhum"
+    linhas = [
+        f"Contratos ativos vencendo em {CHAT_PANORAMA_DIAS} dias: {dados['total']} "
+        f"({dados['vencidos']} já vencidos; {_reais(dados['valor_mensal'])}/mês)"
+    ]
+    for c in dados["contratos"]:
+        contraparte = f" ({c['contraparte_nome']})" if c.get("contraparte_nome") else ""
+        valor = f", {_reais(c['valor_mensal'])}/mês" if c.get("valor_mensal") else ""
+        linhas.append(f"- #{c['id']} {c['titulo']}{contraparte}: vence {c['data_fim']}{valor}")
+    return "\n".join(linhas)
+
+
+def _texto_caixa(dados: Dict[str, Any]) -> str:
+    return (
+        f"Caixa de {MESES[dados['mes'] - 1]}/{dados['ano']}: receitas {_reais(dados['receitas'])}, "
+        f"despesas {_reais(dados['despesas'])}, saldo {_reais(dados['saldo'])}"
+    )
+
+
+def _texto_sprint(dados: Dict[str, Any]) -> str:
+    sprint = dados["sprint"]
+    if not sprint:
+        return "Sprint ativa: nenhuma"
+    pontos = ""
+    if sprint.get("meta_pontos"):
+        pontos = f", {sprint.get('pontos_concluidos') or 0}/{sprint['meta_pontos']} pontos"
+    return f"Sprint ativa: {sprint['nome']} ({sprint['data_inicio']} a {sprint['data_fim']}){pontos}"
+
+
+PANORAMAS: Dict[str, Tuple[Callable[[int], Awaitable[Dict[str, Any]]], Callable[[Dict[str, Any]], str]]] = {
+    "tarefas": (tarefas_abertas, _texto_tarefas),
+    "contratos": (contratos_vencendo, _texto_contratos),
+    "caixa": (caixa_mes, _texto_caixa),
+    "sprint": (sprint_ativa, _texto_sprint),
+}
+
+
+async def montar(nomes: List[str], empresa_id: int = 1) -> Optional[str]:
+    """
+    Texto dos resumos pedidos para o prompt; None se não houver nenhum. Um
+    resumo que falhar fica de fora (o chat não depende dele).
+    """
+    if not (CHAT_PANORAMAS and nomes):
+        return None
+    resultados = await asyncio.gather(*(PANORAMAS[nome][0](empresa_id) for nome in nomes), return_exceptions=True)
+    partes = []
+    for nome, dados in zip(nomes, resultados):
+        if isinstance(dados, Exception):
+            contadores["erros"] += 1
+            print(f"[ERROR] Erro ao montar resumo de {nome}: {dados}")
+            continue
+        partes.append(PANORAMAS[nome][1](dados))
+    if not partes:
+        return None
+    contadores["montados"] += 1
+    return f"Dados atuais da empresa ({date.today().isoformat()}):\n" + "\n".join(partes)
+
+
+def status() -> Dict[str, Any]:
+    return {
+        **contadores,
+        "habilitado": CHAT_PANORAMAS,
+        "itens": CHAT_PANORAMA_ITENS,
+        "dias": CHAT_PANORAMA_DIAS,
+    }
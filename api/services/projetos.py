@@ -1,35 +1,47 @@
 from supabase import Client
 from api.schemas.projeto import ProjetoCreate, ProjetoUpdate, ProjetoResponse
 from typing import List, Optional
-from api.database import get_db
+from api.database import get_db, execute
+from api.services import paginacao, cache
+
+
+ORDEM = [("created_at", True), ("id", True)]
 
 
 async def listar_projetos(
     empresa_id: int,
     status: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None
 ) -> List[dict]:
-    db = get_db()
-    query = db.table("projetos").select("*").eq("empresa_id", empresa_id)
-    
-    if status:
-        query = query.eq("status", status)
+    async def carregar():
+        db = get_db()
+        query = db.table("projetos").select("*").eq("empresa_id", empresa_id)
+        
+        if status:
+            query = query.eq("status", status)
+        
+        result = await execute(paginacao.paginar(query, ORDEM, cursor, skip, limit))
+        return result.data or []
     
-    result = query.order("created_at", desc=True).range(skip, skip + limit - 1).execute()
-    return result.data or []
+    return await cache.lembrar("projetos", empresa_id, {"status": status, "skip": skip, "limit": limit, "cursor": cursor}, carregar)
 
 
 async def buscar_projeto(projeto_id: int, empresa_id: int) -> Optional[dict]:
-    db = get_db()
-    result = db.table("projetos").select("*").eq("id", projeto_id).eq("empresa_id", empresa_id).execute()
-    return result.data[0] if result.data else None
+    async def carregar():
+        db = get_db()
+        result = await execute(db.table("projetos").select("*").eq("id", projeto_id).eq("empresa_id", empresa_id))
+        return result.data[0] if result.data else None
+    
+    return await cache.lembrar("projetos", empresa_id, {"id": projeto_id}, carregar)
 
 
 async def criar_projeto(projeto: ProjetoCreate) -> dict:
     db = get_db()
     data = projeto.model_dump()
-    result = db.table("projetos").insert(data).execute()
+    result = await execute(db.table("projetos").insert(data))
+    await cache.invalidar("projetos", data.get("empresa_id"))
     return result.data[0]
 
 
@@ -40,11 +52,13 @@ async def atualizar_projeto(projeto_id: int, empresa_id: int, projeto: ProjetoUp
     if not data:
         return await buscar_projeto(projeto_id, empresa_id)
     
-    result = db.table("projetos").update(data).eq("id", projeto_id).eq("empresa_id", empresa_id).execute()
+    result = await execute(db.table("projetos").update(data).eq("id", projeto_id).eq("empresa_id", empresa_id))
+    await cache.invalidar("projetos", empresa_id)
     return result.data[0] if result.data else None
 
 
 async def deletar_projeto(projeto_id: int, empresa_id: int) -> bool:
     db = get_db()
-    result = db.table("projetos").delete().eq("id", projeto_id).eq("empresa_id", empresa_id).execute()
+    result = await execute(db.table("projetos").delete().eq("id", projeto_id).eq("empresa_id", empresa_id))
+    await cache.invalidar("projetos", empresa_id)
     return len(result.data) > 0 if result.data else False
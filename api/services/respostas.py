@@ -0,0 +1,220 @@
+from typing import List, Optional, Dict, Any, Callable, Awaitable, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
+import json
+import math
+import os
+import re
+import time
+import unicodedata
+
+from api.services import cache, embeddings
+
+
+# Cache de respostas do chat: TTL em segundos (0 desliga), tamanho máximo e
+# agentes cujas perguntas se repetem o bastante para valer a pena
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "600"))
+CHAT_CACHE_MAX_ITENS = int(os.getenv("CHAT_CACHE_MAX_ITENS", "500"))
+CHAT_CACHE_AGENTES = {a.strip() for a in os.getenv("CHAT_CACHE_AGENTES", "ops,financeiro").split(",") if a.strip()}
+# Também aceitar perguntas parecidas (similaridade de cosseno dos embeddings)
+CHAT_CACHE_SEMANTICO = os.getenv("CHAT_CACHE_SEMANTICO", "false").lower() in ("1", "true", "yes")
+CHAT_CACHE_SIMILARIDADE = float(os.getenv("CHAT_CACHE_SIMILARIDADE", "0.92"))
+
+# Entidade do cache invalidada pelas escritas de cada tabela (cache.invalidar)
+ENTIDADES_CACHE = {"transacoes": "resumos"}
+
+_respostas = cache.ReadCache(CHAT_CACHE_MAX_ITENS)
+_voos: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+# chave -> (escopo, vetor da pergunta) das entradas elegíveis à busca semântica
+_vetores: "OrderedDict[str, Tuple[str, List[float]]]" = OrderedDict()
+contadores = {"hits": 0, "semantic_hits": 0, "coalesced": 0, "misses": 0, "stores": 0, "economia_ms": 0.0}
+
+
+def habilitado(agente: str) -> bool:
+    return CHAT_CACHE_TTL > 0 and agente in CHAT_CACHE_AGENTES
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sem acentos, espaços colapsados e sem pontuação nas pontas."""
+    texto = unicodedata.normalize("NFKD", (texto or "").lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", texto).strip(" ?!.;,")
+
+
+def versao(tabelas: List[str]) -> str:
+    """
+    Versão dos dados de que o agente depende: as gerações do cache local
+    das entidades, que cache.invalidar incrementa a cada escrita (neste
+    worker ou, pelo canal de invalidação, em outro). Sem consulta ao banco.
+    """
+    if not tabelas:
+        return ""
+    return json.dumps([[t, cache.cache.geracoes.get(ENTIDADES_CACHE.get(t, t), 0)] for t in tabelas])
+
+
+def _hash(*partes: Any) -> str:
+    return hashlib.sha256(json.dumps(partes, ensure_ascii=False, default=str).encode()).hexdigest()
+
+
+def _pergunta_unica(messages: List[Dict[str, str]]) -> Optional[str]:
+    """A pergunta, se o prompt for só system + uma mensagem do usuário (sem histórico)."""
+    conversa = [m for m in messages if m["role"] != "system"]
+    if len(conversa) == 1 and conversa[0]["role"] == "user":
+        return normalizar(conversa[0]["content"])
+    return None
+
+
+def _cosseno(a: List[float], b: List[float]) -> float:
+    # Nem todo provedor devolve vetores normalizados
+    normas = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    if not normas:
+        return 0.0
+    return sum(x * y for x, y in zip(a, b)) / normas
+
+
+class Consulta:
+    """
+    Uma busca no cache de respostas. Com entrada, é um hit; com voo, outra
+    requisição idêntica já está chamando o provedor e basta aguardar; senão
+    esta é a líder e precisa chamar gravar() ou falhar() ao terminar.
+    """
+
+    def __init__(self, agente: str, empresa_id: int, messages: List[Dict[str, str]], versao_dados: str):
+        self.pergunta = _pergunta_unica(messages)
+        self.escopo = _hash(agente, empresa_id, versao_dados, [m["content"] for m in messages if m["role"] == "system"])
+        self.chave = _hash(self.escopo, [(m["role"], normalizar(m["content"])) for m in messages])
+        self.entrada: Optional[Dict[str, Any]] = None
+        self.voo: Optional["asyncio.Future[Dict[str, Any]]"] = None
+        self.lider = False
+
+    def _item(self, chave: str) -> Tuple[str, Optional[int], str]:
+        return ("respostas", None, chave)
+
+    async def _semantico(self) -> Optional[Dict[str, Any]]:
+        if not (CHAT_CACHE_SEMANTICO and self.pergunta and _vetores):
+            return None
+        vetor = await embeddings.gerar_embedding(self.pergunta)
+        if not vetor:
+            return None
+        melhor, similaridade = None, CHAT_CACHE_SIMILARIDADE
+        for chave, (escopo, outro) in _vetores.items():
+            if escopo == self.escopo:
+                valor = _cosseno(vetor, outro)
+                if valor >= similaridade:
+                    melhor, similaridade = chave, valor
+        if melhor is None:
+            return None
+        encontrado, entrada = _respostas.get(self._item(melhor))
+        return entrada if encontrado else None
+
+    async def iniciar(self) -> "Consulta":
+        encontrado, entrada = _respostas.get(self._item(self.chave))
+        if encontrado:
+            contadores["hits"] += 1
+        else:
+            entrada = await self._semantico()
+            if entrada is not None:
+                contadores["semantic_hits"] += 1
+        if entrada is not None:
+            contadores["economia_ms"] += entrada.get("tempo_ms") or 0
+            self.entrada = entrada
+            return self
+
+        voo = _voos.get(self.chave)
+        if voo is not None:
+            contadores["coalesced"] += 1
+            self.voo = voo
+            return self
+
+        contadores["misses"] += 1
+        self.lider = True
+        _voos[self.chave] = asyncio.get_running_loop().create_future()
+        return self
+
+    async def aguardar(self) -> Optional[Dict[str, Any]]:
+        """Resultado da líder; None se ela foi cancelada (cliente desconectou)."""
+        entrada = await asyncio.shield(self.voo)
+        if entrada is not None:
+            contadores["economia_ms"] += entrada.get("tempo_ms") or 0
+        return entrada
+
+    async def gravar(self, resposta: str, modelo: Optional[str], tempo_ms: Optional[float]) -> Dict[str, Any]:
+        entrada = {"resposta": resposta, "modelo": modelo, "tempo_ms": round(tempo_ms or 0, 1)}
+        _respostas.set(self._item(self.chave), entrada, CHAT_CACHE_TTL)
+        contadores["stores"] += 1
+        voo = _voos.pop(self.chave, None)
+        if voo is not None and not voo.done():
+            voo.set_result(entrada)
+
+        if CHAT_CACHE_SEMANTICO and self.pergunta:
+            vetor = await embeddings.gerar_embedding(self.pergunta)
+            if vetor:
+                _vetores[self.chave] = (self.escopo, vetor)
+                while len(_vetores) > CHAT_CACHE_MAX_ITENS:
+                    _vetores.popitem(last=False)
+        return entrada
+
+    def falhar(self, erro: BaseException):
+        voo = _voos.pop(self.chave, None)
+        if voo is None or voo.done():
+            return
+        if isinstance(erro, asyncio.CancelledError):
+            # Quem esperava chama o provedor por conta própria
+            voo.set_result(None)
+        else:
+            voo.set_exception(erro)
+            # Marca a exceção como lida quando ninguém mais estiver esperando
+            voo.exception()
+
+
+async def lembrar(
+    agente: str,
+    empresa_id: int,
+    messages: List[Dict[str, str]],
+    versao_dados: str,
+    gerar: Callable[[], Awaitable[Tuple[str, Optional[str]]]]
+) -> Tuple[Dict[str, Any], str]:
+    """
+    Resposta do cache, de uma chamada idêntica em andamento ou de gerar()
+    (que devolve resposta e modelo). Retorna a entrada e a origem: "cache",
+    "coalescida" ou "provedor".
+    """
+    consulta = await Consulta(agente, empresa_id, messages, versao_dados).iniciar()
+    if consulta.entrada is not None:
+        return consulta.entrada, "cache"
+    if consulta.voo is not None:
+        entrada = await consulta.aguardar()
+        if entrada is not None:
+            return entrada, "coalescida"
+        resposta, modelo = await gerar()
+        return {"resposta": resposta, "modelo": modelo, "tempo_ms": None}, "provedor"
+
+    inicio = time.perf_counter()
+    try:
+        resposta, modelo = await gerar()
+    except BaseException as e:
+        consulta.falhar(e)
+        raise
+    entrada = await consulta.gravar(resposta, modelo, (time.perf_counter() - inicio) * 1000)
+    return entrada, "provedor"
+
+
+def limpar():
+    _respostas.limpar()
+    _vetores.clear()
+
+
+def status() -> Dict[str, Any]:
+    consultas = contadores["hits"] + contadores["semantic_hits"] + contadores["coalesced"] + contadores["misses"]
+    economizadas = consultas - contadores["misses"]
+    return {
+        **contadores,
+        "economia_ms": round(contadores["economia_ms"], 1),
+        "hit_ratio": round(economizadas / consultas, 4) if consultas else None,
+        "itens": _respostas.status()["itens"],
+        "max_itens": CHAT_CACHE_MAX_ITENS,
+        "ttl": CHAT_CACHE_TTL,
+        "agentes": sorted(CHAT_CACHE_AGENTES),
+        "semantico": CHAT_CACHE_SEMANTICO,
+    }
@@ -0,0 +1,331 @@
+from typing import List, Optional, Dict, Any, AsyncIterator, Callable, Awaitable, Tuple, TypeVar
+from collections import deque
+import asyncio
+import json
+import math
+import os
+import time
+
+import httpx
+
+from api.services import llm, admissao, metricas
+
+
+LLM_MODEL_CONFIG = os.getenv(
+    "LLM_MODEL_CONFIG",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "config", "model-config.json")
+)
+# Modelos tentados por mensagem (o preferido + failover pela fallbackChain)
+LLM_ROUTER_TENTATIVAS = int(os.getenv("LLM_ROUTER_TENTATIVAS", "3"))
+# Janela de amostras por modelo para latência e taxa de erro
+LLM_ROUTER_JANELA = int(os.getenv("LLM_ROUTER_JANELA", "100"))
+# Modelo com taxa de erro acima disso (com amostras suficientes) vai para o fim da fila
+LLM_ROUTER_ERRO_MAX = float(os.getenv("LLM_ROUTER_ERRO_MAX", "0.5"))
+LLM_ROUTER_AMOSTRAS_MIN = int(os.getenv("LLM_ROUTER_AMOSTRAS_MIN", "5"))
+# Pausa de um modelo depois de um 429 (rate limit), em segundos
+LLM_ROUTER_COOLDOWN_S = float(os.getenv("LLM_ROUTER_COOLDOWN_S", "30"))
+# Requisição de reserva (hedge) no próximo modelo se o primeiro não responder
+# até o p95 dele (ou LLM_HEDGE_DELAY_MS, sem amostras suficientes)
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_DELAY_MS = float(os.getenv("LLM_HEDGE_DELAY_MS", "3000"))
+LLM_HEDGE_MIN_MS = float(os.getenv("LLM_HEDGE_MIN_MS", "500"))
+
+T = TypeVar("T")
+
+
+def nome_api(modelo: str) -> str:
+    """O config usa o prefixo "openrouter/" do OpenClaw; a API do OpenRouter não."""
+    if modelo.startswith("openrouter/") and modelo != "openrouter/auto":
+        return modelo[len("openrouter/"):]
+    return modelo
+
+
+class ModelStats:
+    """Amostras recentes de um modelo: latência por modo (stream/completo) e erros."""
+
+    def __init__(self, janela: int = LLM_ROUTER_JANELA):
+        self.latencias = {"stream": deque(maxlen=janela), "completo": deque(maxlen=janela)}
+        self.resultados: "deque[bool]" = deque(maxlen=janela)
+        self.pausado_ate = 0.0
+        self.contadores = {"requests": 0, "erros": 0, "rate_limits": 0, "timeouts": 0, "hedges": 0, "hedges_vencidos": 0}
+
+    def sucesso(self, modo: str, latencia: float):
+        self.contadores["requests"] += 1
+        self.latencias[modo].append(latencia)
+        self.resultados.append(True)
+
+    def falha(self, erro: BaseException):
+        self.contadores["requests"] += 1
+        self.contadores["erros"] += 1
+        self.resultados.append(False)
+        if isinstance(erro, httpx.TimeoutException):
+            self.contadores["timeouts"] += 1
+        if isinstance(erro, llm.LLMError) and erro.upstream == 429:
+            self.contadores["rate_limits"] += 1
+            self.pausado_ate = time.monotonic() + LLM_ROUTER_COOLDOWN_S
+
+    def taxa_erro(self) -> Optional[float]:
+        if len(self.resultados) < LLM_ROUTER_AMOSTRAS_MIN:
+            return None
+        return self.resultados.count(False) / len(self.resultados)
+
+    def p95(self, modo: str) -> Optional[float]:
+        amostras = self.latencias[modo]
+        if len(amostras) < LLM_ROUTER_AMOSTRAS_MIN:
+            return None
+        ordenadas = sorted(amostras)
+        return ordenadas[max(0, math.ceil(0.95 * len(ordenadas)) - 1)]
+
+    def disponivel(self) -> bool:
+        return time.monotonic() >= self.pausado_ate
+
+    def saudavel(self) -> bool:
+        taxa = self.taxa_erro()
+        return self.disponivel() and (taxa is None or taxa <= LLM_ROUTER_ERRO_MAX)
+
+    def snapshot(self) -> Dict[str, Any]:
+        taxa = self.taxa_erro()
+        return {
+            **self.contadores,
+            "taxa_erro": round(taxa, 4) if taxa is not None else None,
+            "p95_ms": {
+                modo: round(p * 1000, 1) if (p := self.p95(modo)) is not None else None
+                for modo in self.latencias
+            },
+            "pausado_s": max(0.0, round(self.pausado_ate - time.monotonic(), 1)),
+        }
+
+
+class ModelRouter:
+    """
+    Escolhe os modelos de cada mensagem a partir do model-config.json: o
+    modelo da rota da categoria primeiro e o resto da fallbackChain na
+    ordem. Modelos pausados por rate limit ou com muitos erros vão para o
+    fim. Sem config, usa só LLM_MODEL.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = (config or {}).get("models", {})
+        self.cadeia = [item["model"] for item in config.get("fallbackChain", []) if item.get("model")]
+        self.usos = {item["useFor"]: item["model"] for item in config.get("fallbackChain", []) if item.get("model") and item.get("useFor")}
+        self.padrao = config.get("default") or (self.cadeia[0] if self.cadeia else llm.LLM_MODEL)
+        if self.padrao not in self.cadeia:
+            self.cadeia.insert(0, self.padrao)
+        self.rotas = {categoria: self._resolver(categoria, alias) for categoria, alias in config.get("routing", {}).items()}
+        self.stats: Dict[str, ModelStats] = {}
+
+    def _resolver(self, categoria: str, alias: str) -> str:
+        """
+        Modelo da cadeia para uma categoria da tabela routing: o de mesmo
+        useFor ou, senão, o primeiro cujo nome contém o alias ("haiku").
+        """
+        if categoria in self.usos:
+            return self.usos[categoria]
+        for modelo in self.cadeia:
+            if alias in modelo:
+                return modelo
+        return self.padrao
+
+    def _stats(self, modelo: str) -> ModelStats:
+        if modelo not in self.stats:
+            self.stats[modelo] = ModelStats()
+        return self.stats[modelo]
+
+    def ordem(self, categoria: Optional[str] = None) -> List[str]:
+        preferido = self.rotas.get(categoria) or self.usos.get(categoria) or self.padrao
+        candidatos = [preferido] + [m for m in self.cadeia if m != preferido]
+        # sorted é estável: entre os saudáveis vale a ordem da cadeia
+        return sorted(candidatos, key=lambda m: (not self._stats(m).disponivel(), not self._stats(m).saudavel()))
+
+    def _atraso_hedge(self, modelo: str, modo: str) -> float:
+        p95 = self._stats(modelo).p95(modo)
+        if p95 is None:
+            return LLM_HEDGE_DELAY_MS / 1000
+        return max(LLM_HEDGE_MIN_MS / 1000, p95)
+
+    async def _corrida(
+        self,
+        modelos: List[str],
+        modo: str,
+        iniciar: Callable[[str], Awaitable[T]],
+        descartar: Optional[Callable[[T], Awaitable[None]]] = None,
+        agente: Optional[str] = None
+    ) -> Tuple[str, T]:
+        """
+        Tenta os modelos em ordem até um responder. Erros retentáveis passam
+        para o próximo; com LLM_HEDGE, se o atual não responder até o p95 dele,
+        o próximo começa em paralelo e vale o que responder primeiro.
+
+        O chamador já segura uma vaga do agente (admissao.vaga); o hedge é
+        uma chamada a mais ao mesmo tempo e só sai com uma segunda vaga livre
+        na hora (admissao.controle.tentar), devolvida quando a corrida acaba.
+        """
+        fila = modelos[:max(1, LLM_ROUTER_TENTATIVAS)]
+        pendentes: Dict["asyncio.Task[T]", Tuple[str, float]] = {}
+        ultimo_erro: Optional[BaseException] = None
+        hedge = False
+        sem_vaga = False
+        extras: List[admissao.Pedido] = []
+
+        def lancar():
+            modelo = fila.pop(0)
+            pendentes[asyncio.create_task(iniciar(modelo))] = (modelo, time.perf_counter())
+
+        lancar()
+        try:
+            while pendentes:
+                timeout = None
+                if LLM_HEDGE and fila and len(pendentes) == 1 and not sem_vaga:
+                    modelo, inicio = next(iter(pendentes.values()))
+                    timeout = max(0.0, self._atraso_hedge(modelo, modo) - (time.perf_counter() - inicio))
+
+                concluidas, _ = await asyncio.wait(pendentes, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not concluidas:
+                    if agente is not None:
+                        extra = admissao.controle.tentar(agente)
+                        if extra is None:
+                            # Sem vaga livre: segue esperando só a chamada atual
+                            sem_vaga = True
+                            continue
+                        extras.append(extra)
+                    self._stats(fila[0]).contadores["hedges"] += 1
+                    hedge = True
+                    lancar()
+                    continue
+
+                for tarefa in concluidas:
+                    modelo, inicio = pendentes.pop(tarefa)
+                    erro = tarefa.exception()
+                    if erro is None:
+                        self._stats(modelo).sucesso(modo, time.perf_counter() - inicio)
+                        metricas.llm_tentativas.observar(time.perf_counter() - inicio, nome_api(modelo), modo, "ok")
+                        if hedge and modelo != modelos[0]:
+                            self._stats(modelo).contadores["hedges_vencidos"] += 1
+                        # Outra tarefa terminou junto e perdeu: libera o que ela abriu
+                        for outra in concluidas - {tarefa}:
+                            if outra in pendentes and outra.exception() is None and descartar:
+                                pendentes.pop(outra)
+                                await descartar(outra.result())
+                        return modelo, tarefa.result()
+
+                    ultimo_erro = erro
+                    if isinstance(erro, admissao.AdmissaoRecusada):
+                        # Sem cota do provedor: não é culpa do modelo e nem adianta tentar outro
+                        fila.clear()
+                        continue
+                    self._stats(modelo).falha(erro)
+                    metricas.llm_tentativas.observar(time.perf_counter() - inicio, nome_api(modelo), modo, "erro")
+                    print(f"[ERROR] Modelo {modelo} falhou: {erro}")
+                    if isinstance(erro, llm.LLMError) and not erro.retentavel:
+                        raise erro
+                    if not isinstance(erro, (llm.LLMError, httpx.TransportError)):
+                        raise erro
+
+                if not pendentes and fila:
+                    lancar()
+            raise ultimo_erro
+        finally:
+            for tarefa in pendentes:
+                tarefa.cancel()
+            if pendentes:
+                await asyncio.gather(*pendentes, return_exceptions=True)
+            for extra in extras:
+                admissao.controle.sair(extra)
+
+    async def completar(
+        self,
+        messages: List[Dict[str, str]],
+        categoria: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        agente: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """O modelo que respondeu e a resposta completa. `agente`: o da vaga que o chamador segura (hedge)."""
+        async def iniciar(modelo: str) -> str:
+            await admissao.cota.retirar()
+            return await llm.completar(messages, nome_api(modelo), max_tokens)
+
+        return await self._corrida(self.ordem(categoria), "completo", iniciar, agente=agente)
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        categoria: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        tempos: Optional[Dict[str, Any]] = None,
+        agente: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Deltas do primeiro modelo que começar a responder. O failover e o
+        hedge valem até o primeiro delta; depois dele o stream segue com esse
+        modelo (um erro no meio não é repetido em outro).
+        """
+        async def iniciar(modelo: str):
+            await admissao.cota.retirar()
+            parcial: Dict[str, Any] = {}
+            gerador = llm.stream(messages, nome_api(modelo), max_tokens, tempos=parcial)
+            try:
+                primeiro = await gerador.__anext__()
+            except StopAsyncIteration:
+                primeiro = None
+            except BaseException:
+                await gerador.aclose()
+                raise
+            return gerador, primeiro, parcial
+
+        async def descartar(resultado):
+            await resultado[0].aclose()
+
+        inicio = time.perf_counter()
+        modelo, (gerador, primeiro, parcial) = await self._corrida(self.ordem(categoria), "stream", iniciar, descartar, agente)
+        # Do ponto de vista do cliente, incluindo tentativas que falharam
+        ttft_ms = round((time.perf_counter() - inicio) * 1000, 1)
+        try:
+            if primeiro is not None:
+                yield primeiro
+            async for delta in gerador:
+                yield delta
+        finally:
+            await gerador.aclose()
+            if tempos is not None:
+                tempos.update(parcial)
+                tempos["modelo"] = parcial.get("modelo") or nome_api(modelo)
+                tempos["ttft_ms"] = ttft_ms
+                tempos["total_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "config": LLM_MODEL_CONFIG,
+            "padrao": self.padrao,
+            "cadeia": self.cadeia,
+            "rotas": self.rotas,
+            "hedge": LLM_HEDGE,
+            "modelos": {modelo: stats.snapshot() for modelo, stats in self.stats.items()},
+        }
+
+
+def carregar(caminho: str = LLM_MODEL_CONFIG) -> ModelRouter:
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            return ModelRouter(json.load(arquivo))
+    except FileNotFoundError:
+        return ModelRouter()
+    except (ValueError, KeyError) as e:
+        print(f"[ERROR] model-config inválido ({caminho}): {e}; usando {llm.LLM_MODEL}")
+        return ModelRouter()
+
+
+_router: Optional[ModelRouter] = None
+
+
+def get_router() -> ModelRouter:
+    global _router
+
+    if _router is None:
+        _router = carregar()
+    return _router
+
+
+def set_router(router: Optional[ModelRouter]) -> None:
+    """Troca o roteador (ex.: config de teste)."""
+    global _router
+    _router = router
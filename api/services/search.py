@@ -1,8 +1,14 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import os
+import time
 
-from api.services import tarefas, contratos
+from api.database import get_db, execute
+from api.services import embeddings
 
 
+# Aplicados em SQL por buscar_tarefas_texto/buscar_tarefas_vetorial (api/migrations/002 e 003)
+# e em Python na fusão do modo híbrido
 PRIORITY_BOOST = {
     "urgente": 0.20,
     "alta": 0.15,
@@ -10,112 +16,359 @@ PRIORITY_BOOST = {
     "baixa": 0.05
 }
 
+# Mesmos pesos das funções SQL: 60% relevância, 20% projeto, 20% prioridade
+PESO_RELEVANCIA = 0.60
+PESO_PROJETO = 0.20
+PESO_PRIORIDADE = 0.20
+PROJETO_BOOST = 0.20
+
+# Reciprocal-rank fusion: score = soma de 1 / (RRF_K + posição) em cada lista
+RRF_K = 60
+
+SEARCH_LATENCY_BUDGET_MS = float(os.getenv("SEARCH_LATENCY_BUDGET_MS", "800"))
+SEARCH_CANDIDATOS_MIN = int(os.getenv("SEARCH_CANDIDATOS_MIN", "30"))
+# Similaridade de cosseno mínima para um vizinho virar candidato no modo híbrido
+SEARCH_VETORIAL_MINIMO = float(os.getenv("SEARCH_VETORIAL_MINIMO", "0.1"))
+
+MODOS = ("texto", "vetorial", "hibrido")
+
+_avisado_sem_provedor = False
+
+
+def _modo_efetivo(modo: str) -> str:
+    """Sem provedor de embeddings, vetorial e híbrido viram busca textual."""
+    global _avisado_sem_provedor
+
+    if modo == "texto" or embeddings.disponivel():
+        return modo
+    if not _avisado_sem_provedor:
+        print(f"[WARN] Busca {modo} sem provedor de embeddings (EMBEDDING_API_KEY): usando modo texto")
+        _avisado_sem_provedor = True
+    return "texto"
+
+
+async def _params_consulta(
+    query: str,
+    modo: str,
+    query_embedding: Optional[List[float]]
+) -> Tuple[str, Dict[str, Any]]:
+    """Parâmetros da RPC de busca; sem embedding da consulta cai para a busca textual."""
+    if modo == "vetorial" and query_embedding is None:
+        query_embedding = await embeddings.gerar_embedding(query)
+
+    if modo == "vetorial" and query_embedding is not None:
+        return "vetorial", {"query_embedding": query_embedding}
+    return "texto", {"query_text": query}
+
+
+async def _cronometrar(nome: str, coro, tempos: Dict[str, float]):
+    inicio = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        tempos[nome] = round((time.perf_counter() - inicio) * 1000, 1)
+
 
 async def buscar(
     query: str,
     tipo: str = "all",
     limite: int = 10,
-    threshold: float = 0.7,
+    threshold: Optional[float] = None,
     projeto: Optional[str] = None,
-    coluna: Optional[str] = None
+    coluna: Optional[str] = None,
+    empresa_id: int = 1,
+    modo: str = "hibrido",
+    orcamento_ms: Optional[float] = None
 ) -> Dict[str, Any]:
-    results = []
-    
-    if tipo in ("all", "tarefas"):
-        tarefas_results = await buscar_tarefas(query, limite, threshold, projeto, coluna)
-        results.extend(tarefas_results)
-    
-    if tipo in ("all", "contratos"):
-        contratos_results = await buscar_contratos(query, limite, threshold)
-        results.extend(contratos_results)
-    
-    results.sort(key=lambda x: x.get("similaridade", 0), reverse=True)
-    
+    inicio = time.perf_counter()
+    tipos = ("tarefas", "contratos") if tipo == "all" else (tipo,)
+    tempos: Dict[str, float] = {}
+    metadata: Dict[str, Any] = {}
+    modo = _modo_efetivo(modo)
+
+    if modo == "hibrido":
+        results, metadata = await _buscar_hibrido(
+            query, tipos, limite, threshold, projeto, coluna, empresa_id, orcamento_ms, tempos
+        )
+    else:
+        # Gerado uma vez e compartilhado entre tarefas e contratos
+        query_embedding = None
+        if modo == "vetorial":
+            query_embedding = await _cronometrar("embedding", embeddings.gerar_embedding(query), tempos)
+        if query_embedding is None:
+            modo = "texto"
+
+        results = []
+        if "tarefas" in tipos:
+            results.extend(await _cronometrar(
+                f"{modo}_tarefas",
+                buscar_tarefas(query, limite, threshold, projeto, coluna, empresa_id, modo, query_embedding),
+                tempos
+            ))
+        if "contratos" in tipos:
+            results.extend(await _cronometrar(
+                f"{modo}_contratos",
+                buscar_contratos(query, limite, threshold, empresa_id, modo, query_embedding),
+                tempos
+            ))
+        results.sort(key=lambda x: x.get("similaridade", 0), reverse=True)
+
+    tempos["total"] = round((time.perf_counter() - inicio) * 1000, 1)
+
     return {
         "success": True,
         "results": results[:limite],
         "metadata": {
             "query": query,
             "total": len(results),
-            "threshold_usado": threshold
+            "threshold_usado": threshold,
+            "modo": modo,
+            **metadata,
+            "tempos_ms": tempos
+        }
+    }
+
+
+async def _buscar_hibrido(
+    query: str,
+    tipos: Tuple[str, ...],
+    limite: int,
+    threshold: Optional[float],
+    projeto: Optional[str],
+    coluna: Optional[str],
+    empresa_id: int,
+    orcamento_ms: Optional[float],
+    tempos: Dict[str, float]
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Candidatos textuais e vetoriais de cada tipo buscados em paralelo e
+    combinados por RRF + boosts. Estágios que estouram o orçamento de latência
+    são descartados e a resposta sai com o que ficou pronto.
+
+    `threshold` vale como nos modos texto e vetorial: relevância mínima de
+    cada estágio, na escala dele, antes da fusão. O score do RRF depende só
+    das posições e não é comparável a ele.
+    """
+    db = get_db()
+    orcamento_ms = orcamento_ms or SEARCH_LATENCY_BUDGET_MS
+    candidatos = max(limite * 3, SEARCH_CANDIDATOS_MIN)
+    minimo_texto = threshold or 0
+    minimo_vetorial = max(threshold or 0, SEARCH_VETORIAL_MINIMO)
+
+    embedding_task = asyncio.ensure_future(
+        _cronometrar("embedding", embeddings.gerar_embedding(query), tempos)
+    )
+
+    async def vetorial(rpc: str, params: Dict[str, Any]):
+        query_embedding = await embedding_task
+        if query_embedding is None:
+            return []
+        return await rpc_rows(rpc, {
+            **params,
+            "query_embedding": query_embedding,
+            "relevancia_minima": minimo_vetorial
+        })
+
+    async def rpc_rows(rpc: str, params: Dict[str, Any]):
+        result = await execute(db.rpc(rpc, params))
+        return result.data or []
+
+    estagios = {}
+    if "tarefas" in tipos:
+        params = {
+            "empresa_id_int": empresa_id,
+            "limite": candidatos,
+            "coluna_filtro": coluna
         }
+        estagios["texto_tarefas"] = rpc_rows("buscar_tarefas_texto", {**params, "query_text": query, "relevancia_minima": minimo_texto})
+        estagios["vetorial_tarefas"] = vetorial("buscar_tarefas_vetorial", params)
+        estagios["projeto"] = _projeto_ids(projeto, empresa_id)
+    if "contratos" in tipos:
+        params = {"empresa_id_int": empresa_id, "limite": candidatos}
+        estagios["texto_contratos"] = rpc_rows("buscar_contratos_texto", {**params, "query_text": query, "relevancia_minima": minimo_texto})
+        estagios["vetorial_contratos"] = vetorial("buscar_contratos_vetorial", params)
+
+    tasks = {
+        nome: asyncio.ensure_future(_cronometrar(nome, coro, tempos))
+        for nome, coro in estagios.items()
+    }
+    await asyncio.wait(list(tasks.values()), timeout=orcamento_ms / 1000)
+
+    saidas: Dict[str, Any] = {}
+    expirados = []
+    for nome, task in tasks.items():
+        if not task.done():
+            task.cancel()
+            expirados.append(nome)
+        elif task.exception() is not None:
+            print(f"[ERROR] Erro no estágio {nome} da busca: {task.exception()}")
+        else:
+            saidas[nome] = task.result()
+    if not embedding_task.done():
+        embedding_task.cancel()
+
+    inicio = time.perf_counter()
+    results = []
+    if "tarefas" in tipos:
+        projeto_ids = saidas.get("projeto") or set()
+        results.extend(
+            _tarefa_resultado(row, _score_tarefa(rrf, row, projeto_ids))
+            for row, rrf in _rrf(
+                saidas.get("texto_tarefas", []), saidas.get("vetorial_tarefas", []), "relevancia"
+            )
+        )
+    if "contratos" in tipos:
+        results.extend(
+            _contrato_resultado(row, rrf * PESO_RELEVANCIA)
+            for row, rrf in _rrf(
+                saidas.get("texto_contratos", []), saidas.get("vetorial_contratos", []), "similaridade"
+            )
+        )
+
+    results.sort(key=lambda x: x["similaridade"], reverse=True)
+    tempos["fusao"] = round((time.perf_counter() - inicio) * 1000, 1)
+
+    return results, {
+        "orcamento_ms": orcamento_ms,
+        "candidatos_por_lista": candidatos,
+        "estagios_expirados": expirados
+    }
+
+
+def _rrf(
+    lexicos: List[Dict[str, Any]],
+    vetoriais: List[Dict[str, Any]],
+    campo_relevancia: str
+) -> List[Tuple[Dict[str, Any], float]]:
+    """RRF normalizado para 0..1 (1 = primeiro lugar nas duas listas)."""
+    scores: Dict[int, float] = {}
+    rows: Dict[int, Dict[str, Any]] = {}
+
+    for lista in (lexicos, vetoriais):
+        ordenada = sorted(lista, key=lambda r: r[campo_relevancia], reverse=True)
+        for posicao, row in enumerate(ordenada, start=1):
+            scores[row["id"]] = scores.get(row["id"], 0.0) + 1.0 / (RRF_K + posicao)
+            rows.setdefault(row["id"], row)
+
+    maximo = 2.0 / (RRF_K + 1)
+    return [(rows[row_id], score / maximo) for row_id, score in scores.items()]
+
+
+def _score_tarefa(rrf: float, tarefa: Dict[str, Any], projeto_ids: set) -> float:
+    score = rrf * PESO_RELEVANCIA
+    if tarefa.get("projeto_id") in projeto_ids:
+        score += PROJETO_BOOST * PESO_PROJETO
+    score += PRIORITY_BOOST.get(tarefa.get("prioridade"), 0.0) * PESO_PRIORIDADE
+    return score
+
+
+async def _projeto_ids(projeto: Optional[str], empresa_id: int) -> set:
+    """Aceita id ou nome do projeto, como as funções SQL."""
+    if not projeto:
+        return set()
+    if projeto.isdigit():
+        return {int(projeto)}
+
+    db = get_db()
+    result = await execute(
+        db.table("projetos").select("id").eq("empresa_id", empresa_id).eq("nome", projeto)
+    )
+    return {row["id"] for row in result.data or []}
+
+
+def _tarefa_resultado(tarefa: Dict[str, Any], similaridade: float) -> Dict[str, Any]:
+    return {
+        "id": tarefa["id"],
+        "tipo": "tarefa",
+        "titulo": tarefa["titulo"],
+        "descricao": tarefa.get("descricao"),
+        "coluna": tarefa.get("coluna"),
+        "prioridade": tarefa.get("prioridade"),
+        "projeto_id": tarefa.get("projeto_id"),
+        "similaridade": round(similaridade, 3)
+    }
+
+
+def _contrato_resultado(contrato: Dict[str, Any], similaridade: float) -> Dict[str, Any]:
+    return {
+        "id": contrato["id"],
+        "tipo": "contrato",
+        "titulo": contrato["titulo"],
+        "tipo_contrato": contrato.get("tipo"),
+        "contratante": contrato.get("contraparte_nome"),
+        "status": contrato.get("status"),
+        "similaridade": round(similaridade, 3)
     }
 
 
 async def buscar_tarefas(
     query: str,
     limite: int = 10,
-    threshold: float = 0.7,
+    threshold: Optional[float] = None,
     projeto: Optional[str] = None,
-    coluna: Optional[str] = None
+    coluna: Optional[str] = None,
+    empresa_id: int = 1,
+    modo: str = "hibrido",
+    query_embedding: Optional[List[float]] = None
 ) -> List[Dict[str, Any]]:
-    tarefas_list = await tarefas.listar_tarefas()
-    
-    results = []
-    for tarefa in tarefas_list:
-        text = f"{tarefa.get('titulo', '')} {tarefa.get('descricao', '')}"
-        
-        similarity = calcular_similaridade(query, text)
-        
-        boost_projeto = 0.20 if projeto and tarefa.get("projeto") == projeto else 0
-        boost_prioridade = PRIORITY_BOOST.get(tarefa.get("prioridade", ""), 0)
-        
-        similaridade_final = (similarity * 0.60) + (boost_projeto * 0.20) + (boost_prioridade * 0.20)
-        
-        if similaridade_final >= threshold:
-            if coluna and tarefa.get("coluna") != coluna:
-                continue
-            results.append({
-                "id": tarefa["id"],
-                "tipo": "tarefa",
-                "titulo": tarefa["titulo"],
-                "descricao": tarefa.get("descricao"),
-                "coluna": tarefa.get("coluna"),
-                "prioridade": tarefa.get("prioridade"),
-                "projeto": tarefa.get("projeto"),
-                "similaridade": round(similaridade_final, 3)
-            })
-    
-    return results[:limite]
+    """
+    Busca sobre todas as tarefas da empresa: textual (FTS em português + trigram),
+    vetorial (ANN por cosseno no pgvector) ou híbrida (as duas, com RRF).
+    """
+    modo = _modo_efetivo(modo)
+    if modo == "hibrido":
+        results, _ = await _buscar_hibrido(
+            query, ("tarefas",), limite, threshold, projeto, coluna, empresa_id, None, {}
+        )
+        return results[:limite]
+
+    db = get_db()
+
+    modo, params = await _params_consulta(query, modo, query_embedding)
+
+    result = await execute(db.rpc(
+        f"buscar_tarefas_{modo}",
+        {
+            **params,
+            "empresa_id_int": empresa_id,
+            "limite": limite,
+            "projeto_filtro": projeto,
+            "coluna_filtro": coluna,
+            "relevancia_minima": threshold or 0
+        }
+    ))
+
+    return [_tarefa_resultado(tarefa, tarefa["similaridade"]) for tarefa in result.data or []]
 
 
 async def buscar_contratos(
     query: str,
     limite: int = 10,
-    threshold: float = 0.7
+    threshold: Optional[float] = None,
+    empresa_id: int = 1,
+    modo: str = "hibrido",
+    query_embedding: Optional[List[float]] = None
 ) -> List[Dict[str, Any]]:
-    contratos_list = await contratos.listar_contratos()
-    
-    results = []
-    for contrato in contratos_list:
-        text = f"{contrato.get('titulo', '')} {contrato.get('descricao', '')}"
-        
-        similarity = calcular_similaridade(query, text)
-        
-        if similarity >= threshold:
-            results.append({
-                "id": contrato["id"],
-                "tipo": "contrato",
-                "titulo": contrato["titulo"],
-                "tipo_contrato": contrato.get("tipo"),
-                "contratante": contrato.get("contratante"),
-                "status": contrato.get("status"),
-                "similaridade": round(similarity, 3)
-            })
-    
-    return results[:limite]
-
-
-def calcular_similaridade(query: str, texto: str) -> float:
-    query_words = set(query.lower().split())
-    texto_words = set(texto.lower().split())
-    
-    if not query_words or not texto_words:
-        return 0.0
-    
-    intersection = query_words.intersection(texto_words)
-    union = query_words.union(texto_words)
-    
-    jaccard = len(intersection) / len(union) if union else 0
-    
-    return min(jaccard * 1.5, 1.0)
+    """Busca textual, vetorial ou híbrida sobre todos os contratos da empresa."""
+    modo = _modo_efetivo(modo)
+    if modo == "hibrido":
+        results, _ = await _buscar_hibrido(
+            query, ("contratos",), limite, threshold, None, None, empresa_id, None, {}
+        )
+        return results[:limite]
+
+    db = get_db()
+
+    modo, params = await _params_consulta(query, modo, query_embedding)
+
+    result = await execute(db.rpc(
+        f"buscar_contratos_{modo}",
+        {
+            **params,
+            "empresa_id_int": empresa_id,
+            "limite": limite,
+            "relevancia_minima": threshold or 0
+        }
+    ))
+
+    return [_contrato_resultado(contrato, contrato["similaridade"]) for contrato in result.data or []]
@@ -1,91 +1,99 @@
-from typing import Optional, List, Dict, Any
-from api.database import get_db
+from typing import Optional, List, Dict, Any, Hashable
+from api.database import get_db, execute
+from api.services import cache, stream
 
 
 class SprintService:
     @staticmethod
-    def create(data: Dict[str, Any]) -> Dict[str, Any]:
+    async def create(data: Dict[str, Any]) -> Dict[str, Any]:
         db = get_db()
-        result = db.table("sprints").insert(data).execute()
+        result = await execute(db.table("sprints").insert(data))
+        await cache.invalidar("sprints", data.get("empresa_id"))
+        await stream.publicar("sprints", "criado", result.data)
         if result.data:
             return result.data[0]
         return {}
     
     @staticmethod
-    def get_by_id(sprint_id: int) -> Optional[Dict[str, Any]]:
-        db = get_db()
-        result = db.table("sprints").select("*").eq("id", sprint_id).execute()
-        if result.data:
-            return result.data[0]
-        return None
+    async def get_by_id(sprint_id: int) -> Optional[Dict[str, Any]]:
+        async def carregar():
+            db = get_db()
+            result = await execute(db.table("sprints").select("*").eq("id", sprint_id))
+            if result.data:
+                return result.data[0]
+            return None
+        return await cache.lembrar("sprints", None, {"id": sprint_id}, carregar)
     
     @staticmethod
-    def list(empresa_id: int = 1, projeto_id: Optional[int] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
-        db = get_db()
-        query = db.table("sprints").select("*").eq("empresa_id", empresa_id)
-        if projeto_id is not None:
-            query = query.eq("projeto_id", projeto_id)
-        if status is not None:
-            query = query.eq("status", status)
-        result = query.order("ordem").execute()
-        return result.data or []
+    async def list(
+        empresa_id: int = 1,
+        projeto_id: Optional[int] = None,
+        status: Optional[str] = None,
+        versao: Optional[Hashable] = None
+    ) -> List[Dict[str, Any]]:
+        async def carregar():
+            db = get_db()
+            query = db.table("sprints").select("*").eq("empresa_id", empresa_id)
+            if projeto_id is not None:
+                query = query.eq("projeto_id", projeto_id)
+            if status is not None:
+                query = query.eq("status", status)
+            result = await execute(query.order("ordem"))
+            return result.data or []
+        return await cache.lembrar("sprints", empresa_id, {"projeto_id": projeto_id, "status": status}, carregar, versao)
     
     @staticmethod
-    def get_active(empresa_id: int = 1) -> Optional[Dict[str, Any]]:
-        db = get_db()
-        result = db.table("sprints").select("*").eq("empresa_id", empresa_id).eq("status", "ativa").execute()
-        if result.data:
-            return result.data[0]
-        return None
+    async def get_active(empresa_id: int = 1, versao: Optional[Hashable] = None) -> Optional[Dict[str, Any]]:
+        async def carregar():
+            db = get_db()
+            result = await execute(db.table("sprints").select("*").eq("empresa_id", empresa_id).eq("status", "ativa"))
+            if result.data:
+                return result.data[0]
+            return None
+        return await cache.lembrar("sprints", empresa_id, {"ativa": True}, carregar, versao)
     
     @staticmethod
-    def update(sprint_id: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def update(sprint_id: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         db = get_db()
-        result = db.table("sprints").update(data).eq("id", sprint_id).execute()
+        result = await execute(db.table("sprints").update(data).eq("id", sprint_id))
+        await cache.invalidar("sprints")
         if result.data:
+            await stream.publicar("sprints", "atualizado", result.data)
             return result.data[0]
         return None
     
     @staticmethod
-    def delete(sprint_id: int) -> bool:
+    async def delete(sprint_id: int) -> bool:
         db = get_db()
-        result = db.table("sprints").delete().eq("id", sprint_id).execute()
+        result = await execute(db.table("sprints").delete().eq("id", sprint_id))
+        await cache.invalidar("sprints")
+        if result.data:
+            await stream.publicar("sprints", "excluido", result.data)
         return len(result.data) > 0 if result.data else False
     
     @staticmethod
-    def update_pontos(sprint_id: int) -> None:
-        from api.services.tarefas import TarefaService
+    async def update_pontos(sprint_id: int) -> int:
         db = get_db()
-        tarefas = TarefaService.list(empresa_id=1, sprint_id=sprint_id, coluna="done")
-        pontos = sum(t.get("estimativa_pontos", 0) or 0 for t in tarefas)
-        db.table("sprints").update({"pontos_concluidos": pontos}).eq("id", sprint_id).execute()
+        result = await execute(db.rpc("atualizar_pontos_sprint", {"sprint_id_int": sprint_id}))
+        await cache.invalidar("sprints")
+        return result.data or 0
     
     @staticmethod
-    def move_incomplete_to_next(sprint_id: int) -> Optional[Dict[str, Any]]:
+    async def move_incomplete_to_next(sprint_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Move as tarefas não concluídas para a próxima sprint planejada e
+        recalcula pontos_concluidos numa única transação no banco.
+        Retorna empresa_id, proxima_sprint_id/nome (None se não houver),
+        tarefas_movidas e pontos_concluidos; None se a sprint não existir.
+        """
         db = get_db()
-        
-        sprint = SprintService.get_by_id(sprint_id)
-        if not sprint:
-            return None
-        
-        projeto_id = sprint.get("projeto_id")
-        
-        next_sprint = db.table("sprints").select("*").eq("empresa_id", sprint["empresa_id"]).eq("status", "planejada")
-        
-        if projeto_id:
-            next_sprint = next_sprint.eq("projeto_id", projeto_id)
-        
-        next_sprint = next_sprint.gt("ordem", sprint.get("ordem", 0)).order("ordem").limit(1).execute()
-        
-        if not next_sprint.data:
-            return None
-        
-        next_sprint_data = next_sprint.data[0]
-        
-        tarefas_incompletas = db.table("tarefas").select("*").eq("sprint_id", sprint_id).execute()
-        
-        for tarefa in tarefas_incompletas.data:
-            if tarefa.get("coluna") != "done":
-                db.table("tarefas").update({"sprint_id": next_sprint_data["id"]}).eq("id", tarefa["id"]).execute()
-        
-        return next_sprint_data
+        result = await execute(db.rpc("mover_tarefas_incompletas", {"sprint_id_int": sprint_id}))
+        await cache.invalidar("sprints")
+        if result.data:
+            # As tarefas mudam de sprint no banco; o quadro recarrega as duas
+            movimento = result.data[0]
+            if movimento.get("tarefas_movidas"):
+                await cache.invalidar("tarefas", movimento.get("empresa_id"))
+                await stream.publicar("tarefas", "sprint_concluida", [], movimento.get("empresa_id"))
+            return movimento
+        return None
@@ -0,0 +1,265 @@
+from typing import Optional, Dict, Any, List, Iterable, AsyncIterator
+from collections import deque
+import asyncio
+import json
+import os
+
+from api.services import cache, campos
+
+
+# Eventos guardados para retomada (Last-Event-ID), eventos pendentes por
+# cliente antes de ele ser considerado lento e intervalo do heartbeat
+STREAM_BUFFER = int(os.getenv("STREAM_BUFFER", "1000"))
+STREAM_FILA = int(os.getenv("STREAM_FILA", "200"))
+STREAM_HEARTBEAT_S = float(os.getenv("STREAM_HEARTBEAT_S", "15"))
+
+CANAL_EVENTOS = f"{cache.CACHE_PREFIXO}:eventos"
+ENTIDADES = ("tarefas", "sprints")
+
+# Filtros do quadro aceitos pelo stream, por entidade: filtro -> coluna do registro
+FILTROS = {
+    "tarefas": {"sprint_id": "sprint_id", "projeto_id": "projeto_id", "grupo_id": "grupo_id", "responsavel": "responsaveis"},
+    "sprints": {"sprint_id": "id", "projeto_id": "projeto_id"},
+}
+
+
+def _contem(atual: Any, valor: int) -> bool:
+    if isinstance(atual, list):
+        return valor in atual
+    return atual == valor
+
+
+def _combina(registro: Dict[str, Any], coluna: str, valor: int) -> bool:
+    # Registro sem a coluna (ex.: exclusão parcial) passa: o cliente decide
+    if coluna not in registro:
+        return True
+    if _contem(registro[coluna], valor):
+        return True
+    # Valores de antes da escrita (registro["anterior"]): quem assina a
+    # sprint de origem também vê a tarefa que saiu dela
+    anterior = registro.get("anterior") or {}
+    return coluna in anterior and _contem(anterior[coluna], valor)
+
+
+class Assinante:
+    """Uma conexão do stream: fila limitada e os filtros que ela pediu."""
+
+    def __init__(self, empresa_id: int, entidades: Iterable[str], filtros: Dict[str, Optional[int]]):
+        self.empresa_id = empresa_id
+        self.entidades = set(entidades)
+        self.filtros = {k: v for k, v in filtros.items() if v is not None}
+        self.fila: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=STREAM_FILA)
+        # Fila cheia: os eventos seguintes são descartados e o cliente recebe
+        # um "reset" para recarregar, em vez de segurar memória do servidor
+        self.atrasado = False
+
+    def filtrar(self, evento: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """O evento com só os registros que interessam a esta conexão, ou None."""
+        entidade = evento["entidade"]
+        if entidade not in self.entidades:
+            return None
+        if evento.get("empresa_id") is not None and evento["empresa_id"] != self.empresa_id:
+            return None
+
+        colunas = FILTROS.get(entidade, {})
+        filtros = [(colunas[f], v) for f, v in self.filtros.items() if f in colunas]
+        registros = evento.get("registros") or []
+        if not filtros or not registros:
+            return evento
+
+        selecionados = [r for r in registros if all(_combina(r, c, v) for c, v in filtros)]
+        if not selecionados:
+            return None
+        return {**evento, "registros": selecionados}
+
+    def entregar(self, evento: Optional[Dict[str, Any]]) -> bool:
+        if self.atrasado:
+            return False
+        try:
+            self.fila.put_nowait(evento)
+            return True
+        except asyncio.QueueFull:
+            self.atrasado = True
+            return False
+
+
+class StreamHub:
+    """
+    Distribui os eventos de mudança para as conexões do worker. Há uma única
+    assinatura do canal de eventos por worker (a do backend do cache), não
+    uma por cliente; os últimos STREAM_BUFFER eventos ficam para retomada.
+    """
+
+    def __init__(self, tamanho_buffer: int = STREAM_BUFFER):
+        self.buffer: "deque[Dict[str, Any]]" = deque(maxlen=tamanho_buffer)
+        self.assinantes: set = set()
+        # Ids vêm de um contador compartilhado, mas workers diferentes podem
+        # publicar fora de ordem: o buffer não é ordenado por id
+        self.maior_id = 0
+        self.contadores = {"publicados": 0, "recebidos": 0, "entregues": 0, "descartados": 0, "erros": 0}
+
+    async def receber(self, mensagem: str):
+        evento = json.loads(mensagem)
+        self.buffer.append(evento)
+        self.maior_id = max(self.maior_id, evento["id"])
+        self.contadores["recebidos"] += 1
+        for assinante in list(self.assinantes):
+            filtrado = assinante.filtrar(evento)
+            if filtrado is None:
+                continue
+            if assinante.entregar(filtrado):
+                self.contadores["entregues"] += 1
+            else:
+                self.contadores["descartados"] += 1
+
+    def assinar(self, empresa_id: int, entidades: Iterable[str], filtros: Dict[str, Optional[int]]) -> Assinante:
+        assinante = Assinante(empresa_id, entidades, filtros)
+        self.assinantes.add(assinante)
+        return assinante
+
+    def cancelar(self, assinante: Assinante):
+        self.assinantes.discard(assinante)
+
+    def desde(self, ultimo_id: int) -> Optional[List[Dict[str, Any]]]:
+        """Eventos depois de ultimo_id ainda no buffer, em ordem de id; None se já saíram dele."""
+        if self.buffer and min(evento["id"] for evento in self.buffer) > ultimo_id + 1:
+            return None
+        return sorted((evento for evento in self.buffer if evento["id"] > ultimo_id), key=lambda evento: evento["id"])
+
+    def ultimo_id(self) -> int:
+        return self.maior_id
+
+    def encerrar(self):
+        for assinante in list(self.assinantes):
+            assinante.atrasado = False
+            while not assinante.fila.empty():
+                assinante.fila.get_nowait()
+            assinante.fila.put_nowait(None)
+        self.assinantes.clear()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            **self.contadores,
+            "conexoes": len(self.assinantes),
+            "buffer": len(self.buffer),
+            "ultimo_id": self.ultimo_id(),
+        }
+
+
+hub = StreamHub()
+
+
+def _chave_sequencia() -> str:
+    return f"{cache.CACHE_PREFIXO}:eventos:seq"
+
+
+def _leve(registro: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in registro.items() if k not in campos.PESADOS}
+
+
+async def publicar(
+    entidade: str,
+    acao: str,
+    registros: Optional[List[Dict[str, Any]]] = None,
+    empresa_id: Optional[int] = None
+):
+    """
+    Publica uma mudança para todos os workers. O id vem de um contador no
+    backend compartilhado, então é o mesmo em todos eles (Last-Event-ID vale
+    em qualquer worker). Falhas só são logadas: a escrita já aconteceu.
+    """
+    registros = [_leve(r) for r in (registros or []) if r]
+    if empresa_id is None and registros:
+        empresa_id = registros[0].get("empresa_id")
+    try:
+        evento = {
+            "id": await cache.compartilhado.incr(_chave_sequencia()),
+            "entidade": entidade,
+            "acao": acao,
+            "empresa_id": empresa_id,
+            "registros": registros,
+        }
+        await cache.compartilhado.publish(CANAL_EVENTOS, json.dumps(evento, default=str))
+        hub.contadores["publicados"] += 1
+    except Exception as e:
+        hub.contadores["erros"] += 1
+        print(f"[ERROR] Falha ao publicar evento de {entidade}: {e}")
+
+
+async def iniciar():
+    """Assina o canal de eventos no backend do cache (startup, depois de cache.iniciar)."""
+    await cache.compartilhado.subscribe(CANAL_EVENTOS, hub.receber)
+
+
+def encerrar():
+    hub.encerrar()
+
+
+def _sse(evento: Dict[str, Any], tipo: Optional[str] = None) -> bytes:
+    return f"id: {evento['id']}\nevent: {tipo or evento['entidade']}\ndata: {json.dumps(evento, default=str)}\n\n".encode()
+
+
+def _reset(ultimo_id: int) -> bytes:
+    return _sse({"id": ultimo_id, "entidade": "reset", "acao": "recarregar", "registros": []}, "reset")
+
+
+async def eventos(
+    empresa_id: int,
+    entidades: Iterable[str],
+    filtros: Dict[str, Optional[int]],
+    ultimo_id: Optional[int] = None,
+    desconectado=None,
+    heartbeat: float = STREAM_HEARTBEAT_S
+) -> AsyncIterator[bytes]:
+    """
+    Corpo text/event-stream de uma conexão: primeiro os eventos perdidos
+    desde ultimo_id (ou um "reset" se eles já saíram do buffer), depois os
+    novos, com um comentário de heartbeat a cada intervalo sem eventos.
+    A conexão só é registrada no hub quando o corpo começa a ser lido.
+    """
+    # Registrada antes de ler o buffer: o que chegar durante a retomada vai
+    # para a fila e não se perde
+    assinante = hub.assinar(empresa_id, entidades, filtros)
+    try:
+        yield f"retry: 3000\n: conectado {hub.ultimo_id()}\n\n".encode()
+
+        # Ids enviados na retomada: os mesmos eventos também podem estar na
+        # fila. Não dá para comparar com o maior id enviado, porque eventos
+        # de outros workers chegam fora de ordem
+        reenviados = set()
+        if ultimo_id is not None:
+            perdidos = hub.desde(ultimo_id)
+            if perdidos is None:
+                yield _reset(hub.ultimo_id())
+            else:
+                for evento in perdidos:
+                    reenviados.add(evento["id"])
+                    filtrado = assinante.filtrar(evento)
+                    if filtrado is not None:
+                        yield _sse(filtrado)
+
+        while True:
+            if assinante.atrasado:
+                while not assinante.fila.empty():
+                    assinante.fila.get_nowait()
+                assinante.atrasado = False
+                reenviados.clear()
+                yield _reset(hub.ultimo_id())
+
+            try:
+                evento = await asyncio.wait_for(assinante.fila.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                if desconectado is not None and await desconectado():
+                    return
+                yield b": ping\n\n"
+                continue
+
+            if evento is None:
+                return
+            # Já enviado na retomada (chegou enquanto o buffer era lido)
+            if evento["id"] in reenviados:
+                reenviados.discard(evento["id"])
+                continue
+            yield _sse(evento)
+    finally:
+        hub.cancelar(assinante)
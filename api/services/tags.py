@@ -1,5 +1,6 @@
 from typing import List, Optional, Dict, Any
-from api.database import get_db
+from api.database import get_db, execute
+from api.services import cache
 
 
 async def listar_tags(
@@ -8,31 +9,38 @@ async def listar_tags(
     skip: int = 0,
     limit: int = 100
 ) -> List[Dict[str, Any]]:
-    db = get_db()
-    
-    query = db.table("tags").select("*").eq("empresa_id", empresa_id)
-    
-    if escopo:
-        query = query.eq("escopo", escopo)
-    
-    query = query.order("nome").range(skip, skip + limit - 1)
+    async def carregar():
+        db = get_db()
+        
+        query = db.table("tags").select("*").eq("empresa_id", empresa_id)
+        
+        if escopo:
+            query = query.eq("escopo", escopo)
+        
+        query = query.order("nome").range(skip, skip + limit - 1)
+        
+        result = await execute(query)
+        return result.data or []
     
-    result = query.execute()
-    return result.data or []
+    return await cache.lembrar("tags", empresa_id, {"escopo": escopo, "skip": skip, "limit": limit}, carregar)
 
 
 async def buscar_tag(tag_id: int, empresa_id: int = 1) -> Optional[Dict[str, Any]]:
-    db = get_db()
-    
-    result = db.table("tags").select("*").eq("id", tag_id).eq("empresa_id", empresa_id).execute()
+    async def carregar():
+        db = get_db()
+        
+        result = await execute(db.table("tags").select("*").eq("id", tag_id).eq("empresa_id", empresa_id))
+        
+        return result.data[0] if result.data else None
     
-    return result.data[0] if result.data else None
+    return await cache.lembrar("tags", empresa_id, {"id": tag_id}, carregar)
 
 
 async def criar_tag(tag: Dict[str, Any]) -> Dict[str, Any]:
     db = get_db()
     
-    result = db.table("tags").insert(tag).execute()
+    result = await execute(db.table("tags").insert(tag))
+    await cache.invalidar("tags", tag.get("empresa_id"))
     
     return result.data[0] if result.data else None
 
@@ -41,7 +49,8 @@ async def atualizar_tag(tag_id: int, data: Dict[str, Any], empresa_id: int = 1)
     db = get_db()
     
     if data:
-        result = db.table("tags").update(data).eq("id", tag_id).eq("empresa_id", empresa_id).execute()
+        result = await execute(db.table("tags").update(data).eq("id", tag_id).eq("empresa_id", empresa_id))
+        await cache.invalidar("tags", empresa_id)
         return result.data[0] if result.data else None
     
     return await buscar_tag(tag_id, empresa_id)
@@ -50,6 +59,7 @@ async def atualizar_tag(tag_id: int, data: Dict[str, Any], empresa_id: int = 1)
 async def deletar_tag(tag_id: int, empresa_id: int = 1) -> bool:
     db = get_db()
     
-    result = db.table("tags").delete().eq("id", tag_id).eq("empresa_id", empresa_id).execute()
+    result = await execute(db.table("tags").delete().eq("id", tag_id).eq("empresa_id", empresa_id))
+    await cache.invalidar("tags", empresa_id)
     
     return len(result.data) > 0 if result.data else False
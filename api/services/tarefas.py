@@ -1,8 +1,27 @@
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, AsyncIterator, Iterable
 from datetime import datetime, date
 
-from api.database import get_db
-from api.schemas.tarefa import TarefaCreate, TarefaUpdate, TarefaResponse
+from api.database import get_db, execute
+from api.services import embeddings, bulk, export, paginacao, campos, stream, cache
+from api.schemas.tarefa import TarefaCreate, TarefaUpdate, TarefaResponse, Coluna
+
+
+CAMPOS = [c for c in TarefaResponse.model_fields if c != "embedding"]
+CAMPOS_LISTA = [c for c in CAMPOS if c != "descricao_html"]
+PROJECOES = {
+    "card": [
+        "titulo", "coluna", "prioridade", "status", "responsaveis", "prazo", "tags",
+        "projeto_id", "sprint_id", "grupo_id", "estimativa_horas", "estimativa_pontos", "ordem",
+        "created_at", "updated_at",
+    ],
+}
+ORDEM = [("created_at", True), ("id", True)]
+# Colunas dos filtros do quadro no /api/stream (sprint_id, projeto_id, ...)
+COLUNAS_STREAM = list(stream.FILTROS["tarefas"].values())
+
+
+def _projecao(fields: Optional[str], padrao: List[str]) -> str:
+    return campos.projecao(fields, TarefaResponse.model_fields, padrao, [c for c, _ in ORDEM], PROJECOES)
 
 
 async def listar_tarefas(
@@ -15,12 +34,14 @@ async def listar_tarefas(
     grupo_id: Optional[int] = None,
     status: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     db = get_db()
     
     try:
-        query = db.table("tarefas").select("*").eq("empresa_id", empresa_id)
+        query = db.table("tarefas").select(_projecao(fields, CAMPOS_LISTA)).eq("empresa_id", empresa_id)
         
         if coluna:
             query = query.eq("coluna", coluna)
@@ -37,38 +58,85 @@ async def listar_tarefas(
         if status:
             query = query.eq("status", status)
         
-        query = query.order("created_at", desc=True).range(skip, skip + limit - 1)
+        query = paginacao.paginar(query, ORDEM, cursor, skip, limit)
         
-        result = query.execute()
+        result = await execute(query)
         return result.data or []
     except Exception as e:
         print(f"[ERROR] Erro ao listar tarefas: {e}")
         raise
 
 
-async def buscar_tarefa(tarefa_id: int, empresa_id: int = 1) -> Optional[Dict[str, Any]]:
+async def buscar_tarefa(tarefa_id: int, empresa_id: int = 1, fields: Optional[str] = None) -> Optional[Dict[str, Any]]:
     db = get_db()
     
-    result = db.table("tarefas").select("*").eq("id", tarefa_id).eq("empresa_id", empresa_id).execute()
+    result = await execute(db.table("tarefas").select(_projecao(fields, CAMPOS)).eq("id", tarefa_id).eq("empresa_id", empresa_id))
     
     return result.data[0] if result.data else None
 
 
+async def board_tarefas(
+    empresa_id: int = 1,
+    sprint_id: Optional[int] = None,
+    grupo_id: Optional[int] = None,
+    projeto_id: Optional[int] = None,
+    responsavel: Optional[int] = None,
+    prioridade: Optional[str] = None,
+    status: Optional[str] = None,
+    limite_coluna: int = 50,
+    fields: Optional[str] = "card"
+) -> Dict[str, Any]:
+    """Quadro kanban numa chamada: RPC tarefas_board (api/migrations/009_kanban_board.sql)."""
+    db = get_db()
+    
+    selecionados = _projecao(fields, CAMPOS_LISTA).split(",")
+    
+    result = await execute(db.rpc("tarefas_board", {
+        "empresa_id_int": empresa_id,
+        "limite_coluna": limite_coluna,
+        "sprint_id_int": sprint_id,
+        "grupo_id_int": grupo_id,
+        "projeto_id_int": projeto_id,
+        "responsavel_int": responsavel,
+        "prioridade_filtro": prioridade,
+        "status_filtro": status
+    }))
+    
+    por_coluna = {row["coluna"]: row for row in result.data or []}
+    ordem = [c.value for c in Coluna] + [c for c in por_coluna if c not in Coluna._value2member_map_]
+    
+    colunas = []
+    for coluna in ordem:
+        row = por_coluna.get(coluna) or {"total": 0, "tarefas": []}
+        colunas.append({
+            "coluna": coluna,
+            "total": row["total"],
+            "tarefas": [{c: t.get(c) for c in selecionados} for t in row["tarefas"]]
+        })
+    
+    return {
+        "total": sum(c["total"] for c in colunas),
+        "limite_coluna": limite_coluna,
+        "colunas": colunas
+    }
+
+
 async def criar_tarefa(tarefa: TarefaCreate) -> Dict[str, Any]:
     db = get_db()
     
-    data = tarefa.model_dump()
+    data = tarefa.model_dump(mode="json")
     
     # Remove campos que não existem na tabela
     data.pop("tags", None)
     data["responsaveis"] = data.get("responsaveis") or []
     
-    print(f"[DEBUG] Criando tarefa com dados: {data}")
-    
     try:
-        result = db.table("tarefas").insert(data).execute()
-        print(f"[DEBUG] Resultado: {result.data}")
-        return result.data[0] if result.data else None
+        result = await execute(db.table("tarefas").insert(data).select(",".join(CAMPOS)))
+        tarefa_criada = result.data[0] if result.data else None
+        embeddings.agendar("tarefa", tarefa_criada)
+        if tarefa_criada:
+            await _notificar("criado", [tarefa_criada])
+        return tarefa_criada
     except Exception as e:
         print(f"[ERROR] Erro ao criar tarefa: {e}")
         raise
@@ -77,17 +145,24 @@ async def criar_tarefa(tarefa: TarefaCreate) -> Dict[str, Any]:
 async def atualizar_tarefa(tarefa_id: int, tarefa: TarefaUpdate, empresa_id: int = 1) -> Optional[Dict[str, Any]]:
     db = get_db()
     
-    data = tarefa.model_dump(exclude_unset=True)
+    data = tarefa.model_dump(mode="json", exclude_unset=True)
     
     if "tags" in data and data["tags"] is None:
         data["tags"] = []
     
     if data:
         data["updated_at"] = datetime.utcnow().isoformat()
+        anteriores = await _anteriores([tarefa_id], data, empresa_id)
         
-        result = db.table("tarefas").update(data).eq("id", tarefa_id).eq("empresa_id", empresa_id).execute()
+        result = await execute(
+            db.table("tarefas").update(data).eq("id", tarefa_id).eq("empresa_id", empresa_id).select(",".join(CAMPOS))
+        )
         
-        return result.data[0] if result.data else None
+        tarefa_atualizada = result.data[0] if result.data else None
+        embeddings.agendar("tarefa", tarefa_atualizada)
+        if tarefa_atualizada:
+            await _notificar("atualizado", [tarefa_atualizada], anteriores=anteriores)
+        return tarefa_atualizada
     
     return await buscar_tarefa(tarefa_id, empresa_id)
 
@@ -95,8 +170,12 @@ async def atualizar_tarefa(tarefa_id: int, tarefa: TarefaUpdate, empresa_id: int
 async def deletar_tarefa(tarefa_id: int, empresa_id: int = 1) -> bool:
     db = get_db()
     
-    result = db.table("tarefas").delete().eq("id", tarefa_id).eq("empresa_id", empresa_id).execute()
+    result = await execute(
+        db.table("tarefas").delete().eq("id", tarefa_id).eq("empresa_id", empresa_id).select(",".join(CAMPOS))
+    )
     
+    if result.data:
+        await _notificar("excluido", result.data, empresa_id)
     return len(result.data) > 0 if result.data else False
 
 
@@ -111,11 +190,152 @@ async def mover_tarefa(tarefa_id: int, coluna: str, empresa_id: int = 1) -> Opti
     if coluna == "done":
         data["data_conclusao"] = datetime.utcnow().isoformat()
     
-    result = db.table("tarefas").update(data).eq("id", tarefa_id).eq("empresa_id", empresa_id).execute()
+    result = await execute(
+        db.table("tarefas").update(data).eq("id", tarefa_id).eq("empresa_id", empresa_id).select(",".join(CAMPOS))
+    )
     
+    if result.data:
+        await _notificar("movido", result.data, empresa_id)
     return result.data[0] if result.data else None
 
 
+def _dados_criacao(tarefa: TarefaCreate) -> Dict[str, Any]:
+    data = tarefa.model_dump(mode="json")
+    data.pop("tags", None)
+    data["responsaveis"] = data.get("responsaveis") or []
+    return data
+
+
+def _dados_atualizacao(tarefa: TarefaUpdate) -> Dict[str, Any]:
+    data = tarefa.model_dump(mode="json", exclude_unset=True)
+    if "tags" in data and data["tags"] is None:
+        data["tags"] = []
+    data["updated_at"] = datetime.utcnow().isoformat()
+    return data
+
+
+async def _anteriores(ids: List[int], alteradas: Iterable[str], empresa_id: int) -> Dict[int, Dict[str, Any]]:
+    """
+    Valores das colunas do stream que a escrita vai mudar, lidos antes dela.
+    Só consulta o banco se `alteradas` inclui alguma (ex.: troca de sprint).
+    """
+    alteradas = set(alteradas)
+    colunas = [c for c in COLUNAS_STREAM if c in alteradas]
+    if not colunas or not ids:
+        return {}
+
+    db = get_db()
+    result = await execute(
+        db.table("tarefas").select(",".join(["id"] + colunas)).eq("empresa_id", empresa_id).in_("id", ids)
+    )
+    return {row.pop("id"): row for row in result.data or []}
+
+
+async def _notificar(
+    acao: str,
+    registros: List[Dict[str, Any]],
+    empresa_id: Optional[int] = None,
+    anteriores: Optional[Dict[int, Dict[str, Any]]] = None
+):
+    """
+    Avisa a mudança: evento no /api/stream e invalidação dos resumos de
+    tarefas no cache. Com `anteriores`, cada registro leva em "anterior" os
+    valores que mudaram, para os filtros do stream casarem com os dois.
+    """
+    if empresa_id is None and registros:
+        empresa_id = registros[0].get("empresa_id")
+    if anteriores:
+        registros = [_com_anterior(r, anteriores.get(r.get("id")) or {}) for r in registros]
+    await cache.invalidar("tarefas", empresa_id)
+    await stream.publicar("tarefas", acao, registros, empresa_id)
+
+
+def _com_anterior(registro: Dict[str, Any], anterior: Dict[str, Any]) -> Dict[str, Any]:
+    mudou = {c: v for c, v in anterior.items() if registro.get(c) != v}
+    return {**registro, "anterior": mudou} if mudou else registro
+
+
+async def _publicar_lote(
+    acao: str,
+    tarefas: List[Dict[str, Any]],
+    empresa_id: Optional[int] = None,
+    anteriores: Optional[Dict[int, Dict[str, Any]]] = None
+):
+    """Um evento por empresa para o lote inteiro (não um por tarefa)."""
+    por_empresa: Dict[Any, List[Dict[str, Any]]] = {}
+    for tarefa in tarefas:
+        por_empresa.setdefault(tarefa.get("empresa_id", empresa_id), []).append(tarefa)
+    for empresa, registros in por_empresa.items():
+        await _notificar(acao, registros, empresa, anteriores)
+
+
+async def criar_tarefas_em_lote(itens: List[Dict[str, Any]], atomico: bool = False) -> Dict[str, Any]:
+    resultado = await bulk.criar_em_lote("tarefas", itens, TarefaCreate, _dados_criacao, atomico, CAMPOS)
+    for tarefa in resultado["itens"]:
+        embeddings.agendar("tarefa", tarefa)
+    await _publicar_lote("criado", resultado["itens"])
+    return resultado
+
+
+async def atualizar_tarefas_em_lote(
+    itens: List[Dict[str, Any]],
+    empresa_id: int = 1,
+    atomico: bool = False
+) -> Dict[str, Any]:
+    # Itens que trocam sprint/projeto/grupo/responsáveis: valores de antes para o stream
+    movidos = [item for item in itens if isinstance(item.get("id"), int) and any(c in item for c in COLUNAS_STREAM)]
+    anteriores = await _anteriores([item["id"] for item in movidos], {c for item in movidos for c in item}, empresa_id)
+    resultado = await bulk.atualizar_em_lote("tarefas", itens, TarefaUpdate, _dados_atualizacao, empresa_id, atomico)
+    for tarefa in resultado["itens"]:
+        embeddings.agendar("tarefa", tarefa)
+    await _publicar_lote("atualizado", resultado["itens"], empresa_id, anteriores)
+    return resultado
+
+
+async def mover_tarefas_em_lote(ids: List[int], coluna: str, empresa_id: int = 1) -> Dict[str, Any]:
+    data = {
+        "coluna": coluna,
+        "updated_at": datetime.utcnow().isoformat()
+    }
+    
+    if coluna == "done":
+        data["data_conclusao"] = datetime.utcnow().isoformat()
+    
+    resultado = await bulk.mover_em_lote("tarefas", ids, data, empresa_id, CAMPOS)
+    await _publicar_lote("movido", resultado["itens"], empresa_id)
+    return resultado
+
+
+def exportar_tarefas(
+    formato: str = "csv",
+    gzip: bool = False,
+    empresa_id: int = 1,
+    coluna: Optional[str] = None,
+    prioridade: Optional[str] = None,
+    projeto_id: Optional[int] = None,
+    sprint_id: Optional[int] = None,
+    grupo_id: Optional[int] = None,
+    status: Optional[str] = None
+) -> AsyncIterator[bytes]:
+    def filtrar(query):
+        query = query.eq("empresa_id", empresa_id)
+        if coluna:
+            query = query.eq("coluna", coluna)
+        if prioridade:
+            query = query.eq("prioridade", prioridade)
+        if projeto_id:
+            query = query.eq("projeto_id", projeto_id)
+        if sprint_id:
+            query = query.eq("sprint_id", sprint_id)
+        if grupo_id:
+            query = query.eq("grupo_id", grupo_id)
+        if status:
+            query = query.eq("status", status)
+        return query
+    
+    return export.exportar("tarefas", CAMPOS, filtrar, formato, gzip)
+
+
 async def buscar_tarefas_semelhantes(
     query_text: str,
     empresa_id: int = 1,
@@ -128,17 +348,17 @@ async def buscar_tarefas_semelhantes(
     if not embedding:
         return []
     
-    result = db.rpc(
-        "buscar_tarefas_similares",
+    result = await execute(db.rpc(
+        "buscar_tarefas_vetorial",
         {
             "query_embedding": embedding,
             "empresa_id_int": empresa_id,
             "limite": limite
         }
-    ).execute()
+    ))
     
     return result.data or []
 
 
 async def gerar_embedding(text: str) -> Optional[List[float]]:
-    return None
+    return await embeddings.gerar_embedding(text)
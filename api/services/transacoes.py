@@ -1,8 +1,25 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Hashable
 from datetime import datetime, date
 
-from api.database import get_db
-from api.schemas.transacao import TransacaoCreate, TransacaoUpdate
+from api.database import get_db, execute
+from api.services import embeddings, bulk, export, paginacao, campos, cache
+from api.schemas.transacao import TransacaoCreate, TransacaoUpdate, TransacaoResponse
+
+
+CAMPOS = [c for c in TransacaoResponse.model_fields if c != "embedding"]
+# Textos longos só no detalhe ou com ?fields=
+CAMPOS_LISTA = [c for c in CAMPOS if c not in ("descricao_detalhada", "observacoes")]
+PROJECOES = {
+    "extrato": [
+        "tipo", "valor", "descricao", "status", "data_transacao", "data_vencimento", "data_pagamento",
+        "categoria_id", "projeto_id", "pessoa_nome", "tags",
+    ],
+}
+ORDEM = [("data_transacao", True), ("id", True)]
+
+
+def _projecao(fields: Optional[str], padrao: List[str]) -> str:
+    return campos.projecao(fields, TransacaoResponse.model_fields, padrao, [c for c, _ in ORDEM], PROJECOES)
 
 
 async def listar_transacoes(
@@ -12,11 +29,13 @@ async def listar_transacoes(
     status: Optional[str] = None,
     projeto_id: Optional[int] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     db = get_db()
     
-    query = db.table("transacoes").select("*").eq("empresa_id", empresa_id)
+    query = db.table("transacoes").select(_projecao(fields, CAMPOS_LISTA)).eq("empresa_id", empresa_id)
     
     if tipo:
         query = query.eq("tipo", tipo)
@@ -27,16 +46,16 @@ async def listar_transacoes(
     if projeto_id:
         query = query.eq("projeto_id", projeto_id)
     
-    query = query.order("data_transacao", desc=True).range(skip, skip + limit - 1)
+    query = paginacao.paginar(query, ORDEM, cursor, skip, limit)
     
-    result = query.execute()
+    result = await execute(query)
     return result.data or []
 
 
-async def buscar_transacao(transacao_id: int, empresa_id: int = 1) -> Optional[Dict[str, Any]]:
+async def buscar_transacao(transacao_id: int, empresa_id: int = 1, fields: Optional[str] = None) -> Optional[Dict[str, Any]]:
     db = get_db()
     
-    result = db.table("transacoes").select("*").eq("id", transacao_id).eq("empresa_id", empresa_id).execute()
+    result = await execute(db.table("transacoes").select(_projecao(fields, CAMPOS)).eq("id", transacao_id).eq("empresa_id", empresa_id))
     
     return result.data[0] if result.data else None
 
@@ -47,11 +66,13 @@ async def criar_transacao(transacao: TransacaoCreate) -> Dict[str, Any]:
     data = transacao.model_dump()
     
     data["tags"] = data.get("tags") or []
-    data["embedding"] = None
     
-    result = db.table("transacoes").insert(data).execute()
+    result = await execute(db.table("transacoes").insert(data).select(",".join(CAMPOS)))
     
-    return result.data[0] if result.data else None
+    transacao_criada = result.data[0] if result.data else None
+    await cache.invalidar("resumos", data.get("empresa_id"))
+    embeddings.agendar("transacao", transacao_criada)
+    return transacao_criada
 
 
 async def atualizar_transacao(transacao_id: int, transacao: TransacaoUpdate, empresa_id: int = 1) -> Optional[Dict[str, Any]]:
@@ -65,9 +86,14 @@ async def atualizar_transacao(transacao_id: int, transacao: TransacaoUpdate, emp
     if data:
         data["updated_at"] = datetime.utcnow().isoformat()
         
-        result = db.table("transacoes").update(data).eq("id", transacao_id).eq("empresa_id", empresa_id).execute()
+        result = await execute(
+            db.table("transacoes").update(data).eq("id", transacao_id).eq("empresa_id", empresa_id).select(",".join(CAMPOS))
+        )
         
-        return result.data[0] if result.data else None
+        transacao_atualizada = result.data[0] if result.data else None
+        await cache.invalidar("resumos", empresa_id)
+        embeddings.agendar("transacao", transacao_atualizada)
+        return transacao_atualizada
     
     return await buscar_transacao(transacao_id, empresa_id)
 
@@ -75,104 +101,172 @@ async def atualizar_transacao(transacao_id: int, transacao: TransacaoUpdate, emp
 async def deletar_transacao(transacao_id: int, empresa_id: int = 1) -> bool:
     db = get_db()
     
-    result = db.table("transacoes").delete().eq("id", transacao_id).eq("empresa_id", empresa_id).execute()
+    result = await execute(db.table("transacoes").delete().eq("id", transacao_id).eq("empresa_id", empresa_id))
+    await cache.invalidar("resumos", empresa_id)
     
     return len(result.data) > 0 if result.data else False
 
 
-async def resumo_mensal(ano: int, mes: int, empresa_id: int = 1) -> Dict[str, Any]:
-    db = get_db()
+def _dados_criacao(transacao: TransacaoCreate) -> Dict[str, Any]:
+    data = transacao.model_dump(mode="json")
+    data["tags"] = data.get("tags") or []
+    return data
+
+
+def _dados_atualizacao(transacao: TransacaoUpdate) -> Dict[str, Any]:
+    data = transacao.model_dump(mode="json", exclude_unset=True)
+    if "tags" in data and data["tags"] is None:
+        data["tags"] = []
+    data["updated_at"] = datetime.utcnow().isoformat()
+    return data
+
+
+async def criar_transacoes_em_lote(itens: List[Dict[str, Any]], atomico: bool = False) -> Dict[str, Any]:
+    resultado = await bulk.criar_em_lote("transacoes", itens, TransacaoCreate, _dados_criacao, atomico, CAMPOS)
+    await cache.invalidar("resumos")
+    for transacao in resultado["itens"]:
+        embeddings.agendar("transacao", transacao)
+    return resultado
+
+
+async def atualizar_transacoes_em_lote(
+    itens: List[Dict[str, Any]],
+    empresa_id: int = 1,
+    atomico: bool = False
+) -> Dict[str, Any]:
+    resultado = await bulk.atualizar_em_lote("transacoes", itens, TransacaoUpdate, _dados_atualizacao, empresa_id, atomico)
+    await cache.invalidar("resumos", empresa_id)
+    for transacao in resultado["itens"]:
+        embeddings.agendar("transacao", transacao)
+    return resultado
+
+
+async def alterar_status_transacoes_em_lote(ids: List[int], status: str, empresa_id: int = 1) -> Dict[str, Any]:
+    data = {
+        "status": status,
+        "updated_at": datetime.utcnow().isoformat()
+    }
     
+    resultado = await bulk.mover_em_lote("transacoes", ids, data, empresa_id, CAMPOS)
+    await cache.invalidar("resumos", empresa_id)
+    return resultado
+
+
+def exportar_transacoes(
+    formato: str = "csv",
+    gzip: bool = False,
+    empresa_id: int = 1,
+    tipo: Optional[str] = None,
+    categoria_id: Optional[int] = None,
+    status: Optional[str] = None,
+    projeto_id: Optional[int] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None
+) -> AsyncIterator[bytes]:
+    """Exportação em streaming; data_fim é exclusiva."""
+    def filtrar(query):
+        query = query.eq("empresa_id", empresa_id)
+        if tipo:
+            query = query.eq("tipo", tipo)
+        if categoria_id:
+            query = query.eq("categoria_id", categoria_id)
+        if status:
+            query = query.eq("status", status)
+        if projeto_id:
+            query = query.eq("projeto_id", projeto_id)
+        if data_inicio:
+            query = query.gte("data_transacao", data_inicio.isoformat())
+        if data_fim:
+            query = query.lt("data_transacao", data_fim.isoformat())
+        return query
+    
+    return export.exportar("transacoes", CAMPOS, filtrar, formato, gzip)
+
+
+def _periodo(ano: int, mes: int):
     data_inicio = date(ano, mes, 1)
     if mes == 12:
         data_fim = date(ano + 1, 1, 1)
     else:
         data_fim = date(ano, mes + 1, 1)
-    
-    receitas_result = db.table("transacoes").select(
-        db.context.postgrest.api.APIRPCBuilder("sum", ["valor"])
-    ).eq("empresa_id", empresa_id).eq("tipo", "receita").eq("status", "pago").gte("data_transacao", data_inicio.isoformat()).lt("data_transacao", data_fim.isoformat()).execute()
-    
-    despesas_result = db.table("transacoes").select(
-        db.context.postgrest.api.APIRPCBuilder("sum", ["valor"])
-    ).eq("empresa_id", empresa_id).eq("tipo", "despesa").eq("status", "pago").gte("data_transacao", data_inicio.isoformat()).lt("data_transacao", data_fim.isoformat()).execute()
-    
-    receitas = receitas_result.data[0].get("sum", 0) if receitas_result.data else 0
-    despesas = despesas_result.data[0].get("sum", 0) if despesas_result.data else 0
-    
-    return {
-        "ano": ano,
-        "mes": mes,
-        "receitas": receitas or 0,
-        "despesas": despesas or 0,
-        "saldo": (receitas or 0) - (despesas or 0)
-    }
+    return data_inicio, data_fim
 
 
-async def resumo_por_projeto(empresa_id: int = 1) -> List[Dict[str, Any]]:
-    db = get_db()
-    
-    result = db.table("transacoes").select(
-        "projeto_id",
-        "tipo",
-        "valor"
-    ).eq("empresa_id", empresa_id).execute()
-    
-    projetos: Dict[int, Dict[str, float]] = {}
-    
-    for item in result.data or []:
-        projeto_id = item.get("projeto_id") or 0
-        if projeto_id not in projetos:
-            projetos[projeto_id] = {"receitas": 0, "despesas": 0}
+async def resumo_mensal(ano: int, mes: int, empresa_id: int = 1, versao: Optional[Hashable] = None) -> Dict[str, Any]:
+    async def carregar():
+        db = get_db()
         
-        if item["tipo"] == "receita":
-            projetos[projeto_id]["receitas"] += item["valor"] or 0
-        else:
-            projetos[projeto_id]["despesas"] += item["valor"] or 0
-    
-    return [
-        {
-            "projeto_id": pid,
-            "receitas": vals["receitas"],
-            "despesas": vals["despesas"],
-            "saldo": vals["receitas"] - vals["despesas"]
+        data_inicio, data_fim = _periodo(ano, mes)
+        
+        result = await execute(db.rpc("resumo_transacoes_mensal", {
+            "empresa_id_int": empresa_id,
+            "data_inicio": data_inicio.isoformat(),
+            "data_fim": data_fim.isoformat()
+        }))
+        
+        totais = result.data[0] if result.data else {}
+        receitas = totais.get("receitas") or 0
+        despesas = totais.get("despesas") or 0
+        
+        return {
+            "ano": ano,
+            "mes": mes,
+            "receitas": receitas,
+            "despesas": despesas,
+            "saldo": receitas - despesas
         }
-        for pid, vals in projetos.items()
-    ]
+    
+    return await cache.lembrar("resumos", empresa_id, {"tipo": "mensal", "ano": ano, "mes": mes}, carregar, versao)
 
 
-async def resumo_por_categoria(ano: int, mes: int, empresa_id: int = 1) -> List[Dict[str, Any]]:
-    db = get_db()
+async def resumo_por_projeto(empresa_id: int = 1, versao: Optional[Hashable] = None) -> List[Dict[str, Any]]:
+    async def carregar():
+        db = get_db()
+        
+        result = await execute(db.rpc("resumo_transacoes_por_projeto", {"empresa_id_int": empresa_id}))
+        
+        return [
+            {
+                "projeto_id": item["projeto_id"],
+                "receitas": item["receitas"],
+                "despesas": item["despesas"],
+                "saldo": item["receitas"] - item["despesas"]
+            }
+            for item in result.data or []
+        ]
     
-    data_inicio = date(ano, mes, 1)
-    if mes == 12:
-        data_fim = date(ano + 1, 1, 1)
-    else:
-        data_fim = date(ano, mes + 1, 1)
+    return await cache.lembrar("resumos", empresa_id, {"tipo": "projeto"}, carregar, versao)
+
+
+async def resumo_por_categoria(ano: int, mes: int, empresa_id: int = 1, versao: Optional[Hashable] = None) -> List[Dict[str, Any]]:
+    async def carregar():
+        db = get_db()
+        
+        data_inicio, data_fim = _periodo(ano, mes)
+        
+        result = await execute(db.rpc("resumo_transacoes_por_categoria", {
+            "empresa_id_int": empresa_id,
+            "data_inicio": data_inicio.isoformat(),
+            "data_fim": data_fim.isoformat()
+        }))
+        
+        return [
+            {
+                "categoria_id": item["categoria_id"],
+                "receitas": item["receitas"],
+                "despesas": item["despesas"]
+            }
+            for item in result.data or []
+        ]
     
-    result = db.table("transacoes").select(
-        "categoria_id",
-        "tipo",
-        "valor"
-    ).eq("empresa_id", empresa_id).eq("status", "pago").gte("data_transacao", data_inicio.isoformat()).lt("data_transacao", data_fim.isoformat()).execute()
+    return await cache.lembrar("resumos", empresa_id, {"tipo": "categoria", "ano": ano, "mes": mes}, carregar, versao)
+
+
+async def reconstruir_resumos(empresa_id: Optional[int] = None) -> int:
+    """Recalcula os rollups dos resumos (backfill); None = todas as empresas."""
+    db = get_db()
     
-    categorias: Dict[int, Dict[str, float]] = {}
+    result = await execute(db.rpc("reconstruir_transacoes_rollup", {"empresa_id_int": empresa_id}))
+    await cache.invalidar("resumos", empresa_id)
     
-    for item in result.data or []:
-        cat_id = item.get("categoria_id") or 0
-        if cat_id not in categorias:
-            categorias[cat_id] = {"receitas": 0, "despesas": 0}
-        
-        if item["tipo"] == "receita":
-            categorias[cat_id]["receitas"] += item["valor"] or 0
-        else:
-            categorias[cat_id]["despesas"] += item["valor"] or 0
-    
-    return [
-        {
-            "categoria_id": cid,
-            "receitas": vals["receitas"],
-            "despesas": vals["despesas"]
-        }
-        for cid, vals in categorias.items()
-    ]
+    return result.data or 0
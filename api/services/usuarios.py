@@ -1,5 +1,9 @@
 from typing import List, Optional, Dict, Any
-from api.database import get_db
+from api.database import get_db, execute
+from api.services import paginacao, cache
+
+
+ORDEM = [("nome", False), ("id", False)]
 
 
 async def listar_usuarios(
@@ -7,51 +11,65 @@ async def listar_usuarios(
     ativo: Optional[bool] = None,
     role: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None
 ) -> List[Dict[str, Any]]:
-    db = get_db()
-    
-    query = db.table("usuarios").select("*").eq("empresa_id", empresa_id)
-    
-    if ativo is not None:
-        query = query.eq("ativo", ativo)
-    if role:
-        query = query.eq("role", role)
-    
-    query = query.order("nome").range(skip, skip + limit - 1)
-    
-    result = query.execute()
-    return result.data or []
+    async def carregar():
+        db = get_db()
+        
+        query = db.table("usuarios").select("*").eq("empresa_id", empresa_id)
+        
+        if ativo is not None:
+            query = query.eq("ativo", ativo)
+        if role:
+            query = query.eq("role", role)
+        
+        query = paginacao.paginar(query, ORDEM, cursor, skip, limit)
+        
+        result = await execute(query)
+        return result.data or []
+    
+    return await cache.lembrar("usuarios", empresa_id, {"ativo": ativo, "role": role, "skip": skip, "limit": limit, "cursor": cursor}, carregar)
 
 
 async def buscar_usuario(usuario_id: str, empresa_id: int = 1) -> Optional[Dict[str, Any]]:
-    db = get_db()
-    
-    result = db.table("usuarios").select("*").eq("id", usuario_id).eq("empresa_id", empresa_id).execute()
+    async def carregar():
+        db = get_db()
+        
+        result = await execute(db.table("usuarios").select("*").eq("id", usuario_id).eq("empresa_id", empresa_id))
+        
+        return result.data[0] if result.data else None
     
-    return result.data[0] if result.data else None
+    return await cache.lembrar("usuarios", empresa_id, {"id": usuario_id}, carregar)
 
 
 async def buscar_usuario_por_email(email: str) -> Optional[Dict[str, Any]]:
-    db = get_db()
-    
-    result = db.table("usuarios").select("*").eq("email", email).execute()
+    async def carregar():
+        db = get_db()
+        
+        result = await execute(db.table("usuarios").select("*").eq("email", email))
+        
+        return result.data[0] if result.data else None
     
-    return result.data[0] if result.data else None
+    return await cache.lembrar("usuarios", None, {"email": email}, carregar)
 
 
 async def buscar_usuario_por_auth_id(auth_user_id: str) -> Optional[Dict[str, Any]]:
-    db = get_db()
-    
-    result = db.table("usuarios").select("*").eq("auth_user_id", auth_user_id).execute()
+    async def carregar():
+        db = get_db()
+        
+        result = await execute(db.table("usuarios").select("*").eq("auth_user_id", auth_user_id))
+        
+        return result.data[0] if result.data else None
     
-    return result.data[0] if result.data else None
+    return await cache.lembrar("usuarios", None, {"auth_user_id": auth_user_id}, carregar)
 
 
 async def criar_usuario(usuario: Dict[str, Any]) -> Dict[str, Any]:
     db = get_db()
     
-    result = db.table("usuarios").insert(usuario).execute()
+    result = await execute(db.table("usuarios").insert(usuario))
+    await cache.invalidar("usuarios", usuario.get("empresa_id"))
     
     return result.data[0] if result.data else None
 
@@ -60,7 +78,8 @@ async def atualizar_usuario(usuario_id: str, data: Dict[str, Any], empresa_id: i
     db = get_db()
     
     if data:
-        result = db.table("usuarios").update(data).eq("id", usuario_id).eq("empresa_id", empresa_id).execute()
+        result = await execute(db.table("usuarios").update(data).eq("id", usuario_id).eq("empresa_id", empresa_id))
+        await cache.invalidar("usuarios", empresa_id)
         return result.data[0] if result.data else None
     
     return await buscar_usuario(usuario_id, empresa_id)
@@ -69,6 +88,7 @@ async def atualizar_usuario(usuario_id: str, data: Dict[str, Any], empresa_id: i
 async def deletar_usuario(usuario_id: str, empresa_id: int = 1) -> bool:
     db = get_db()
     
-    result = db.table("usuarios").delete().eq("id", usuario_id).eq("empresa_id", empresa_id).execute()
+    result = await execute(db.table("usuarios").delete().eq("id", usuario_id).eq("empresa_id", empresa_id))
+    await cache.invalidar("usuarios", empresa_id)
     
     return len(result.data) > 0 if result.data else False
@@ -0,0 +1,12 @@
+from typing import Dict, Any
+
+from api.database import get_db, execute
+
+
+async def versao_dados(tabela: str, empresa_id: int = 1) -> Dict[str, Any]:
+    """Contador de escritas da empresa na tabela e a hora da última (api/migrations/010_conditional_requests.sql)."""
+    db = get_db()
+    
+    result = await execute(db.rpc("versao_dados", {"tabela": tabela, "empresa_id_int": empresa_id}))
+    
+    return result.data[0] if result.data else {"versao": 0, "atualizado_em": None}
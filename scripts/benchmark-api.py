@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Benchmark da API contra um PostgREST falso com latência configurável.
+
+Uso:
+    python scripts/benchmark-api.py tarefas [--requests 200] [--concurrency 50] [--latency-ms 50]
+    python scripts/benchmark-api.py sprint [--tarefas 300] [--latency-ms 50]
+    python scripts/benchmark-api.py chat [--requests 20] [--ttft-ms 400] [--tokens 50] [--token-ms 20]
+
+Cenários:
+    tarefas  Throughput de GET /api/tarefas/ com as queries executadas
+             direto no event loop (antes) e no pool de threads do banco (depois)
+    sprint   POST /api/sprints/{id}/concluir numa sprint grande: um UPDATE por
+             tarefa (antes) e a RPC mover_tarefas_incompletas (depois)
+    chat     /api/chat contra um OpenRouter falso (SSE): um cliente HTTP por
+             mensagem esperando a resposta inteira (antes) e o cliente
+             compartilhado com streaming em /api/chat/stream (depois)
+"""
+import argparse
+import asyncio
+import http.server
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def tarefa_fake(tarefa_id: int, **extra) -> dict:
+    agora = datetime.now(timezone.utc).isoformat()
+    tarefa = {
+        "id": tarefa_id,
+        "empresa_id": 1,
+        "projeto_id": 1,
+        "titulo": f"Tarefa {tarefa_id}",
+        "descricao": "Descrição de exemplo para benchmark",
+        "descricao_html": None,
+        "coluna": "todo",
+        "prioridade": "media",
+        "estimativa_horas": None,
+        "estimativa_pontos": 3,
+        "prazo": None,
+        "data_conclusao": None,
+        "tempo_gasto_minutos": 0,
+        "responsaveis": [],
+        "created_by": None,
+        "cliente_nome": None,
+        "tarefa_pai_id": None,
+        "eh_subtarefa": False,
+        "ordem": tarefa_id,
+        "tags": [],
+        "status": "ativa",
+        "sprint_id": None,
+        "grupo_id": None,
+        "observadores": [],
+        "created_at": agora,
+        "updated_at": agora,
+    }
+    tarefa.update(extra)
+    return tarefa
+
+
+def sprint_fake(sprint_id: int, **extra) -> dict:
+    agora = datetime.now(timezone.utc).isoformat()
+    sprint = {
+        "id": sprint_id,
+        "empresa_id": 1,
+        "projeto_id": 1,
+        "nome": f"Sprint {sprint_id}",
+        "objetivo": None,
+        "data_inicio": "2026-01-01",
+        "data_fim": "2026-01-14",
+        "data_conclusao": None,
+        "status": "ativa",
+        "meta_pontos": None,
+        "pontos_concluidos": 0,
+        "ordem": sprint_id,
+        "created_at": agora,
+        "updated_at": agora,
+    }
+    sprint.update(extra)
+    return sprint
+
+
+class FakePostgrest:
+    """Servidor HTTP mínimo que responde como o PostgREST, com latência fixa."""
+
+    def __init__(self, latency: float, rows: int = 20):
+        self.latency = latency
+        self.rows = [tarefa_fake(i) for i in range(1, rows + 1)]
+        self.requests = 0
+        fake = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _responder(self):
+                fake.requests += 1
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                corpo = self.rfile.read(tamanho) if tamanho else b""
+                time.sleep(fake.latency)
+                dados = fake.handle(self.command, urlparse(self.path), corpo)
+                payload = json.dumps(dados).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _responder
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def handle(self, method: str, url, corpo: bytes):
+        return self.rows
+
+    def close(self) -> None:
+        self.server.shutdown()
+
+
+class FakeOpenRouter:
+    """
+    Upstream de chat completions compatível com o OpenRouter: com stream=true
+    responde em SSE, um delta a cada token_ms depois de ttft_ms.
+    """
+
+    def __init__(self, ttft: float, tokens: int, intervalo: float):
+        self.ttft = ttft
+        self.tokens = tokens
+        self.intervalo = intervalo
+        self.requests = 0
+        self.conexoes = 0
+        fake = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                fake.conexoes += 1
+                super().setup()
+
+            def _chunk(self, dados: bytes):
+                self.wfile.write(f"{len(dados):x}\r\n".encode() + dados + b"\r\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                fake.requests += 1
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                corpo = json.loads(self.rfile.read(tamanho) or b"{}")
+                partes = [f"tok{i} " for i in range(fake.tokens)]
+                time.sleep(fake.ttft)
+
+                if not corpo.get("stream"):
+                    time.sleep(fake.intervalo * fake.tokens)
+                    payload = json.dumps({
+                        "model": "fake/model",
+                        "choices": [{"message": {"role": "assistant", "content": "".join(partes)}}],
+                    }).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                self._chunk(b": OPENROUTER PROCESSING\n\n")
+                for parte in partes:
+                    evento = {"model": "fake/model", "choices": [{"delta": {"content": parte}}]}
+                    self._chunk(f"data: {json.dumps(evento)}\n\n".encode())
+                    time.sleep(fake.intervalo)
+                self._chunk(b"data: [DONE]\n\n")
+                self._chunk(b"")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}/api/v1/chat/completions"
+
+    def close(self) -> None:
+        self.server.shutdown()
+
+
+async def disparar(client, path: str, total: int, concurrency: int) -> float:
+    semaforo = asyncio.Semaphore(concurrency)
+
+    async def uma():
+        async with semaforo:
+            response = await client.get(path)
+            response.raise_for_status()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(uma() for _ in range(total)))
+    return time.perf_counter() - inicio
+
+
+async def cenario_tarefas(args) -> None:
+    import httpx
+    from api import database
+    from api.main import app
+
+    async def inline(fn, *a, **kw):
+        return fn(*a, **kw)
+
+    offload = database.run_sync
+    transport = httpx.ASGITransport(app=app)
+
+    for nome, run_sync in (("antes (bloqueante)", inline), ("depois (pool de threads)", offload)):
+        database.run_sync = run_sync
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.get("/api/tarefas/")
+            duracao = await disparar(client, "/api/tarefas/", args.requests, args.concurrency)
+        print(f"{nome:28s} {args.requests / duracao:8.1f} req/s  ({duracao:.2f}s)")
+
+    database.run_sync = offload
+
+
+async def cenario_sprint(args) -> None:
+    import httpx
+    from api import database
+    from api.main import app
+
+    fake = args.fake
+    tarefas = [
+        tarefa_fake(i, sprint_id=1, coluna="done" if i % 3 == 0 else "todo")
+        for i in range(1, args.tarefas + 1)
+    ]
+    incompletas = sum(1 for t in tarefas if t["coluna"] != "done")
+
+    def handle(method, url, corpo):
+        if url.path.endswith("/rpc/mover_tarefas_incompletas"):
+            return [{"proxima_sprint_id": 2, "proxima_sprint_nome": "Sprint 2",
+                     "tarefas_movidas": incompletas, "pontos_concluidos": 0}]
+        if url.path.endswith("/sprints"):
+            return [sprint_fake(1, status="concluida") if method == "PATCH" else sprint_fake(2, status="planejada")]
+        if method == "PATCH":
+            return tarefas[:1]
+        return tarefas
+
+    fake.handle = handle
+
+    async def concluir_antes():
+        # Fluxo anterior: pontos por varredura completa + um UPDATE por tarefa
+        db = database.get_db()
+        await database.execute(db.table("sprints").update({"status": "concluida"}).eq("id", 1))
+        done = await database.execute(db.table("tarefas").select("*").eq("sprint_id", 1).eq("coluna", "done"))
+        pontos = sum(t.get("estimativa_pontos", 0) or 0 for t in done.data)
+        await database.execute(db.table("sprints").update({"pontos_concluidos": pontos}).eq("id", 1))
+        await database.execute(db.table("sprints").select("*").eq("id", 1))
+        await database.execute(db.table("sprints").select("*").eq("status", "planejada").limit(1))
+        result = await database.execute(db.table("tarefas").select("*").eq("sprint_id", 1))
+        for tarefa in result.data:
+            if tarefa.get("coluna") != "done":
+                await database.execute(db.table("tarefas").update({"sprint_id": 2}).eq("id", tarefa["id"]))
+
+    async def concluir_depois():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            response = await client.post("/api/sprints/1/concluir")
+            response.raise_for_status()
+
+    print(f"sprint com {args.tarefas} tarefas ({incompletas} não concluídas)")
+    for nome, concluir in (("antes (UPDATE por tarefa)", concluir_antes), ("depois (RPC set-based)", concluir_depois)):
+        requests_antes = fake.requests
+        inicio = time.perf_counter()
+        await concluir()
+        duracao = time.perf_counter() - inicio
+        print(f"{nome:28s} {duracao * 1000:8.1f} ms  ({fake.requests - requests_antes} round-trips)")
+
+
+async def cenario_chat(args) -> None:
+    import httpx
+    from api.main import app
+    from api.services import llm
+
+    upstream = args.upstream
+    corpo = {"agente": "tech", "mensagem": "Olá", "historico": []}
+    semaforo = asyncio.Semaphore(args.concurrency)
+
+    async def antes():
+        # Fluxo anterior: um AsyncClient (e um handshake) por mensagem, resposta inteira
+        async with semaforo:
+            inicio = time.perf_counter()
+            async with httpx.AsyncClient(timeout=60.0) as client:
+                response = await client.post(upstream.url, json={"model": "x", "messages": []})
+                response.raise_for_status()
+            return time.perf_counter() - inicio
+
+    async def depois(client):
+        async with semaforo:
+            response = await client.post("/api/chat/stream", json=corpo)
+            response.raise_for_status()
+            fim = response.text.rsplit("event: fim\ndata: ", 1)[1]
+            return json.loads(fim)["ttft_ms"] / 1000
+
+    conexoes = upstream.conexoes
+    ttfts = sorted(await asyncio.gather(*(antes() for _ in range(args.requests))))
+    print(f"{'antes (sem streaming)':28s} TTFT p50 {ttfts[len(ttfts) // 2] * 1000:8.1f} ms  "
+          f"({upstream.conexoes - conexoes} conexões)")
+
+    conexoes = upstream.conexoes
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60.0) as client:
+        ttfts = sorted(await asyncio.gather(*(depois(client) for _ in range(args.requests))))
+    print(f"{'depois (streaming, pool)':28s} TTFT p50 {ttfts[len(ttfts) // 2] * 1000:8.1f} ms  "
+          f"({upstream.conexoes - conexoes} conexões)")
+    await llm.close_client()
+
+
+CENARIOS = {
+    "tarefas": cenario_tarefas,
+    "sprint": cenario_sprint,
+    "chat": cenario_chat,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cenario", choices=sorted(CENARIOS))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--tarefas", type=int, default=300)
+    parser.add_argument("--ttft-ms", type=float, default=400)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--token-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    fake = FakePostgrest(latency=args.latency_ms / 1000)
+    args.fake = fake
+    os.environ["SUPABASE_URL"] = fake.url
+    os.environ["SUPABASE_SERVICE_KEY"] = "benchmark"
+
+    upstream = FakeOpenRouter(args.ttft_ms / 1000, args.tokens, args.token_ms / 1000)
+    args.upstream = upstream
+    os.environ["OPENROUTER_API_URL"] = upstream.url
+    os.environ["OPENROUTER_API_KEY"] = "benchmark"
+
+    try:
+        asyncio.run(CENARIOS[args.cenario](args))
+    finally:
+        from api import database
+        database.close_db()
+        fake.close()
+        upstream.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Reconstrói os rollups financeiros (transacoes_rollup_diario / _mensal).
+
+Uso:
+    python scripts/rebuild-rollups.py [--empresa-id 1]
+
+Sem --empresa-id reconstrói todas as empresas. Necessário só para backfill
+ou correção: no dia a dia os rollups são mantidos pelos triggers da
+migration 005.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+async def reconstruir(empresa_id) -> None:
+    from api import database
+    from api.services import transacoes
+
+    try:
+        buckets = await transacoes.reconstruir_resumos(empresa_id)
+        alvo = f"empresa {empresa_id}" if empresa_id is not None else "todas as empresas"
+        print(f"Rollups reconstruídos ({alvo}): {buckets} buckets diários")
+    finally:
+        database.close_db()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--empresa-id", type=int, default=None)
+    args = parser.parse_args()
+
+    asyncio.run(reconstruir(args.empresa_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+
+# Antes de importar a API: database.py lê a configuração no import
+os.environ.setdefault("SUPABASE_URL", "http://supabase.teste")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "chave-de-teste")
+
+import httpx
+import pytest
+from supabase import create_client
+from supabase.lib.client_options import SyncClientOptions
+
+from api import database
+from api.schemas.contrato import ContratoResponse
+from api.schemas.sprint import SprintResponse
+from api.schemas.tarefa import TarefaResponse
+from api.schemas.transacao import TransacaoResponse
+from api.services import cache
+from tests.fake_postgrest import FakePostgrest
+
+
+def _colunas(schema, **padroes):
+    """Colunas do schema de resposta (com os defaults dele) e as que ele não expõe."""
+    colunas = {c: None if f.is_required() else f.get_default(call_default_factory=True) for c, f in schema.model_fields.items()}
+    return {**colunas, "embedding": None, "search_vector": None, **padroes}
+
+
+def _versao(fake, tabela, empresa_id):
+    """Como a função versao_dados (api/migrations/010_conditional_requests.sql)."""
+    linhas = [r for r in fake.tabelas.get(tabela, []) if r.get("empresa_id") == empresa_id]
+    # O trigger conta cada escrita; aqui, as linhas semeadas + as escritas pela API
+    escritas = sum(1 for metodo, t in fake.chamadas if t == tabela and metodo in ("POST", "PATCH", "DELETE"))
+    return {"versao": len(linhas) + escritas, "atualizado_em": max((r["updated_at"] for r in linhas), default=None)}
+
+
+PADROES = {
+    "tarefas": _colunas(
+        TarefaResponse, empresa_id=1, titulo="Tarefa", coluna="todo", prioridade="media",
+        tempo_gasto_minutos=0, responsaveis=[], eh_subtarefa=False, ordem=0
+    ),
+    "contratos": _colunas(
+        ContratoResponse, empresa_id=1, titulo="Contrato", tipo="servico", status="ativo",
+        renovacao_automatica=False, periodo_aviso_renovacao=30
+    ),
+    "transacoes": _colunas(
+        TransacaoResponse, empresa_id=1, tipo="despesa", valor=0.0, status="pendente", recorrente=False
+    ),
+    "sprints": _colunas(SprintResponse, empresa_id=1, status="planejada", pontos_concluidos=0, ordem=0),
+}
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def banco(monkeypatch):
+    """PostgREST falso no lugar do cliente Supabase compartilhado."""
+    fake = FakePostgrest()
+    fake.padroes.update(PADROES)
+    fake.rpcs["versao_dados"] = lambda params: [_versao(fake, params["tabela"], params["empresa_id_int"])]
+    http = httpx.Client(transport=fake.transport())
+    cliente = create_client(
+        database.SUPABASE_URL,
+        database.SUPABASE_SERVICE_KEY,
+        options=SyncClientOptions(httpx_client=http),
+    )
+    monkeypatch.setattr(database, "_client", cliente)
+    # Caches novos por teste: nada lido num teste vale para o seguinte
+    monkeypatch.setattr(cache, "cache", cache.ReadCache())
+    monkeypatch.setattr(cache, "compartilhado", cache.MemoryBackend())
+    yield fake
+    http.close()
+
+
+@pytest.fixture
+async def api(banco):
+    """Cliente HTTP da API (sem lifespan: nada de filas em segundo plano)."""
+    from api.main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://teste") as cliente:
+        yield cliente
@@ -0,0 +1,221 @@
+"""
+PostgREST em memória para os testes: responde às chamadas do supabase-py
+por um httpx.MockTransport, com tabelas em listas de dicts e RPCs
+registradas pelo teste. Cobre só o que a API usa (filtros simples, or/and,
+ordem, limite, insert/upsert/update/delete com return=representation).
+"""
+from typing import List, Optional, Dict, Any, Callable, Tuple
+from datetime import datetime, timezone
+from urllib.parse import unquote
+import copy
+import json
+
+import httpx
+
+
+def _texto(valor: Any) -> str:
+    if valor is None:
+        return "null"
+    if isinstance(valor, bool):
+        return "true" if valor else "false"
+    return str(valor)
+
+
+def _comparar(valor: Any, alvo: str) -> Optional[int]:
+    if valor is None:
+        return None
+    try:
+        a, b = float(valor), float(alvo)
+    except (TypeError, ValueError):
+        a, b = _texto(valor), alvo
+    return (a > b) - (a < b)
+
+
+def _separar(texto: str) -> List[str]:
+    """Divide "a.eq.1,or(b.eq.2,c.is.null)" nas vírgulas de nível zero."""
+    partes, nivel, aspas, atual = [], 0, False, ""
+    for ch in texto:
+        if ch == '"':
+            aspas = not aspas
+        elif not aspas and ch == "(":
+            nivel += 1
+        elif not aspas and ch == ")":
+            nivel -= 1
+        elif not aspas and nivel == 0 and ch == ",":
+            partes.append(atual)
+            atual = ""
+            continue
+        atual += ch
+    partes.append(atual)
+    return partes
+
+
+def _condicao(coluna: str, expressao: str) -> Callable[[Dict[str, Any]], bool]:
+    negar = expressao.startswith("not.")
+    if negar:
+        expressao = expressao[4:]
+    op, _, alvo = expressao.partition(".")
+    alvo = alvo.strip('"')
+
+    def testar(row: Dict[str, Any]) -> bool:
+        valor = row.get(coluna)
+        if op == "eq":
+            ok = _texto(valor) == alvo
+        elif op == "neq":
+            ok = _texto(valor) != alvo
+        elif op in ("gt", "gte", "lt", "lte"):
+            c = _comparar(valor, alvo)
+            ok = c is not None and {"gt": c > 0, "gte": c >= 0, "lt": c < 0, "lte": c <= 0}[op]
+        elif op == "is":
+            ok = valor is None if alvo == "null" else _texto(valor) == alvo
+        elif op == "in":
+            ok = _texto(valor) in [v.strip().strip('"') for v in alvo.strip("()").split(",")]
+        elif op == "cs":
+            itens = json.loads("[" + alvo.strip("{}[]") + "]") if alvo.strip("{}[]") else []
+            ok = all(i in (valor or []) for i in itens)
+        else:
+            raise ValueError(f"Operador não suportado no PostgREST falso: {op}")
+        return not ok if negar else ok
+
+    return testar
+
+
+def _logica(op: str, corpo: str) -> Callable[[Dict[str, Any]], bool]:
+    condicoes = []
+    for parte in _separar(corpo):
+        if parte.startswith(("or(", "and(")):
+            sub = parte[:parte.index("(")]
+            condicoes.append(_logica(sub, parte[len(sub) + 1:-1]))
+        else:
+            coluna, _, expressao = parte.partition(".")
+            condicoes.append(_condicao(coluna, expressao))
+    if op == "or":
+        return lambda row: any(c(row) for c in condicoes)
+    return lambda row: all(c(row) for c in condicoes)
+
+
+class FakePostgrest:
+    """
+    Banco falso. `tabelas` guarda as linhas; `padroes` os valores das
+    colunas omitidas num insert; `rpcs` mapeia nome -> função (params) ->
+    resultado; `chamadas` registra (método, tabela ou rpc) de cada
+    requisição, na ordem.
+    """
+
+    def __init__(self):
+        self.tabelas: Dict[str, List[Dict[str, Any]]] = {}
+        self.padroes: Dict[str, Dict[str, Any]] = {}
+        self.rpcs: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        self.chamadas: List[Tuple[str, str]] = []
+        self._ids: Dict[str, int] = {}
+
+    def inserir(self, tabela: str, **linha: Any) -> Dict[str, Any]:
+        """Semeia uma linha (com id, timestamps e padrões da tabela se faltarem)."""
+        linhas = self.tabelas.setdefault(tabela, [])
+        linha = {**copy.deepcopy(self.padroes.get(tabela, {})), **linha}
+        # Como os defaults do banco: id da sequência e timestamps de agora
+        if linha.get("id") is None:
+            self._ids[tabela] = max([self._ids.get(tabela, 0)] + [r["id"] for r in linhas if isinstance(r.get("id"), int)]) + 1
+            linha["id"] = self._ids[tabela]
+        agora = datetime.now(timezone.utc).isoformat()
+        for coluna in ("created_at", "updated_at"):
+            if linha.get(coluna) is None:
+                linha[coluna] = agora
+        linhas.append(linha)
+        return linha
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self._responder)
+
+    def _responder(self, request: httpx.Request) -> httpx.Response:
+        partes = request.url.path.split("/rest/v1/", 1)[-1].split("/")
+        corpo = json.loads(request.content) if request.content else None
+
+        if partes[0] == "rpc":
+            nome = partes[1]
+            self.chamadas.append(("rpc", nome))
+            if nome not in self.rpcs:
+                return httpx.Response(404, json={
+                    "code": "PGRST202", "message": f"Could not find the function public.{nome}", "details": None, "hint": None
+                })
+            return httpx.Response(200, json=self.rpcs[nome](corpo or {}))
+
+        tabela = partes[0]
+        self.chamadas.append((request.method, tabela))
+        linhas = self.tabelas.setdefault(tabela, [])
+        params = list(request.url.params.multi_items())
+        filtro = self._filtro(params)
+
+        if request.method == "GET":
+            resultado = [r for r in linhas if filtro(r)]
+            resultado = self._ordenar(resultado, params)
+        elif request.method == "POST":
+            novos = corpo if isinstance(corpo, list) else [corpo]
+            prefer = request.headers.get("prefer", "")
+            conflito = dict(params).get("on_conflict")
+            resultado = []
+            for novo in novos:
+                existente = None
+                if "resolution=" in prefer and conflito:
+                    chaves = conflito.split(",")
+                    existente = next((r for r in linhas if all(r.get(c) == novo.get(c) for c in chaves)), None)
+                if existente is not None:
+                    existente.update(novo)
+                    resultado.append(existente)
+                else:
+                    resultado.append(self.inserir(tabela, **dict(novo)))
+        elif request.method == "PATCH":
+            resultado = [r for r in linhas if filtro(r)]
+            for r in resultado:
+                r.update(corpo or {})
+        elif request.method == "DELETE":
+            resultado = [r for r in linhas if filtro(r)]
+            self.tabelas[tabela] = [r for r in linhas if not filtro(r)]
+        else:
+            return httpx.Response(405)
+
+        total = len(resultado)
+        resultado = self._paginar(resultado, params)
+        headers = {"content-range": f"0-{max(len(resultado) - 1, 0)}/{total}"}
+        return httpx.Response(201 if request.method == "POST" else 200, json=self._projetar(resultado, params), headers=headers)
+
+    @staticmethod
+    def _filtro(params: List[Tuple[str, str]]) -> Callable[[Dict[str, Any]], bool]:
+        condicoes = []
+        for chave, valor in params:
+            if chave in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+                continue
+            if chave in ("or", "and"):
+                condicoes.append(_logica(chave, unquote(valor)[1:-1]))
+            else:
+                condicoes.append(_condicao(chave, valor))
+        return lambda row: all(c(row) for c in condicoes)
+
+    @staticmethod
+    def _ordenar(linhas: List[Dict[str, Any]], params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        ordem = dict(params).get("order")
+        if not ordem:
+            return linhas
+        for item in reversed(ordem.split(",")):
+            coluna, *mods = item.split(".")
+            linhas = sorted(
+                linhas,
+                key=lambda r: (r.get(coluna) is None, _texto(r.get(coluna)) if not isinstance(r.get(coluna), (int, float)) else r.get(coluna)),
+                reverse="desc" in mods
+            )
+        return linhas
+
+    @staticmethod
+    def _paginar(linhas: List[Dict[str, Any]], params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        p = dict(params)
+        inicio = int(p.get("offset", 0))
+        fim = inicio + int(p["limit"]) if "limit" in p else None
+        return linhas[inicio:fim]
+
+    @staticmethod
+    def _projetar(linhas: List[Dict[str, Any]], params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        select = dict(params).get("select", "*")
+        colunas = [c.strip() for c in _separar(select) if c.strip()]
+        if not colunas or "*" in colunas:
+            return [dict(r) for r in linhas]
+        return [{c: r.get(c) for c in colunas} for r in linhas]
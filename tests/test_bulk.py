@@ -0,0 +1,43 @@
+"""Operações em lote devolvem as linhas sem as colunas internas (embedding, search_vector)."""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+INTERNAS = {"embedding", "search_vector"}
+
+NOVOS = {
+    "tarefas": [{"titulo": "Primeira"}, {"titulo": "Segunda"}],
+    "contratos": [{"titulo": "Aluguel"}, {"titulo": "Limpeza"}],
+    "transacoes": [{"tipo": "despesa", "valor": 10.0}, {"tipo": "receita", "valor": 25.5}],
+}
+
+MOVER = {
+    "tarefas": ("/api/tarefas/bulk/mover", {"coluna": "done"}),
+    "contratos": ("/api/contratos/bulk/status", {"status": "encerrado"}),
+    "transacoes": ("/api/transacoes/bulk/status", {"status": "pago"}),
+}
+
+
+@pytest.mark.parametrize("tabela", NOVOS)
+@pytest.mark.parametrize("atomico", [False, True])
+async def test_criar_em_lote_sem_colunas_internas(api, banco, tabela, atomico):
+    response = await api.post(f"/api/{tabela}/bulk", params={"atomico": atomico}, json=NOVOS[tabela])
+
+    assert response.status_code == 200
+    itens = response.json()["itens"]
+    assert len(itens) == 2
+    assert all(INTERNAS.isdisjoint(item) for item in itens)
+    assert all("id" in item and "empresa_id" in item for item in itens)
+
+
+@pytest.mark.parametrize("tabela", MOVER)
+async def test_mover_em_lote_sem_colunas_internas(api, banco, tabela):
+    ids = [banco.inserir(tabela, embedding=[0.5] * 3, search_vector="'a':1")["id"] for _ in range(3)]
+    rota, dados = MOVER[tabela]
+
+    response = await api.post(rota, json={"ids": ids, **dados})
+
+    assert response.status_code == 200
+    itens = response.json()["itens"]
+    assert sorted(item["id"] for item in itens) == ids
+    assert all(INTERNAS.isdisjoint(item) for item in itens)
@@ -0,0 +1,65 @@
+"""ETag das rotas com corpo vindo do cache: o corpo é sempre o da versão do ETag."""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def versao(banco):
+    """versao_dados falso; o teste muda o dict para simular escritas."""
+    atual = {"versao": 1, "atualizado_em": "2026-10-01T12:00:00+00:00"}
+    banco.rpcs["versao_dados"] = lambda params: [dict(atual)]
+    return atual
+
+
+def sprint(banco, **campos):
+    return banco.inserir("sprints", nome="Sprint 1", data_inicio="2026-10-01", data_fim="2026-10-14", **campos)
+
+
+def selects(banco):
+    return banco.chamadas.count(("GET", "sprints"))
+
+
+@pytest.mark.parametrize("rota", ["/api/sprints/", "/api/sprints/ativa"])
+async def test_escrita_sem_invalidacao_nao_fica_presa_no_etag_novo(api, banco, versao, rota):
+    ativa = sprint(banco, status="ativa")
+
+    primeira = await api.get(rota)
+    await api.get(rota)
+    assert selects(banco) == 1
+
+    # Escrita feita por outro worker: o cache local ainda tem o corpo antigo
+    ativa["nome"] = "Sprint 1 (renomeada)"
+    versao.update(versao=2, atualizado_em="2026-10-01T12:05:00+00:00")
+
+    segunda = await api.get(rota, headers={"If-None-Match": primeira.headers["etag"]})
+
+    assert segunda.status_code == 200
+    assert segunda.headers["etag"] != primeira.headers["etag"]
+    assert "Sprint 1 (renomeada)" in segunda.text
+    assert selects(banco) == 2
+
+
+async def test_mesma_versao_usa_o_cache_e_responde_304(api, banco, versao):
+    sprint(banco)
+
+    primeira = await api.get("/api/sprints/")
+    repetida = await api.get("/api/sprints/")
+    condicional = await api.get("/api/sprints/", headers={"If-None-Match": primeira.headers["etag"]})
+
+    assert repetida.json() == primeira.json()
+    assert condicional.status_code == 304
+    assert selects(banco) == 1
+
+
+async def test_escrita_com_o_mesmo_updated_at_muda_o_etag(api, banco, versao):
+    # Escrita que terminou depois da leitura mas com updated_at anterior
+    # (hora de início da transação): só o contador percebe
+    sprint(banco)
+
+    primeira = await api.get("/api/sprints/")
+    versao.update(versao=2)
+    segunda = await api.get("/api/sprints/", headers={"If-None-Match": primeira.headers["etag"]})
+
+    assert segunda.status_code == 200
+    assert segunda.headers["etag"] != primeira.headers["etag"]
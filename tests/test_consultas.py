@@ -0,0 +1,101 @@
+"""Teto de chamadas ao banco por endpoint: um N+1 novo quebra estes testes."""
+from datetime import date
+
+import pytest
+
+from api.services import consultas, contratos
+from api.services.consultas import assert_max_queries
+from api.services.tarefas import buscar_tarefa
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def sprints(banco):
+    banco.inserir("sprints", nome="Sprint 1", data_inicio="2026-10-01", data_fim="2026-10-14", status="ativa")
+    banco.inserir("sprints", nome="Sprint 2", data_inicio="2026-10-15", data_fim="2026-10-28")
+    for i in range(6):
+        banco.inserir("tarefas", titulo=f"Tarefa {i}", sprint_id=1, estimativa_pontos=3, coluna="done" if i < 2 else "todo")
+
+    def mover(params):
+        # O que a RPC da migration 006 faz, numa transação só
+        pendentes = [t for t in banco.tabelas["tarefas"] if t["sprint_id"] == params["sprint_id_int"] and t["coluna"] != "done"]
+        for tarefa in pendentes:
+            tarefa["sprint_id"] = 2
+        return [{"empresa_id": 1, "proxima_sprint_id": 2, "proxima_sprint_nome": "Sprint 2", "tarefas_movidas": len(pendentes), "pontos_concluidos": 6}]
+
+    banco.rpcs["mover_tarefas_incompletas"] = mover
+    banco.rpcs["atualizar_pontos_sprint"] = lambda params: 6
+    return banco
+
+
+async def test_concluir_sprint_move_tarefas_sem_n_mais_1(api, sprints):
+    with assert_max_queries(2) as requisicoes:
+        response = await api.post("/api/sprints/1/concluir")
+
+    assert response.status_code == 200
+    assert response.json()["pontos_concluidos"] == 6
+    assert [t["sprint_id"] for t in sprints.tabelas["tarefas"]] == [1, 1, 2, 2, 2, 2]
+    # As tarefas mudam de sprint na RPC, não uma a uma
+    assert ("PATCH", "tarefas") not in sprints.chamadas
+    assert requisicoes[0].rotulo == "POST /api/sprints/{sprint_id}/concluir"
+
+
+async def test_concluir_sprint_sem_mover_tarefas(api, sprints):
+    with assert_max_queries(2):
+        response = await api.post("/api/sprints/1/concluir", params={"mover_tarefas": "false"})
+
+    assert response.status_code == 200
+    assert response.json()["pontos_concluidos"] == 6
+
+
+async def test_adicionar_renovacao(banco):
+    banco.inserir("contratos", titulo="Manutenção", valor=1000.0, data_inicio="2025-01-01", data_fim="2025-12-31")
+
+    with assert_max_queries(3):
+        renovacao = await contratos.adicionar_renovacao(1, date(2026, 1, 1), date(2026, 12, 31), 1100.0)
+
+    assert renovacao["percentual_aumento"] == pytest.approx(10.0)
+    assert banco.tabelas["contratos"][0]["valor"] == 1100.0
+
+
+@pytest.mark.parametrize("tabela, url, dados", [
+    ("tarefas", "/api/tarefas/1", {"titulo": "Outro título", "prioridade": "alta"}),
+    ("contratos", "/api/contratos/1", {"titulo": "Outro título"}),
+    ("transacoes", "/api/transacoes/1", {"descricao": "Outra descrição"}),
+])
+async def test_atualizar(api, banco, tabela, url, dados):
+    banco.inserir(tabela)
+
+    with assert_max_queries(1):
+        response = await api.patch(url, json=dados)
+    assert response.status_code == 200
+
+    # Sem campos: cai para a busca, ainda numa chamada só
+    with assert_max_queries(1):
+        response = await api.patch(url, json={})
+    assert response.status_code == 200
+
+    assert banco.chamadas == [("PATCH", tabela), ("GET", tabela)]
+
+
+async def test_assert_max_queries_aponta_o_excesso(banco):
+    for _ in range(3):
+        banco.inserir("tarefas")
+
+    with pytest.raises(AssertionError, match=r"3 consultas ao banco \(máximo 2\): tarefas/select x3"):
+        with assert_max_queries(2):
+            for tarefa_id in (1, 2, 3):
+                await buscar_tarefa(tarefa_id)
+
+
+async def test_aviso_de_orcamento_e_n_mais_1(api, sprints, monkeypatch, capsys):
+    monkeypatch.setattr(consultas, "DB_CONSULTAS_MAX", 1)
+    await api.post("/api/sprints/1/concluir")
+    assert "[WARN] POST /api/sprints/{sprint_id}/concluir: 2 consultas ao banco" in capsys.readouterr().out
+
+    contagem = consultas.Contagem("GET /api/exemplo")
+    for _ in range(consultas.DB_CONSULTAS_REPETIDAS):
+        contagem.registrar("tarefas", "select", 0.001)
+    consultas.encerrar(contagem, "/api/exemplo")
+    assert "Possível N+1 em GET /api/exemplo: tarefas/select chamada 5 vezes" in capsys.readouterr().out
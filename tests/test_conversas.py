@@ -0,0 +1,34 @@
+"""Resumo em segundo plano das conversas dentro da admissão do agente."""
+import pytest
+
+from api.services import admissao, conversas, llm
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_resumo_segura_vaga_do_agente_com_prioridade_baixa(banco, monkeypatch):
+    controle = admissao.Admissao(maximo=8, por_agente=2, limites={})
+    monkeypatch.setattr(admissao, "controle", controle)
+    durante = {}
+    entrar = controle.entrar
+
+    async def entrar_registrando(agente, prioridade=admissao.PRIORIDADE_PADRAO):
+        durante["prioridade"] = prioridade
+        return await entrar(agente, prioridade)
+
+    monkeypatch.setattr(controle, "entrar", entrar_registrando)
+
+    async def completar(messages, model=None, max_tokens=None):
+        durante["ativos"] = dict(controle.ativos_agente)
+        return "resumo"
+
+    monkeypatch.setattr(llm, "completar", completar)
+    conversa = banco.inserir("conversas", agente="ops", resumo=None, resumo_ate_id=0)
+    ultima = banco.inserir("mensagens", conversa_id=conversa["id"], role="user", conteudo="oi")
+
+    await conversas._resumir(conversa, ultima["id"])
+
+    assert durante["ativos"] == {"ops": 1}
+    assert durante["prioridade"] == admissao.PRIORIDADE_SEGUNDO_PLANO
+    assert controle.ativos_agente["ops"] == 0
+    assert conversa["resumo"] == "resumo"
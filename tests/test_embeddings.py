@@ -0,0 +1,191 @@
+"""Provedor local de embeddings, fallback sem provedor e backfill pela fila."""
+import math
+
+import pytest
+
+from api.services import embeddings, search
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def sem_provedor(monkeypatch):
+    """Como em produção sem EMBEDDING_API_KEY."""
+    monkeypatch.setattr(embeddings, "EMBEDDING_PROVIDER", "")
+    monkeypatch.setattr(embeddings, "_provider", None)
+    monkeypatch.setattr(embeddings, "fila", embeddings.EmbeddingQueue())
+    monkeypatch.setattr(search, "_avisado_sem_provedor", False)
+    embeddings._query_cache.clear()
+
+
+@pytest.fixture
+def local(sem_provedor):
+    embeddings.set_provider(embeddings.LocalEmbeddingProvider())
+    yield embeddings.get_provider()
+    embeddings.set_provider(None)
+
+
+def cosseno(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+async def test_local_e_deterministico_e_normalizado():
+    provedor = embeddings.LocalEmbeddingProvider()
+
+    a, b = await provedor.embed(["Revisar contrato de aluguel", "Revisar contrato de aluguel"])
+
+    assert a == b
+    assert len(a) == embeddings.EMBEDDING_DIMENSIONS
+    assert math.isclose(math.sqrt(sum(v * v for v in a)), 1.0)
+    assert provedor.vetor("") == [0.0] * embeddings.EMBEDDING_DIMENSIONS
+
+
+async def test_local_aproxima_textos_com_as_mesmas_palavras():
+    provedor = embeddings.LocalEmbeddingProvider()
+
+    consulta = provedor.vetor("renovação do contrato")
+    parecido = provedor.vetor("Renovacao do contrato de aluguel")
+    diferente = provedor.vetor("pagar fatura de energia")
+
+    assert cosseno(consulta, parecido) > cosseno(consulta, diferente)
+
+
+async def test_local_so_quando_pedido(sem_provedor, monkeypatch):
+    assert not embeddings.disponivel()
+    assert embeddings.status()["provider"] is None
+
+    monkeypatch.setattr(embeddings, "EMBEDDING_PROVIDER", "local")
+    assert embeddings.get_provider().nome == "local:hash-v1"
+
+
+async def test_sem_provedor_nao_gera_nem_agenda(sem_provedor):
+    assert await embeddings.gerar_embedding("contrato") is None
+
+    embeddings.agendar("tarefa", {"id": 1, "empresa_id": 1, "titulo": "Tarefa"})
+
+    assert embeddings.fila.pendentes() == 0
+
+
+@pytest.mark.parametrize("modo", ["hibrido", "vetorial"])
+async def test_busca_sem_provedor_cai_para_texto(banco, api, sem_provedor, capsys, modo):
+    banco.rpcs["buscar_tarefas_texto"] = lambda params: [
+        {"id": 1, "titulo": "Contrato novo", "prioridade": "alta", "similaridade": 0.8}
+    ]
+    banco.rpcs["buscar_contratos_texto"] = lambda params: []
+
+    for _ in range(2):
+        response = await api.post("/api/search/", params={"query": "contrato", "modo": modo})
+
+    assert response.status_code == 200
+    assert response.json()["metadata"]["modo"] == "texto"
+    assert [r["id"] for r in response.json()["results"]] == [1]
+    assert {nome for _, nome in banco.chamadas} == {"buscar_tarefas_texto", "buscar_contratos_texto"}
+    # Um aviso só, não um por requisição
+    assert capsys.readouterr().out.count("[WARN] Busca") == 1
+
+
+async def test_reindexar_sem_provedor_responde_503(api, sem_provedor):
+    response = await api.post("/api/search/embeddings/reindexar")
+
+    assert response.status_code == 503
+
+
+@pytest.fixture
+def aplicados(banco):
+    """aplicar_embeddings falso: grava nas linhas de origem e devolve os itens recebidos."""
+    tabelas = {tipo: config["tabela"] for tipo, config in embeddings.ENTIDADES.items()}
+    recebidos = []
+
+    def aplicar(params):
+        recebidos.extend(params["itens"])
+        for item in params["itens"]:
+            for row in banco.tabelas[tabelas[item["entidade_tipo"]]]:
+                if row["id"] == item["entidade_id"]:
+                    row["embedding"] = item["embedding"]
+
+    banco.rpcs["aplicar_embeddings"] = aplicar
+    return recebidos
+
+
+async def test_backfill_indexa_todas_as_empresas_pela_fila(banco, local, aplicados):
+    for i in range(5):
+        banco.inserir("tarefas", titulo=f"Tarefa {i}", empresa_id=1 + i % 2)
+    banco.inserir("tarefas", titulo="Já indexada", embedding=[0.0])
+
+    assert await embeddings.reindexar_pendentes("tarefa", None, pagina=2, aguardar=True) == 5
+
+    assert all(row["embedding"] is not None for row in banco.tabelas["tarefas"])
+    assert embeddings.fila.pendentes() == 0
+    assert embeddings.fila.stats["embedados"] == 5
+    # Uma página de cada vez: leitura, cache e aplicação antes da próxima leitura
+    assert banco.chamadas[:4] == [
+        ("GET", "tarefas"), ("GET", "embeddings_cache"), ("rpc", "aplicar_embeddings"), ("GET", "tarefas")
+    ]
+
+
+async def test_backfill_aplica_o_vetor_do_cache_na_linha_sem_embedding(banco, local, aplicados):
+    # Cache em dia para o texto, mas a linha de origem ficou sem o vetor
+    tarefa = banco.inserir("tarefas", titulo="Revisar contrato")
+    texto = embeddings.texto_entidade("tarefa", tarefa)
+    banco.inserir(
+        "embeddings_cache", entidade_tipo="tarefa", entidade_id=tarefa["id"],
+        texto_hash=embeddings.texto_hash(texto), embedding=[0.5]
+    )
+
+    assert await embeddings.reindexar_pendentes("tarefa", None, aguardar=True) == 1
+
+    assert tarefa["embedding"] == [0.5]
+    assert embeddings.fila.stats["embedados"] == 0
+    assert embeddings.fila.stats["inalterados"] == 0
+
+
+async def test_edicao_sem_mudar_o_texto_nao_reaplica(banco, local, aplicados):
+    tarefa = banco.inserir("tarefas", titulo="Revisar contrato", embedding=[0.5])
+    texto = embeddings.texto_entidade("tarefa", tarefa)
+    banco.inserir(
+        "embeddings_cache", entidade_tipo="tarefa", entidade_id=tarefa["id"],
+        texto_hash=embeddings.texto_hash(texto), embedding=[0.5]
+    )
+
+    embeddings.agendar("tarefa", tarefa)
+    await embeddings.fila.flush()
+
+    assert aplicados == []
+    assert embeddings.fila.stats["inalterados"] == 1
+
+
+async def test_backfill_so_em_um_worker(banco, local, aplicados):
+    from api.services import cache
+
+    banco.inserir("tarefas", titulo="Sem embedding")
+    await cache.compartilhado.set(embeddings._chave_backfill(), "outro-worker", 60, nx=True)
+
+    await embeddings._backfill_todos()
+    assert aplicados == []
+
+    await cache.compartilhado.delete(embeddings._chave_backfill())
+    await embeddings._backfill_todos()
+    assert len(aplicados) == 1
+    assert await cache.compartilhado.get(embeddings._chave_backfill()) is None
+
+
+async def test_hibrido_aplica_o_threshold_em_cada_estagio(banco, api, local):
+    recebidos = {}
+
+    def estagio(nome, linhas):
+        def rpc(params):
+            recebidos[nome] = params["relevancia_minima"]
+            return [r for r in linhas if r["similaridade"] >= params["relevancia_minima"]]
+        return rpc
+
+    # Em primeiro lugar só no estágio textual: RRF normalizado ~0.5, abaixo do threshold
+    banco.rpcs["buscar_tarefas_texto"] = estagio("texto", [
+        {"id": 1, "titulo": "Contrato novo", "prioridade": "baixa", "relevancia": 0.9, "similaridade": 0.9},
+        {"id": 2, "titulo": "Outro", "prioridade": "baixa", "relevancia": 0.2, "similaridade": 0.2},
+    ])
+    banco.rpcs["buscar_tarefas_vetorial"] = estagio("vetorial", [])
+
+    response = await api.post("/api/search/tarefas", params={"query": "contrato", "threshold": 0.6})
+
+    assert [r["id"] for r in response.json()] == [1]
+    assert recebidos == {"texto": 0.6, "vetorial": 0.6}
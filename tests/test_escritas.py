@@ -0,0 +1,67 @@
+"""Escritas e listagens de contratos e transações sem as colunas internas."""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+VETOR = [0.1, 0.2]
+
+NOVOS = {
+    "contratos": {"titulo": "Aluguel"},
+    "transacoes": {"tipo": "despesa", "valor": 10.0},
+}
+
+EDICOES = {
+    "contratos": {"titulo": "Aluguel da sala"},
+    "transacoes": {"descricao": "Energia"},
+}
+
+FORA_DA_LISTA = {
+    "contratos": {"descricao"},
+    "transacoes": {"descricao_detalhada", "observacoes"},
+}
+
+
+@pytest.mark.parametrize("tabela", NOVOS)
+async def test_criar_nao_devolve_embedding(api, banco, tabela):
+    # Como se o banco preenchesse a coluna na própria escrita
+    banco.padroes[tabela].update(embedding=VETOR, search_vector="'a':1")
+
+    response = await api.post(f"/api/{tabela}/", json=NOVOS[tabela])
+
+    assert response.status_code == 201
+    assert response.json()["embedding"] is None
+
+
+@pytest.mark.parametrize("tabela", EDICOES)
+async def test_atualizar_nao_devolve_embedding(api, banco, tabela):
+    linha = banco.inserir(tabela, embedding=VETOR, search_vector="'a':1")
+
+    response = await api.patch(f"/api/{tabela}/{linha['id']}", json=EDICOES[tabela])
+
+    assert response.status_code == 200
+    assert response.json()["embedding"] is None
+
+
+@pytest.mark.parametrize("tabela", FORA_DA_LISTA)
+async def test_listagem_sem_textos_longos(api, banco, tabela):
+    banco.inserir(tabela, embedding=VETOR, **{c: "texto longo" for c in FORA_DA_LISTA[tabela]})
+
+    lista = (await api.get(f"/api/{tabela}/")).json()
+    detalhe = (await api.get(f"/api/{tabela}/{lista[0]['id']}")).json()
+
+    assert FORA_DA_LISTA[tabela].isdisjoint(lista[0])
+    assert "embedding" not in lista[0]
+    assert all(detalhe[c] == "texto longo" for c in FORA_DA_LISTA[tabela])
+
+
+@pytest.mark.parametrize("tabela, preset, campo", [
+    ("contratos", "resumo", "contraparte_nome"),
+    ("transacoes", "extrato", "data_vencimento"),
+])
+async def test_presets_de_projecao(api, banco, tabela, preset, campo):
+    banco.inserir(tabela)
+
+    item = (await api.get(f"/api/{tabela}/", params={"fields": preset})).json()[0]
+
+    assert campo in item
+    assert "created_by" not in item
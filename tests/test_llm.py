@@ -0,0 +1,153 @@
+"""Cliente do OpenRouter contra um SSE falso servido por httpx.MockTransport."""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from api.services import llm
+
+pytestmark = pytest.mark.anyio
+
+
+class CorpoSSE(httpx.AsyncByteStream):
+    """Corpo entregue em pedaços, com uma pausa antes de cada um."""
+
+    def __init__(self, pedacos, pausa: float = 0.0):
+        self.pedacos = pedacos
+        self.pausa = pausa
+
+    async def __aiter__(self):
+        for pedaco in self.pedacos:
+            if self.pausa:
+                await asyncio.sleep(self.pausa)
+            yield pedaco.encode()
+
+
+def evento(dados) -> str:
+    return f"data: {json.dumps(dados)}\n\n"
+
+
+def delta(texto: str, modelo: str = "anthropic/claude-3.5-haiku") -> str:
+    return evento({"model": modelo, "choices": [{"delta": {"content": texto}}]})
+
+
+@pytest.fixture
+def provedor(monkeypatch):
+    """Troca o cliente compartilhado; o teste define `responder(request)`."""
+    monkeypatch.setenv("OPENROUTER_API_KEY", "chave-de-teste")
+    monkeypatch.setattr(llm, "metricas", llm.LLMMetrics())
+    estado = {"requests": [], "responder": None}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        estado["requests"].append(json.loads(request.content))
+        return estado["responder"](request)
+
+    cliente = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(llm, "_client", cliente)
+    return estado
+
+
+async def coletar(iterador):
+    return [parte async for parte in iterador]
+
+
+async def test_stream_repassa_deltas_em_ordem(provedor):
+    provedor["responder"] = lambda request: httpx.Response(200, stream=CorpoSSE([
+        delta("Olá"),
+        # Linha partida entre dois pedaços da rede
+        delta(", ")[:20], delta(", ")[20:],
+        delta("mundo") + "data: [DONE]\n\n",
+    ]))
+    tempos = {}
+
+    partes = await coletar(llm.stream([{"role": "user", "content": "oi"}], model="anthropic/claude-3.5-haiku", tempos=tempos))
+
+    assert partes == ["Olá", ", ", "mundo"]
+    assert tempos["modelo"] == "anthropic/claude-3.5-haiku"
+    assert provedor["requests"][0]["stream"] is True
+    assert provedor["requests"][0]["model"] == "anthropic/claude-3.5-haiku"
+    assert llm.metricas.contadores["deltas"] == 3
+
+
+async def test_stream_ignora_comentarios_de_keep_alive(provedor):
+    provedor["responder"] = lambda request: httpx.Response(200, stream=CorpoSSE([
+        ": OPENROUTER PROCESSING\n\n",
+        ": OPENROUTER PROCESSING\n\n",
+        delta("resposta"),
+        ": OPENROUTER PROCESSING\n\n",
+        "data: [DONE]\n\n",
+    ]))
+
+    assert await coletar(llm.stream([{"role": "user", "content": "oi"}])) == ["resposta"]
+    assert llm.metricas.contadores["erros"] == 0
+
+
+async def test_stream_erro_no_meio_vira_llm_error(provedor):
+    provedor["responder"] = lambda request: httpx.Response(200, stream=CorpoSSE([
+        delta("começo"),
+        evento({"error": {"message": "Provider returned error", "code": 502}}),
+    ]))
+    partes = []
+
+    with pytest.raises(llm.LLMError, match="Provider returned error") as erro:
+        async for parte in llm.stream([{"role": "user", "content": "oi"}]):
+            partes.append(parte)
+
+    assert partes == ["começo"]
+    assert erro.value.retentavel
+    assert llm.metricas.contadores["erros"] == 1
+
+
+@pytest.mark.parametrize("status, retentavel", [(429, True), (503, True), (400, False), (401, False)])
+async def test_stream_status_de_erro(provedor, status, retentavel):
+    provedor["responder"] = lambda request: httpx.Response(status, json={"error": {"message": "falhou"}})
+
+    with pytest.raises(llm.LLMError) as erro:
+        await coletar(llm.stream([{"role": "user", "content": "oi"}]))
+
+    assert erro.value.upstream == status
+    assert erro.value.retentavel is retentavel
+
+
+async def test_stream_preenche_tempos(provedor):
+    provedor["responder"] = lambda request: httpx.Response(200, stream=CorpoSSE(
+        [": OPENROUTER PROCESSING\n\n", delta("a"), delta("b"), "data: [DONE]\n\n"], pausa=0.02
+    ))
+    tempos = {}
+
+    await coletar(llm.stream([{"role": "user", "content": "oi"}], tempos=tempos))
+
+    # O primeiro delta vem no segundo pedaço; o último pedaço fecha o total
+    assert tempos["ttft_ms"] >= 40
+    assert tempos["total_ms"] >= tempos["ttft_ms"] + 30
+    assert len(llm.metricas.ttft) == 1 and len(llm.metricas.duracao) == 1
+
+
+async def test_stream_sem_deltas_nao_tem_ttft(provedor):
+    provedor["responder"] = lambda request: httpx.Response(200, stream=CorpoSSE(["data: [DONE]\n\n"]))
+    tempos = {}
+
+    assert await coletar(llm.stream([{"role": "user", "content": "oi"}], tempos=tempos)) == []
+    assert tempos["ttft_ms"] is None
+    assert tempos["total_ms"] is not None
+
+
+async def test_completar(provedor):
+    provedor["responder"] = lambda request: httpx.Response(200, json={"choices": [{"message": {"content": "pronto"}}]})
+
+    assert await llm.completar([{"role": "user", "content": "oi"}], model="openai/gpt-4o-mini") == "pronto"
+    assert "stream" not in provedor["requests"][0]
+    assert provedor["requests"][0]["model"] == "openai/gpt-4o-mini"
+    assert len(llm.metricas.duracao) == 1
+
+
+async def test_completar_status_de_erro(provedor):
+    provedor["responder"] = lambda request: httpx.Response(403, text="forbidden")
+
+    with pytest.raises(llm.LLMError) as erro:
+        await llm.completar([{"role": "user", "content": "oi"}])
+
+    assert erro.value.upstream == 403
+    assert not erro.value.retentavel
+    assert llm.metricas.contadores["erros"] == 1
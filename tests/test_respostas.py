@@ -0,0 +1,35 @@
+"""Versão dos dados do cache de respostas e similaridade da busca semântica."""
+import math
+
+import pytest
+
+from api.services import cache, respostas
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_versao_muda_com_a_invalidacao_sem_consultar_o_banco(banco):
+    antes = respostas.versao(["contratos", "transacoes"])
+
+    assert respostas.versao(["contratos", "transacoes"]) == antes
+    await cache.invalidar("resumos", 1)
+    depois = respostas.versao(["contratos", "transacoes"])
+
+    assert depois != antes
+    await cache.invalidar("contratos", 1)
+    assert respostas.versao(["contratos", "transacoes"]) != depois
+    assert banco.chamadas == []
+
+
+async def test_escrita_pela_api_muda_a_versao(api, banco):
+    antes = respostas.versao(["transacoes"])
+
+    await api.post("/api/transacoes/", json={"tipo": "despesa", "valor": 10.0})
+
+    assert respostas.versao(["transacoes"]) != antes
+
+
+def test_cosseno_nao_depende_da_norma():
+    assert math.isclose(respostas._cosseno([3.0, 0.0], [2.0, 0.0]), 1.0)
+    assert math.isclose(respostas._cosseno([1.0, 1.0], [10.0, 0.0]), math.sqrt(0.5))
+    assert respostas._cosseno([0.0, 0.0], [1.0, 0.0]) == 0.0
@@ -0,0 +1,270 @@
+"""Failover, pausa por rate limit, rebaixamento por erros e hedge do roteador de modelos."""
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from api.services import admissao, llm, roteador
+
+pytestmark = pytest.mark.anyio
+
+CONFIG = {"models": {"default": "a", "fallbackChain": [{"model": "a"}, {"model": "b"}, {"model": "c"}]}}
+
+
+@pytest.fixture
+def router():
+    return roteador.ModelRouter(CONFIG)
+
+
+def modelos(comportamento):
+    """
+    iniciar() falso: comportamento[modelo] é (atraso em s, resultado ou
+    exceção). Guarda os modelos chamados e os que foram cancelados.
+    """
+    chamados, cancelados = [], []
+
+    async def iniciar(modelo):
+        chamados.append(modelo)
+        atraso, resultado = comportamento[modelo]
+        try:
+            await asyncio.sleep(atraso)
+        except asyncio.CancelledError:
+            cancelados.append(modelo)
+            raise
+        if isinstance(resultado, BaseException):
+            raise resultado
+        return resultado
+
+    return iniciar, chamados, cancelados
+
+
+async def test_erro_retentavel_passa_para_o_proximo(router):
+    iniciar, chamados, _ = modelos({
+        "a": (0, llm.LLMError("rate limit", 500, upstream=429)),
+        "b": (0, "resposta de b"),
+    })
+
+    assert await router._corrida(router.ordem(), "completo", iniciar) == ("b", "resposta de b")
+    assert chamados == ["a", "b"]
+
+
+async def test_429_pausa_o_modelo(router):
+    iniciar, _, _ = modelos({"a": (0, llm.LLMError("rate limit", 500, upstream=429)), "b": (0, "ok")})
+
+    await router._corrida(router.ordem(), "completo", iniciar)
+
+    assert not router.stats["a"].disponivel()
+    assert router.stats["a"].contadores["rate_limits"] == 1
+    assert router.ordem() == ["b", "c", "a"]
+
+
+async def test_muitos_erros_rebaixam_o_modelo(router):
+    for _ in range(roteador.LLM_ROUTER_AMOSTRAS_MIN):
+        router._stats("a").falha(llm.LLMError("erro do provedor", 500, upstream=502))
+
+    # Sem 429 o modelo continua disponível, só vai para o fim da fila
+    assert router.stats["a"].disponivel()
+    assert not router.stats["a"].saudavel()
+    assert router.ordem() == ["b", "c", "a"]
+
+
+@pytest.mark.parametrize("status", [400, 401, 403])
+async def test_erro_definitivo_nao_passa_para_o_proximo(router, status):
+    erro = llm.LLMError("requisição inválida", 500, upstream=status, retentavel=status not in llm.STATUS_DEFINITIVOS)
+    iniciar, chamados, _ = modelos({"a": (0, erro), "b": (0, "ok")})
+
+    with pytest.raises(llm.LLMError) as capturado:
+        await router._corrida(router.ordem(), "completo", iniciar)
+
+    assert capturado.value is erro
+    assert chamados == ["a"]
+
+
+async def test_admissao_recusada_esvazia_a_fila(router):
+    iniciar, chamados, _ = modelos({
+        "a": (0, admissao.AdmissaoRecusada("Cota esgotada", 429)),
+        "b": (0, "ok"),
+    })
+
+    with pytest.raises(admissao.AdmissaoRecusada):
+        await router._corrida(router.ordem(), "completo", iniciar)
+
+    assert chamados == ["a"]
+    # Não conta contra o modelo
+    assert router._stats("a").contadores["erros"] == 0
+
+
+async def test_hedge_dispara_depois_do_atraso(router, monkeypatch):
+    monkeypatch.setattr(roteador, "LLM_HEDGE", True)
+    monkeypatch.setattr(roteador, "LLM_HEDGE_DELAY_MS", 50)
+    iniciar, chamados, cancelados = modelos({"a": (5, "lento"), "b": (0.01, "rápido")})
+
+    inicio = time.perf_counter()
+    assert await router._corrida(router.ordem(), "completo", iniciar) == ("b", "rápido")
+
+    assert 0.05 <= time.perf_counter() - inicio < 1
+    assert chamados == ["a", "b"]
+    assert cancelados == ["a"]
+    assert router.stats["b"].contadores["hedges"] == 1
+    assert router.stats["b"].contadores["hedges_vencidos"] == 1
+
+
+async def test_hedge_nao_dispara_antes_do_atraso(router, monkeypatch):
+    monkeypatch.setattr(roteador, "LLM_HEDGE", True)
+    monkeypatch.setattr(roteador, "LLM_HEDGE_DELAY_MS", 200)
+    iniciar, chamados, _ = modelos({"a": (0.01, "a tempo"), "b": (0, "reserva")})
+
+    assert await router._corrida(router.ordem(), "completo", iniciar) == ("a", "a tempo")
+    assert chamados == ["a"]
+
+
+async def test_atraso_do_hedge_segue_o_p95(router, monkeypatch):
+    monkeypatch.setattr(roteador, "LLM_HEDGE_MIN_MS", 100)
+    assert router._atraso_hedge("a", "stream") == roteador.LLM_HEDGE_DELAY_MS / 1000
+
+    for latencia in (0.2, 0.3, 0.4, 0.5, 0.6):
+        router._stats("a").sucesso("stream", latencia)
+    assert router._atraso_hedge("a", "stream") == 0.6
+
+    for _ in range(roteador.LLM_ROUTER_AMOSTRAS_MIN):
+        router._stats("b").sucesso("stream", 0.01)
+    assert router._atraso_hedge("b", "stream") == 0.1
+
+
+@pytest.fixture
+def streams(monkeypatch):
+    """
+    llm.stream falso: roteiro[modelo] é a lista de passos (atraso em s,
+    delta ou exceção). Guarda os geradores fechados.
+    """
+    roteiro = {}
+    fechados = []
+
+    async def stream(messages, model=None, max_tokens=None, tempos=None):
+        try:
+            for atraso, passo in roteiro[model]:
+                await asyncio.sleep(atraso)
+                if isinstance(passo, BaseException):
+                    raise passo
+                if tempos is not None:
+                    tempos["modelo"] = model
+                yield passo
+        finally:
+            fechados.append(model)
+
+    monkeypatch.setattr(llm, "stream", stream)
+    return roteiro, fechados
+
+
+async def test_hedge_no_stream_fecha_o_gerador_do_perdedor(router, streams, monkeypatch):
+    monkeypatch.setattr(roteador, "LLM_HEDGE", True)
+    monkeypatch.setattr(roteador, "LLM_HEDGE_DELAY_MS", 50)
+    roteiro, fechados = streams
+    roteiro["a"] = [(5, "lento")]
+    roteiro["b"] = [(0, "rá"), (0, "pido")]
+    tempos = {}
+
+    partes = [delta async for delta in router.stream([{"role": "user", "content": "oi"}], tempos=tempos)]
+
+    assert partes == ["rá", "pido"]
+    assert tempos["modelo"] == "b"
+    assert tempos["ttft_ms"] >= 50
+    # O perdedor foi cancelado esperando o primeiro delta e o gerador dele fechado
+    assert sorted(fechados) == ["a", "b"]
+
+
+async def test_stream_troca_de_modelo_antes_do_primeiro_delta(router, streams):
+    roteiro, _ = streams
+    roteiro["a"] = [(0, llm.LLMError("sobrecarregado", 500, upstream=503))]
+    roteiro["b"] = [(0, "de b")]
+
+    assert [d async for d in router.stream([{"role": "user", "content": "oi"}])] == ["de b"]
+
+
+async def test_stream_sem_failover_depois_do_primeiro_delta(router, streams):
+    roteiro, fechados = streams
+    roteiro["a"] = [(0, "começo"), (0, llm.LLMError("caiu no meio"))]
+    roteiro["b"] = [(0, "não deveria")]
+    partes = []
+
+    with pytest.raises(llm.LLMError, match="caiu no meio"):
+        async for delta in router.stream([{"role": "user", "content": "oi"}]):
+            partes.append(delta)
+
+    assert partes == ["começo"]
+    assert fechados == ["a"]
+    assert router.stats["b"].contadores["requests"] == 0
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """
+    OpenRouter falso (httpx.MockTransport) por trás do cliente de llm:
+    respostas[modelo] é (atraso em s, status, texto). Guarda os modelos pedidos.
+    """
+    monkeypatch.setenv("OPENROUTER_API_KEY", "chave-de-teste")
+    monkeypatch.setattr(llm, "metricas", llm.LLMMetrics())
+    respostas, pedidos = {}, []
+
+    async def handler(request):
+        modelo = json.loads(request.content)["model"]
+        pedidos.append(modelo)
+        atraso, status, texto = respostas[modelo]
+        await asyncio.sleep(atraso)
+        if status != 200:
+            return httpx.Response(status, text=texto)
+        return httpx.Response(200, json={"choices": [{"message": {"content": texto}}]})
+
+    monkeypatch.setattr(llm, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return respostas, pedidos
+
+
+@pytest.fixture
+def controle(monkeypatch):
+    """Admissão nova: uma vaga por agente, como a que a rota do chat segura."""
+    novo = admissao.Admissao(maximo=8, por_agente=1, limites={"chief": 2})
+    monkeypatch.setattr(admissao, "controle", novo)
+    return novo
+
+
+async def test_failover_pelo_cliente_http(router, upstream):
+    respostas, pedidos = upstream
+    respostas["a"] = (0, 503, "sobrecarregado")
+    respostas["b"] = (0, 200, "resposta de b")
+
+    assert await router.completar([{"role": "user", "content": "oi"}]) == ("b", "resposta de b")
+    assert pedidos == ["a", "b"]
+    assert router.stats["a"].contadores["erros"] == 1
+
+
+async def test_hedge_pelo_cliente_http_com_segunda_vaga(router, upstream, controle, monkeypatch):
+    monkeypatch.setattr(roteador, "LLM_HEDGE", True)
+    monkeypatch.setattr(roteador, "LLM_HEDGE_DELAY_MS", 50)
+    respostas, pedidos = upstream
+    respostas["a"] = (5, 200, "lenta")
+    respostas["b"] = (0.01, 200, "rápida")
+
+    async with admissao.vaga("chief"):
+        assert await router.completar([{"role": "user", "content": "oi"}], agente="chief") == ("b", "rápida")
+        # A vaga do hedge volta quando a corrida acaba; a da rota continua
+        assert controle.ativos_agente["chief"] == 1
+
+    assert pedidos == ["a", "b"]
+    assert controle.contadores["extras"] == 1
+
+
+async def test_hedge_sem_vaga_livre_espera_o_primeiro(router, upstream, controle, monkeypatch):
+    monkeypatch.setattr(roteador, "LLM_HEDGE", True)
+    monkeypatch.setattr(roteador, "LLM_HEDGE_DELAY_MS", 20)
+    respostas, pedidos = upstream
+    respostas["a"] = (0.1, 200, "a tempo")
+    respostas["b"] = (0, 200, "reserva")
+
+    async with admissao.vaga("ops"):
+        assert await router.completar([{"role": "user", "content": "oi"}], agente="ops") == ("a", "a tempo")
+
+    assert pedidos == ["a"]
+    assert controle.contadores["extras_recusadas"] == 1
+    assert router.stats["b"].contadores["hedges"] == 0
@@ -0,0 +1,68 @@
+"""Retomada do stream (Last-Event-ID) com eventos fora de ordem e registro da conexão."""
+import json
+
+import pytest
+
+from api.services import stream
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    novo = stream.StreamHub()
+    monkeypatch.setattr(stream, "hub", novo)
+    return novo
+
+
+async def receber(hub, *ids):
+    for id_ in ids:
+        await hub.receber(json.dumps({"id": id_, "entidade": "tarefas", "acao": "atualizado", "empresa_id": 1, "registros": []}))
+
+
+def id_do(chunk):
+    return int(chunk.decode().split("\n")[0].removeprefix("id: "))
+
+
+async def proximos(corpo, n):
+    return [id_do(await corpo.__anext__()) for _ in range(n)]
+
+
+async def test_evento_atrasado_depois_da_retomada_e_entregue(hub):
+    # O 3 foi publicado por outro worker e chega depois do 4
+    await receber(hub, 1, 2, 4)
+    corpo = stream.eventos(1, ["tarefas"], {}, ultimo_id=1, heartbeat=0.05)
+
+    await corpo.__anext__()
+    assert await proximos(corpo, 2) == [2, 4]
+
+    await receber(hub, 3)
+    assert await proximos(corpo, 1) == [3]
+    await corpo.aclose()
+
+
+async def test_evento_lido_na_retomada_nao_repete(hub):
+    await receber(hub, 1, 2)
+    corpo = stream.eventos(1, ["tarefas"], {}, ultimo_id=1, heartbeat=0.05)
+
+    await corpo.__anext__()
+    # Chega com a conexão já registrada: vai para a fila e para o buffer
+    await receber(hub, 3)
+    assert await proximos(corpo, 2) == [2, 3]
+
+    await receber(hub, 4)
+    assert await proximos(corpo, 1) == [4]
+    await corpo.aclose()
+    assert not hub.assinantes
+
+
+async def test_conexao_so_registra_quando_o_corpo_e_lido(hub):
+    corpo = stream.eventos(1, ["tarefas"], {})
+    assert not hub.assinantes
+
+    await corpo.__anext__()
+    assert len(hub.assinantes) == 1
+
+    await corpo.aclose()
+    assert not hub.assinantes
+
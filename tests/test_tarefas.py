@@ -0,0 +1,158 @@
+"""Escritas de tarefas: respostas e eventos sem as colunas internas."""
+import pytest
+
+from api.services import stream
+
+pytestmark = pytest.mark.anyio
+
+VETOR = [0.25] * 8
+
+
+@pytest.fixture
+def eventos(monkeypatch):
+    publicados = []
+
+    async def publicar(entidade, acao, registros, empresa_id=None):
+        publicados.append((acao, registros))
+
+    monkeypatch.setattr(stream, "publicar", publicar)
+    return publicados
+
+
+async def test_criar_nao_devolve_embedding(api, banco, eventos):
+    # Como se o banco preenchesse a coluna na própria escrita
+    banco.padroes["tarefas"].update(embedding=VETOR, search_vector="'nova':1")
+
+    response = await api.post("/api/tarefas/", json={"titulo": "Nova"})
+
+    assert response.status_code == 201
+    assert response.json()["embedding"] is None
+    assert "embedding" not in eventos[0][1][0]
+    assert "search_vector" not in eventos[0][1][0]
+
+
+@pytest.mark.parametrize("metodo, rota, kwargs", [
+    ("PATCH", "/api/tarefas/{id}", {"json": {"titulo": "Editada"}}),
+    ("POST", "/api/tarefas/{id}/mover", {"params": {"coluna": "doing"}}),
+    ("DELETE", "/api/tarefas/{id}", {}),
+])
+async def test_escritas_nao_devolvem_embedding(api, banco, eventos, metodo, rota, kwargs):
+    tarefa = banco.inserir("tarefas", embedding=VETOR, search_vector="'tarefa':1")
+
+    response = await api.request(metodo, rota.format(id=tarefa["id"]), **kwargs)
+
+    assert response.status_code < 300
+    if response.content:
+        assert response.json().get("embedding") is None
+        assert "search_vector" not in response.json()
+    registro = eventos[0][1][0]
+    assert "embedding" not in registro and "search_vector" not in registro
+
+
+@pytest.mark.parametrize("acao, status, campos", [
+    ("iniciar", "ativa", {"data_inicio"}),
+    ("pausar", "pausada", {"motivo_pausa", "data_pausa"}),
+    ("abandonar", "abandonada", {"motivo_abandono", "data_abandono"}),
+    ("suspender", "suspensa", {"motivo_suspensao", "data_suspensao"}),
+    ("finalizar", "concluida", {"data_conclusao"}),
+])
+async def test_rotas_de_status(api, banco, eventos, acao, status, campos):
+    tarefa = banco.inserir("tarefas")
+
+    response = await api.post(f"/api/tarefas/{tarefa['id']}/{acao}", params={"motivo": "cliente pediu"})
+
+    assert response.status_code == 200
+    assert response.json()["status"] == status
+    assert tarefa["status"] == status
+    assert all(tarefa[campo] for campo in campos)
+    if acao == "finalizar":
+        assert tarefa["coluna"] == "done"
+
+
+async def test_rota_de_status_sem_tarefa(api, banco):
+    assert (await api.post("/api/tarefas/99/pausar")).status_code == 404
+
+
+def assinante(**filtros):
+    return stream.Assinante(1, ["tarefas"], filtros)
+
+
+def test_filtro_do_stream_casa_com_o_valor_anterior():
+    evento = {
+        "id": 1, "entidade": "tarefas", "acao": "atualizado", "empresa_id": 1,
+        "registros": [{"id": 7, "sprint_id": 2, "anterior": {"sprint_id": 1}}],
+    }
+
+    assert assinante(sprint_id=1).filtrar(evento) is not None
+    assert assinante(sprint_id=2).filtrar(evento) is not None
+    assert assinante(sprint_id=3).filtrar(evento) is None
+    # Só sprint_id mudou: projeto continua valendo pelo valor atual
+    assert assinante(sprint_id=1, projeto_id=5).filtrar(evento) is not None
+
+
+async def test_trocar_de_sprint_publica_o_valor_anterior(api, banco, eventos):
+    tarefa = banco.inserir("tarefas", sprint_id=1, projeto_id=5)
+
+    response = await api.patch(f"/api/tarefas/{tarefa['id']}", json={"sprint_id": 2})
+
+    assert response.status_code == 200
+    registro = eventos[0][1][0]
+    assert registro["sprint_id"] == 2
+    assert registro["anterior"] == {"sprint_id": 1}
+    assert "anterior" not in response.json()
+    assert assinante(sprint_id=1).filtrar({"entidade": "tarefas", "empresa_id": 1, "registros": [registro]})
+
+
+async def test_escrita_sem_colunas_do_stream_nao_le_antes(api, banco, eventos):
+    tarefa = banco.inserir("tarefas", sprint_id=1)
+
+    await api.patch(f"/api/tarefas/{tarefa['id']}", json={"titulo": "Outro"})
+
+    assert banco.chamadas == [("PATCH", "tarefas")]
+    assert "anterior" not in eventos[0][1][0]
+
+
+async def test_lote_que_troca_de_sprint_publica_o_valor_anterior(api, banco, eventos):
+    movida = banco.inserir("tarefas", sprint_id=1)
+    editada = banco.inserir("tarefas", sprint_id=1)
+
+    def atualizar_em_lote(params):
+        linhas = {r["id"]: r for r in banco.tabelas["tarefas"]}
+        saida = []
+        for item in params["itens"]:
+            linhas[item["id"]].update(item["dados"])
+            saida.append({"indice": item["indice"], "registro": dict(linhas[item["id"]]), "erro": None})
+        return saida
+
+    banco.rpcs["atualizar_em_lote"] = atualizar_em_lote
+
+    response = await api.patch("/api/tarefas/bulk", json=[
+        {"id": movida["id"], "sprint_id": 2}, {"id": editada["id"], "titulo": "Outro"}
+    ])
+
+    assert response.json()["sucesso"] == 2
+    registros = {r["id"]: r for r in eventos[0][1]}
+    assert registros[movida["id"]]["anterior"] == {"sprint_id": 1}
+    assert "anterior" not in registros[editada["id"]]
+
+
+async def test_criar_sem_linha_devolvida_nao_publica(banco, eventos, monkeypatch):
+    from types import SimpleNamespace
+
+    from api.schemas.tarefa import TarefaCreate
+    from api.services import tarefas
+
+    async def execute(query):
+        return SimpleNamespace(data=[])
+
+    monkeypatch.setattr(tarefas, "execute", execute)
+
+    assert await tarefas.criar_tarefa(TarefaCreate(titulo="Nova")) is None
+    assert eventos == []
+
+
+async def test_criar_com_prazo(api, banco, eventos):
+    response = await api.post("/api/tarefas/", json={"titulo": "Com prazo", "prazo": "2026-11-01"})
+
+    assert response.status_code == 201
+    assert banco.tabelas["tarefas"][0]["prazo"] == "2026-11-01"